@@ -8,12 +8,13 @@ Description : Interface web pour tester un modèle CNN de classification de chif
 
 import streamlit as st
 import numpy as np
-import keras
 import os
 import base64
 import io
 from PIL import Image as PILImage
 from utils.style import apply_style, create_card, create_metric, create_link_card
+# Chargement de MNIST avec NumPy seul : la page d'accueil n'importe ni TensorFlow ni rembg
+from utils.datasets import load_mnist
 
 # Configuration de la page Streamlit
 st.set_page_config(
@@ -28,7 +29,7 @@ apply_style()
 # Fonction pour charger le dataset MNIST
 @st.cache_data
 def load_mnist_samples():
-    (x_train, y_train), (x_test, y_test) = keras.datasets.mnist.load_data()
+    (x_train, y_train), (x_test, y_test) = load_mnist()
     samples = {}
     for digit in range(10):
         indices = np.where(y_train == digit)[0]
@@ -19,7 +19,6 @@ Fonctionnalités :
 
 import streamlit as st
 from PIL import Image
-import keras
 import sys
 import os
 import numpy as np
@@ -29,9 +28,11 @@ from streamlit_drawable_canvas import st_canvas
 # Ajouter les répertoires au path pour les imports
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from utils.inference import predict_mnist
-# Importer la classe du modèle pour le chargement
-from training.utils.model_definition import SimpleCNN_MNIST
+from utils.inference import predict_mnist, run_model, load_app_model
+from utils.worker import InferenceWorker
+from utils.tta import TTAEngine
+from utils.rembg_pool import preload_configured_models, rembg_pool
+from utils.datasets import load_mnist
 from utils.style import apply_style
 
 # Configuration de la page Streamlit
@@ -349,26 +350,28 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Charger le modèle CNN
+# Charger le modèle CNN (au premier appel, c'est-à-dire à la première prédiction :
+# TensorFlow n'est importé que si une prédiction est demandée)
 @st.cache_resource
 def load_model():
-    # Remonter de streamlit_app/pages/ vers la racine puis aller dans models/
-    root_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    model_path = os.path.join(root_dir, 'models', 'mnist_cnn.keras')
-    return keras.models.load_model(model_path)
+    # Modèle replié si exporté, sinon modèle d'origine ; MNIST_BACKEND=tflite, onnx ou numpy
+    # pour un backend alternatif (voir utils/backends.py).
+    # Ressource partagée par toutes les sessions : un seul thread appelle le modèle et
+    # regroupe les requêtes simultanées des sessions en une passe (voir utils/worker.py)
+    return InferenceWorker(load_app_model())
 
 # Charger le dataset MNIST
 @st.cache_data
 def load_mnist_dataset():
     """Charge le dataset MNIST pour le mode test"""
-    (x_train, y_train), (x_test, y_test) = keras.datasets.mnist.load_data()
+    (x_train, y_train), (x_test, y_test) = load_mnist()
     return (x_test, y_test)  # On utilise le test set
 
 # Charger des exemples de confusion 1/7
 @st.cache_data
 def load_confusing_examples():
     """Charge des exemples de 1 et 7 qui peuvent être confondus"""
-    (x_train, y_train), _ = keras.datasets.mnist.load_data()
+    (x_train, y_train), _ = load_mnist()
 
     # Trouver des exemples de 1 et 7
     ones = x_train[y_train == 1]
@@ -378,7 +381,9 @@ def load_confusing_examples():
     # (on prend juste les premiers pour la démo, idéalement on filtrerait)
     return ones[15], sevens[8]  # Exemples qui se ressemblent visuellement
 
-model = load_model()
+# Préchargement rembg en arrière-plan uniquement s'il est configuré (MNIST_REMBG_PRELOAD) ;
+# sinon la session est créée à la première suppression de fond
+preload_configured_models()
 
 # Fonction helper pour afficher le score de qualité
 def display_quality_score(quality_score):
@@ -413,6 +418,46 @@ def display_quality_score(quality_score):
     </div>
     """, unsafe_allow_html=True)
 
+# Libellés des étapes chronométrées du pipeline
+STAGE_LABELS = {
+    'cache': 'Cache',
+    'downscale': 'Réduction',
+    'segmentation': 'Segmentation',
+    'rembg': 'Suppression fond',
+    'composition': 'Composition',
+    'blur': 'Débruitage',
+    'threshold': 'Binarisation',
+    'bbox': 'Bounding box',
+    'contrast': 'Contraste (CLAHE)',
+    'resize': 'Resize',
+    'centering': 'Centrage',
+    'morphology': 'Morphologie',
+    'inference': 'Modèle',
+}
+
+# Fonction helper pour afficher la latence par étape
+def display_timings(timings):
+    """Affiche la décomposition de la latence du pipeline par étape"""
+    if timings is None:
+        return
+
+    metrics_html = "".join(f"""
+            <div class="quality-metric">
+                <div class="quality-metric-label">{STAGE_LABELS.get(name, name)}</div>
+                <div class="quality-metric-value">{ms:.1f} ms ({ms / max(timings['total_ms'], 1e-9):.0%})</div>
+            </div>""" for name, ms in timings['stages'].items())
+
+    st.markdown(f"""
+    <div class="quality-card">
+        <div class="quality-header">⏱️ Latence par étape</div>
+        <div class="quality-score">
+            <span class="quality-score-value">{timings['total_ms']:.0f} ms</span>
+        </div>
+        <div class="quality-metrics">{metrics_html}
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
 # En-tête avec avatar
 avatar_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets', 'profile.jpg')
 avatar_html = ""
@@ -452,9 +497,17 @@ with st.expander("⚙️ Paramètres avancés", expanded=False):
         - **u2netp** (Défaut, recommandé pour MNIST) : Léger, rapide et performant (~4.7 MB)
         - **u2net** : Bon équilibre qualité/vitesse (~176 MB)
         - **isnet-general-use** : Plus récent, meilleure qualité générale, bordures plus nettes
+
+        Les modèles inutilisés sont libérés automatiquement au-delà du budget mémoire.
         """
     )
 
+    # Mémoire occupée par les sessions rembg chargées (estimation)
+    rembg_memory = rembg_pool.memory()
+    loaded = ", ".join(f"{name} ({mb:.0f} MB)" for name, mb in rembg_memory['models'].items() if mb) or "aucun"
+    budget = f"{rembg_memory['budget_mb']:.0f} MB" if rembg_memory['budget_mb'] else "illimité"
+    st.caption(f"Modèles rembg en mémoire : {loaded} — budget {budget}")
+
     use_tta = st.checkbox(
         "🎯 Activer TTA (Test-Time Augmentation)",
         value=False,
@@ -462,12 +515,16 @@ with st.expander("⚙️ Paramètres avancés", expanded=False):
         Le TTA améliore la précision en moyennant 5 prédictions avec rotations légères (-5°, -3°, 0°, +3°, +5°).
 
         **Avantages** : +0.2-0.4% de précision, plus robuste aux rotations
-        **Inconvénient** : 5× plus lent (~5 secondes au lieu de ~1 seconde)
+        **Coût** : les 5 variantes sont évaluées en un seul batch, et ignorées quand la
+        prédiction originale est déjà sûre à 99% (coût quasi nul sur les images faciles)
 
         Recommandé pour les images ambiguës ou critiques.
         """
     )
 
+    # TTA vectorisé avec early exit (variantes sautées si confiance ≥ 99%)
+    tta_engine = TTAEngine(early_exit_threshold=0.99)
+
 with st.expander("💡 Conseils importants et confusions fréquentes", expanded=False):
     st.markdown("#### ⚠️ Confusion 1 ↔ 7")
 
@@ -545,12 +602,13 @@ if mode == "📤 Upload":
             st.markdown('<div class="section-header">Résultats de l\'analyse</div>', unsafe_allow_html=True)
 
             with st.spinner("🔍 Analyse en cours..."):
-                top3, steps, quality_score = predict_mnist(
-                    image, model,
+                top3, steps, quality_score, timings = predict_mnist(
+                    image, load_model(),
                     return_steps=True,
                     rembg_model=rembg_model,
-                    use_tta=use_tta,
-                    return_quality=True
+                    use_tta=tta_engine if use_tta else False,
+                    return_quality=True,
+                    return_timings=True
                 )
 
             # Résultat principal
@@ -570,8 +628,9 @@ if mode == "📤 Upload":
             for idx, (digit, conf) in enumerate(top3, 1):
                 st.progress(float(conf), text=f"#{idx} - Chiffre {digit} : {conf*100:.1f}%")
 
-            # Affichage du score de qualité
+            # Affichage du score de qualité et de la latence par étape
             display_quality_score(quality_score)
+            display_timings(timings)
 
         # Étapes de transformation (en pleine largeur)
         with st.expander("🔬 Voir les étapes de transformation MNIST", expanded=False):
@@ -614,12 +673,13 @@ elif mode == "📷 Caméra":
             st.markdown('<div class="section-header">Résultats de l\'analyse</div>', unsafe_allow_html=True)
 
             with st.spinner("🔍 Analyse en cours..."):
-                top3, steps, quality_score = predict_mnist(
-                    image, model,
+                top3, steps, quality_score, timings = predict_mnist(
+                    image, load_model(),
                     return_steps=True,
                     rembg_model=rembg_model,
-                    use_tta=use_tta,
-                    return_quality=True
+                    use_tta=tta_engine if use_tta else False,
+                    return_quality=True,
+                    return_timings=True
                 )
 
             # Résultat principal
@@ -639,8 +699,9 @@ elif mode == "📷 Caméra":
             for idx, (digit, conf) in enumerate(top3, 1):
                 st.progress(float(conf), text=f"#{idx} - Chiffre {digit} : {conf*100:.1f}%")
 
-            # Affichage du score de qualité
+            # Affichage du score de qualité et de la latence par étape
             display_quality_score(quality_score)
+            display_timings(timings)
 
         # Étapes de transformation (en pleine largeur)
         with st.expander("🔬 Voir les étapes de transformation MNIST", expanded=False):
@@ -704,12 +765,13 @@ elif mode == "✏️ Dessiner":
                     img_array = canvas_result.image_data[:, :, :3]  # RGB seulement
                     image = Image.fromarray(img_array.astype('uint8'), 'RGB')
 
-                    top3, steps, quality_score = predict_mnist(
-                        image, model,
+                    top3, steps, quality_score, timings = predict_mnist(
+                        image, load_model(),
                         return_steps=True,
                         rembg_model=rembg_model,
-                        use_tta=use_tta,
-                        return_quality=True
+                        use_tta=tta_engine if use_tta else False,
+                        return_quality=True,
+                        return_timings=True
                     )
 
                 # Résultat principal
@@ -729,8 +791,9 @@ elif mode == "✏️ Dessiner":
                 for idx, (digit, conf) in enumerate(top3, 1):
                     st.progress(float(conf), text=f"#{idx} - Chiffre {digit} : {conf*100:.1f}%")
 
-                # Affichage du score de qualité
+                # Affichage du score de qualité et de la latence par étape
                 display_quality_score(quality_score)
+                display_timings(timings)
 
             # Étapes de transformation (en pleine largeur)
             with st.expander("🔬 Voir les étapes de transformation MNIST", expanded=False):
@@ -806,7 +869,7 @@ else:  # Dataset MNIST
             img_array = img_array[np.newaxis, ..., np.newaxis]  # (1, 28, 28, 1)
 
             # Prédiction directe (pas de preprocessing, déjà au format MNIST)
-            predictions = model.predict(img_array, verbose=0)[0]
+            predictions = run_model(load_model(), img_array)[0]
             top3_indices = np.argsort(predictions)[::-1][:3]
             top3_confidences = predictions[top3_indices]
             top3 = list(zip(top3_indices, top3_confidences))
@@ -375,9 +375,16 @@ with col2:
     - Technique éprouvée en compétition
 
     **Inconvénient** :
-    - 5× plus lent à l'inférence
+    - 5× plus de calcul à l'inférence
     """)
 
+st.markdown("""
+L'ensemble se construit avec `python -m training.utils.ensemble` : les 5 modèles sont repliés et
+réunis dans un seul graphe (`EnsembleCNN_MNIST`), servi comme le modèle unique en un appel et une passe
+sur le batch. Le calcul reste proportionnel au nombre de modèles : sur CPU, l'ensemble coûte entre
+3× et 6× un modèle seul, et la fusion des 5 modèles en convolutions groupées ne fait pas mieux.
+""")
+
 st.markdown("""
 <div class="info-box">
     <p>💡 Cette technique est couramment utilisée en compétition Kaggle pour gagner les derniers points de précision.</p>
@@ -0,0 +1,246 @@
+"""
+Backends d'inférence interchangeables
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Exécute le CNN avec Keras, l'interpréteur TFLite, ONNX Runtime ou
+              le moteur NumPy derrière la même interface serve(batch) → probabilités.
+
+Un backend se passe à la place du modèle Keras partout où un modèle est attendu
+(predict_mnist, Predictor, run_model) : rien d'autre ne change dans le pipeline.
+
+Exemple :
+    model = load_backend('tflite', path='models/mnist_cnn_int8.tflite')
+    top3 = predict_mnist(image, model)
+
+Les fichiers .tflite / .onnx sont produits par training/utils/export.py, les poids
+repliés du backend 'numpy' (sans TensorFlow) par training/utils/folding.py.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+BACKENDS = ('keras', 'tflite', 'onnx', 'numpy')
+
+# Fichier par défaut de chaque backend, relatif au dossier models/
+DEFAULT_MODEL_FILES = {
+    'keras': 'mnist_cnn.keras',
+    'tflite': 'mnist_cnn_int8.tflite',
+    'onnx': 'mnist_cnn.onnx',
+    'numpy': 'mnist_cnn_folded.npz'
+}
+
+
+class KerasBackend:
+    """Modèle Keras (chemin compilé serve() de SimpleCNN_MNIST, sinon predict)"""
+
+    name = 'keras'
+
+    def __init__(self, model):
+        self.model = model
+
+    def serve(self, batch):
+        if hasattr(self.model, 'serve'):
+            return self.model.serve(batch)
+        return self.model.predict(batch, verbose=0)
+
+
+class TFLiteBackend:
+    """
+    Interpréteur TFLite (float32 ou quantifié int8)
+
+    L'interpréteur n'est pas thread-safe : les appels sont sérialisés par un verrou.
+    Les tenseurs ne sont réalloués que lorsque la taille du batch change.
+    """
+
+    name = 'tflite'
+
+    def __init__(self, path, num_threads=None):
+        """
+        Args:
+            path: Fichier .tflite
+            num_threads: Threads de l'interpréteur (None = défaut de TFLite)
+        """
+        Interpreter = _tflite_interpreter_class()
+        self.path = path
+        self._interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        self._lock = threading.Lock()
+
+    def _quantize(self, batch):
+        """Convertit l'entrée au type attendu (modèles à entrée entière)"""
+        dtype = self._input['dtype']
+        if dtype == np.float32:
+            return batch
+        scale, zero_point = self._input['quantization']
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantize(self, output):
+        if output.dtype == np.float32:
+            return output
+        scale, zero_point = self._output['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def serve(self, batch):
+        batch = self._quantize(np.asarray(batch, dtype=np.float32))
+        with self._lock:
+            if len(batch) != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input['index'], batch.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            self._interpreter.set_tensor(self._input['index'], batch)
+            self._interpreter.invoke()
+            output = self._interpreter.get_tensor(self._output['index'])
+        return self._dequantize(output)
+
+
+class ONNXBackend:
+    """Session ONNX Runtime (déjà installé comme dépendance de rembg)"""
+
+    name = 'onnx'
+
+    def __init__(self, path, num_threads=None):
+        """
+        Args:
+            path: Fichier .onnx
+            num_threads: Threads intra-op (None = défaut d'ONNX Runtime)
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self._session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        self._input_name = self._session.get_inputs()[0].name
+
+    def serve(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        return self._session.run(None, {self._input_name: batch})[0]
+
+
+def _tflite_interpreter_class():
+    """Interpréteur TFLite : LiteRT ou tflite_runtime si installés, sinon TensorFlow"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def load_backend(name, path=None, model=None, models_dir=None, num_threads=None):
+    """
+    Crée un backend d'inférence
+
+    Args:
+        name: 'keras', 'tflite', 'onnx' ou 'numpy'
+        path: Fichier du modèle (défaut : DEFAULT_MODEL_FILES[name] dans models_dir)
+        model: Modèle Keras déjà chargé (backend 'keras' uniquement)
+        models_dir: Dossier des modèles (défaut : models/ à la racine du projet)
+        num_threads: Threads d'inférence (TFLite / ONNX Runtime)
+
+    Returns:
+        Backend exposant serve(batch) → probabilités
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Backend inconnu : {name} (disponibles : {', '.join(BACKENDS)})")
+
+    if path is None and model is None:
+        models_dir = models_dir or os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'models')
+        path = os.path.join(models_dir, DEFAULT_MODEL_FILES[name])
+
+    if name == 'keras':
+        if model is None:
+            import keras
+            model = keras.models.load_model(path)
+        return KerasBackend(model)
+    if name == 'tflite':
+        return TFLiteBackend(path, num_threads=num_threads)
+    if name == 'numpy':
+        from .numpy_engine import NumpyCNN
+        return NumpyCNN.from_npz(path)
+    return ONNXBackend(path, num_threads=num_threads)
+
+
+def select_model_for_budget(budget_ms, manifest_path=None, batch_size=1):
+    """
+    Modèle le plus précis dont la latence tient dans un budget
+
+    Le rapport students.json (enseignant et étudiants distillés, voir
+    training/utils/distillation.py) donne la précision et la latence CPU de chaque modèle.
+
+    Args:
+        budget_ms: Latence maximale d'une passe (ms)
+        manifest_path: Rapport JSON (défaut : models/students.json)
+        batch_size: Taille de batch de la latence comparée (mesurée : 1 et 32)
+
+    Returns:
+        str: Chemin du modèle retenu (le plus rapide si aucun ne tient dans le budget),
+            ou None si le rapport n'existe pas
+    """
+    models_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'models')
+    manifest_path = manifest_path or os.path.join(models_dir, 'students.json')
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    candidates = [manifest['teacher']] + manifest['students']
+    latency = lambda entry: entry['latency_ms'][str(batch_size)]
+    within_budget = [entry for entry in candidates if latency(entry) <= budget_ms]
+    if within_budget:
+        chosen = max(within_budget, key=lambda entry: entry['accuracy'])
+    else:
+        chosen = min(candidates, key=latency)
+    return os.path.join(os.path.dirname(manifest_path), chosen['path'])
+
+
+def load_app_model(backend=None, path=None):
+    """
+    Modèle servi par l'application (page Prédiction, serveur d'inférence)
+
+    Backend choisi par MNIST_BACKEND (défaut : keras) et fichier par MNIST_BACKEND_PATH.
+    En Keras, la variante repliée models/mnist_cnn_fused.keras est préférée si elle
+    existe, et le chemin d'inférence compilé est tracé dès le chargement. Avec
+    MNIST_LATENCY_BUDGET_MS, le modèle (enseignant ou étudiant distillé) est choisi
+    dans models/students.json selon ce budget (voir select_model_for_budget). Un ensemble
+    (models/mnist_cnn_ensemble.keras, training/utils/ensemble.py) se sert via MNIST_BACKEND_PATH.
+    La racine du projet doit être dans sys.path (import de training.utils).
+
+    Returns:
+        Modèle ou backend exposant serve(batch)
+    """
+    backend = backend or os.environ.get("MNIST_BACKEND", "keras")
+    path = path or os.environ.get("MNIST_BACKEND_PATH")
+    if backend != 'keras':
+        return load_backend(backend, path=path)
+
+    budget_ms = os.environ.get("MNIST_LATENCY_BUDGET_MS")
+    if path is None and budget_ms:
+        path = select_model_for_budget(float(budget_ms))
+
+    if path is None:
+        models_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'models')
+        # Variante d'inférence repliée (BN et normalisation dans les convolutions) si elle a été exportée
+        path = os.path.join(models_dir, 'mnist_cnn_fused.keras')
+        if not os.path.exists(path):
+            path = os.path.join(models_dir, DEFAULT_MODEL_FILES['keras'])
+
+    import keras
+    # Importer les classes du modèle pour le chargement
+    from training.utils.model_definition import SimpleCNN_MNIST, FusedCNN_MNIST, EnsembleCNN_MNIST  # noqa: F401
+    model = keras.models.load_model(path)
+    # Chemin d'inférence compilé (évite le surcoût de model.predict), tracé dès le chargement
+    model.compile_inference(warmup=True)
+    return model
@@ -0,0 +1,158 @@
+"""
+Cache par étape du pipeline de prédiction
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Mémoïsation LRU indexée par empreinte du contenu, à trois niveaux :
+              - sortie de rembg     : image + paramètres de suppression du fond
+              - canvas 28×28 final  : image + paramètres de prétraitement
+              - prédictions         : canvas + modèle + configuration TTA
+
+Dans Streamlit, chaque changement de widget relance le script : cocher le TTA
+réutilise le canvas déjà calculé, changer de modèle rembg ne réutilise que ce
+qui ne dépend pas de rembg (rien en amont du modèle).
+"""
+import hashlib
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+
+# id(modèle) → (référence faible, jeton) ; entrée retirée à la libération du modèle
+_model_tokens = {}
+
+
+def image_digest(img):
+    """Empreinte du contenu d'une image PIL (mode, taille et pixels)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{img.mode}:{img.size}".encode())
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def array_digest(array):
+    """Empreinte du contenu d'un tableau NumPy (forme, type et valeurs)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{array.shape}:{array.dtype}".encode())
+    h.update(array.tobytes())
+    return h.hexdigest()
+
+
+def model_token(model):
+    """
+    Jeton stable d'un modèle pour les clés du cache des prédictions
+
+    id(model) seul ne suffit pas : CPython réattribue l'id d'un modèle libéré au
+    modèle suivant, qui lirait alors les prédictions de l'ancien. Le jeton (uuid4)
+    est tiré à la première rencontre du modèle ; la référence faible vérifie qu'un
+    id connu désigne toujours le même objet.
+    """
+    key = id(model)
+    entry = _model_tokens.get(key)
+    if entry is not None and entry[0]() is model:
+        return entry[1]
+
+    token = uuid.uuid4().hex
+    try:
+        ref = weakref.ref(model, lambda _, key=key: _model_tokens.pop(key, None))
+    except TypeError:
+        # Objet sans référence faible : jeton porté par l'objet lui-même
+        try:
+            token = model.__dict__.setdefault('_cache_token', token)
+        except AttributeError:
+            pass  # Ni l'un ni l'autre : jeton neuf à chaque appel (pas de réutilisation)
+        return token
+    _model_tokens[key] = (ref, token)
+    return token
+
+
+class LRUCache:
+    """
+    Cache LRU thread-safe avec compteurs de hits/misses
+
+    Les valeurs sont retournées telles quelles (pas de copie) : ne pas les modifier.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None, accept=None):
+        """
+        Retourne la valeur (et la marque comme récente) ou `default`
+
+        Args:
+            accept: Prédicat optionnel ; une entrée refusée compte comme un miss
+                (ex: entrée sans les étapes de debug alors qu'elles sont demandées)
+        """
+        with self._lock:
+            if key in self._data and (accept is None or accept(self._data[key])):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Ajoute ou remplace une valeur, en évinçant la moins récemment utilisée"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Compteurs pour dimensionner le cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
+
+
+class PipelineCache:
+    """
+    Caches LRU des trois étapes coûteuses du pipeline
+
+    Exemple :
+        cache = PipelineCache()
+        predictor = Predictor(model, cache=cache)
+        cache.stats()  # {'rembg': {...}, 'canvas': {...}, 'predictions': {...}}
+    """
+
+    def __init__(self, rembg_size=8, canvas_size=32, predictions_size=256):
+        """
+        Args:
+            rembg_size: Nombre de sorties rembg conservées (images RGBA, les plus lourdes)
+            canvas_size: Nombre de résultats de prétraitement conservés (canvas, étapes, qualité)
+            predictions_size: Nombre de vecteurs de probabilités conservés
+        """
+        self.rembg = LRUCache(rembg_size)
+        self.canvas = LRUCache(canvas_size)
+        self.predictions = LRUCache(predictions_size)
+
+    def clear(self):
+        self.rembg.clear()
+        self.canvas.clear()
+        self.predictions.clear()
+
+    def stats(self):
+        """Hits, misses et taille de chaque étape"""
+        return {
+            'rembg': self.rembg.stats(),
+            'canvas': self.canvas.stats(),
+            'predictions': self.predictions.stats()
+        }
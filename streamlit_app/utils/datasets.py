@@ -0,0 +1,45 @@
+"""
+Chargement du dataset MNIST sans Keras
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Lit le fichier mnist.npz du cache de Keras (téléchargé au besoin
+              depuis la même URL) avec NumPy seul, pour que les pages qui
+              affichent des exemples MNIST n'importent pas TensorFlow.
+
+Résultat identique à keras.datasets.mnist.load_data().
+"""
+import os
+import shutil
+import tempfile
+import urllib.request
+
+import numpy as np
+
+MNIST_URL = "https://storage.googleapis.com/tensorflow/tf-keras-datasets/mnist.npz"
+
+
+def mnist_cache_path():
+    """Emplacement de mnist.npz dans le cache de Keras (KERAS_HOME, ~/.keras par défaut)"""
+    keras_home = os.environ.get("KERAS_HOME", os.path.join(os.path.expanduser("~"), ".keras"))
+    return os.path.join(keras_home, "datasets", "mnist.npz")
+
+
+def load_mnist():
+    """
+    Charge MNIST depuis le cache de Keras, en le téléchargeant s'il est absent
+
+    Returns:
+        tuple: ((x_train, y_train), (x_test, y_test)) en uint8, comme Keras
+    """
+    path = mnist_cache_path()
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Téléchargement dans un fichier temporaire puis renommage (pas de fichier partiel en cache)
+        with urllib.request.urlopen(MNIST_URL) as response, \
+                tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as tmp:
+            shutil.copyfileobj(response, tmp)
+        os.replace(tmp.name, path)
+
+    with np.load(path) as data:
+        return (data['x_train'], data['y_train']), (data['x_test'], data['y_test'])
@@ -7,7 +7,7 @@ Description : Pipeline de prétraitement et prédiction pour transformer des pho
               en images compatibles MNIST (28×28 grayscale)
 
 Le preprocessing utilise 11 étapes optimisées :
-1. Suppression du fond avec rembg (IA) - session cachée pour performance
+1. Suppression du fond avec rembg (IA) - pool de sessions partagé et préchargé (rembg_pool.py)
 2. Composition sur fond adaptatif (gère chiffres clairs/foncés)
 3. Conversion grayscale
 4. Débruitage gaussien adaptatif selon résolution
@@ -20,81 +20,179 @@ Le preprocessing utilise 11 étapes optimisées :
 11. Prédiction (avec option TTA)
 
 Fonctionnalités supplémentaires :
-- TTA (Test-Time Augmentation) : Moyenne 5 prédictions avec rotations légères (+0.2-0.4% précision)
+- Cascade : segmentation classique (seuillage + composantes connexes) sur les entrées propres,
+  rembg seulement si elle échoue (voir segmentation.py)
+- TTA (Test-Time Augmentation) : Moyenne 5 prédictions avec rotations légères (+0.2-0.4% précision),
+  variantes évaluées en un seul batch (voir tta.py, early exit optionnel)
 - Score de qualité : Évalue contraste, taille, aspect ratio pour détecter images problématiques
+- Predictor : Traitement en lot (une seule passe du modèle pour toutes les images)
+- Latence par étape : return_timings=True et callbacks d'export (voir profiling.py)
+- Cache LRU par étape (rembg, canvas, prédictions) indexé par le contenu (voir cache.py)
+- Backends : le modèle peut être Keras, TFLite (int8) ou ONNX Runtime (voir backends.py)
 
 Documentation complète : voir PREPROCESSING.md
 """
 import numpy as np
-import cv2
 from PIL import Image
-from rembg import remove, new_session
-from scipy import ndimage
 
-# Cache global pour les sessions rembg (évite de recréer à chaque appel)
-_rembg_sessions = {}
+from .backends import load_backend, load_app_model
+from .cache import PipelineCache, image_digest, array_digest, model_token
+from .preprocessing import calculate_preprocessing_quality, get_workspace
+from .rembg_pool import rembg_pool
+from .profiling import StageTimer, NULL_TIMER, has_timing_callbacks
+from .segmentation import classical_segmentation
+from .tta import TTAEngine, DEFAULT_TTA
 
-def calculate_preprocessing_quality(digit_gray, aspect_ratio, current_max_size):
+# Plus grand côté (en pixels) de l'image passée à rembg : U²-Net travaille de toute façon
+# en 320×320, inutile de lui donner les dizaines de mégapixels d'une photo de téléphone
+DEFAULT_REMBG_MAX_SIDE = 1024
+
+# Cache par étape partagé par predict_mnist (les reruns Streamlit retombent sur la même image)
+pipeline_cache = PipelineCache()
+
+def get_cache_stats():
+    """Hits/misses et taille des caches rembg, canvas et prédictions de predict_mnist"""
+    return pipeline_cache.stats()
+
+def apply_rotation(img_array, angle):
+    """Applique une rotation à une image numpy"""
+    from scipy import ndimage
+    return ndimage.rotate(img_array, angle, reshape=False, order=1)
+
+def run_model(model, batch, batch_size=256):
     """
-    Calcule un score de confiance pour le preprocessing
+    Passe du modèle sur un batch (B, 28, 28, 1) float32 → probabilités (B, 10)
 
-    Args:
-        digit_gray: Image en niveaux de gris du chiffre extrait
-        aspect_ratio: Ratio largeur/hauteur de la détection
-        current_max_size: Taille maximale du chiffre détecté
+    Utilise model.serve() s'il existe (SimpleCNN_MNIST compilé, backends
+    TFLite/ONNX de load_backend), sinon model.predict.
+    """
+    serve = getattr(model, 'serve', None)
+    if serve is not None:
+        return serve(batch)
+    return model.predict(batch, batch_size=batch_size, verbose=0)
 
-    Returns:
-        dict: Score de qualité avec métriques détaillées
+def cap_resolution(img, max_side):
     """
-    # Calcul du contraste (std de l'image)
-    contrast = float(np.std(digit_gray))
+    Réduit une image PIL pour que son plus grand côté ne dépasse pas max_side
 
-    # Score de contraste (bon si > 50)
-    contrast_score = min(contrast / 50.0, 1.0)
+    Returns:
+        tuple: (image, facteur d'échelle appliqué ≤ 1.0)
+    """
+    if not max_side or max(img.size) <= max_side:
+        return img, 1.0
+    scale = max_side / max(img.size)
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.BILINEAR, reducing_gap=2.0), scale
+
+def _top3(predictions):
+    """Top 3 [(digit, confidence), ...] à partir d'un vecteur de probabilités"""
+    top3_indices = np.argsort(predictions)[::-1][:3]
+    top3_confidences = predictions[top3_indices]
+    return list(zip(top3_indices, top3_confidences))
 
-    # Score de taille (bon si entre 50 et 500 pixels)
-    if 50 <= current_max_size <= 500:
-        size_score = 1.0
-    elif current_max_size < 50:
-        size_score = current_max_size / 50.0
+def _pack_result(top3, steps, quality_score, timings, return_steps, return_quality, return_timings=False):
+    """Assemble le retour selon les options (même format que predict_mnist)"""
+    if return_steps and return_quality:
+        result = (top3, steps, quality_score)
+    elif return_steps:
+        result = (top3, steps)
+    elif return_quality:
+        result = (top3, quality_score)
     else:
-        size_score = max(0.0, 1.0 - (current_max_size - 500) / 500.0)
+        result = top3
 
-    # Score d'aspect ratio (bon si entre 0.5 et 2.0)
-    if 0.5 <= aspect_ratio <= 2.0:
-        aspect_score = 1.0
-    else:
-        aspect_score = max(0.0, 1.0 - abs(aspect_ratio - 1.0) / 2.0)
-
-    # Score global (moyenne pondérée)
-    global_score = (contrast_score * 0.5 + size_score * 0.3 + aspect_score * 0.2)
-
-    # Déterminer le niveau de qualité
-    if global_score >= 0.75:
-        quality_level = "Excellente"
-    elif global_score >= 0.5:
-        quality_level = "Bonne"
-    elif global_score >= 0.3:
-        quality_level = "Moyenne"
+    if return_timings:
+        # Les latences sont toujours ajoutées en dernier élément du tuple
+        return (result if isinstance(result, tuple) else (result,)) + (timings,)
+    return result
+
+def preprocess_digit(img, rembg_model="u2netp", return_steps=False, return_quality=False, timer=NULL_TIMER,
+                     rembg_max_side=DEFAULT_REMBG_MAX_SIDE, rembg_backproject=False, cache=None,
+                     use_cascade=True):
+    """
+    Prétraitement MNIST-like d'une image PIL (étapes 0 à 10 de predict_mnist)
+
+    Args:
+        img: Image PIL
+        rembg_model: Modèle rembg à utiliser (voir predict_mnist)
+        return_steps: Si True, conserve les images de chaque étape
+        return_quality: Si True, calcule le score de qualité du preprocessing
+        timer: StageTimer recevant la latence de chaque étape (inactif par défaut)
+        rembg_max_side: Plus grand côté de l'image passée à rembg (None = résolution native)
+        rembg_backproject: Si True, le masque alpha calculé à résolution réduite est projeté
+            sur l'image d'origine et les étapes 1 à 10 tournent en pleine résolution.
+            Sinon (défaut), tout le pipeline tourne à la résolution réduite.
+        cache: PipelineCache optionnel (sortie rembg et canvas mémoïsés)
+        use_cascade: Si True, tente d'abord la segmentation classique (quelques ms) et
+            n'exécute rembg que si elle échoue au test de qualité
+
+    Returns:
+        tuple: (canvas, steps, quality_score)
+            - canvas : np.ndarray uint8 (28, 28), ou None si aucun chiffre exploitable
+            - steps : dict des étapes (None si return_steps=False)
+            - quality_score : dict (None si return_quality=False ou canvas None)
+    """
+
+    # --- Cache : clé = contenu de l'image + paramètres qui influencent l'étape ---
+    if cache is not None:
+        with timer.stage('cache'):
+            rembg_key = (image_digest(img), rembg_model, rembg_max_side, rembg_backproject, use_cascade)
+            # Les étapes 1 à 10 n'ont pas d'autre paramètre que ceux de l'étape 0
+            canvas_key = rembg_key
+            cached = cache.canvas.get(canvas_key, accept=lambda entry: not return_steps or entry[1] is not None)
+        if cached is not None:
+            canvas, steps, quality_score = cached
+            return canvas, (steps if return_steps else None), (quality_score if return_quality else None)
+        with timer.stage('cache'):
+            cached_rembg = cache.rembg.get(rembg_key)
     else:
-        quality_level = "Faible"
-
-    return {
-        'global_score': round(global_score, 2),
-        'quality_level': quality_level,
-        'contrast': round(contrast, 2),
-        'contrast_score': round(contrast_score, 2),
-        'size': current_max_size,
-        'size_score': round(size_score, 2),
-        'aspect_ratio': round(aspect_ratio, 2),
-        'aspect_score': round(aspect_score, 2)
-    }
+        cached_rembg = None
 
-def apply_rotation(img_array, angle):
-    """Applique une rotation à une image numpy"""
-    return ndimage.rotate(img_array, angle, reshape=False, order=1)
+    # --- 0. Isolation du chiffre : segmentation classique, puis rembg si nécessaire ---
+    if cached_rembg is not None:
+        img_no_bg, scale = cached_rembg
+    else:
+        # La résolution est plafonnée : la latence dépend de rembg_max_side, pas des mégapixels
+        with timer.stage('downscale'):
+            img_small, scale = cap_resolution(img, rembg_max_side)
+
+        # Entrées propres (dessins du canvas, scans) : seuillage + composantes connexes
+        img_no_bg = None
+        if use_cascade:
+            with timer.stage('segmentation'):
+                img_no_bg = classical_segmentation(img_small)
+
+        if img_no_bg is None:
+            # Fond complexe/texturé : suppression de l'arrière-plan avec rembg
+            # (session empruntée au pool partagé, rendue à la fin du bloc ; rembg et
+            # onnxruntime ne sont importés qu'ici, à la première image qui en a besoin)
+            with timer.stage('rembg'), rembg_pool.session(rembg_model) as session:
+                from rembg import remove
+                if scale < 1.0 and rembg_backproject:
+                    # Masque calculé en basse résolution puis projeté sur l'image d'origine
+                    mask = remove(img_small, session=session, only_mask=True)
+                    img_no_bg = img.convert("RGBA")
+                    img_no_bg.putalpha(mask.resize(img.size, Image.BILINEAR))
+                    scale = 1.0
+                else:
+                    img_no_bg = remove(img_small, session=session)  # Image RGBA avec fond transparent
+
+        if cache is not None:
+            cache.rembg.put(rembg_key, (img_no_bg, scale))
+
+    # --- 1 à 10. Prétraitement dans l'espace de travail du thread (buffers réutilisés) ---
+    # Avec cache, le score de qualité (peu coûteux) est toujours calculé pour être réutilisable
+    canvas, steps, quality_score = get_workspace().run(
+        img_no_bg, return_steps=return_steps, return_quality=return_quality or cache is not None,
+        timer=timer, size_scale=scale
+    )
+    if cache is not None:
+        cache.canvas.put(canvas_key, (canvas, steps, quality_score))
+    return canvas, steps, (quality_score if return_quality else None)
 
-def predict_mnist(img, model, return_steps=False, rembg_model="u2netp", use_tta=False, return_quality=False):
+def predict_mnist(img, model, return_steps=False, rembg_model="u2netp", use_tta=False, return_quality=False,
+                  return_timings=False, timing_callback=None, rembg_max_side=DEFAULT_REMBG_MAX_SIDE,
+                  use_cache=True, use_cascade=True):
     """
     Prédiction à partir d'une image PIL avec prétraitement MNIST-like robuste et optimisé
 
@@ -123,6 +221,8 @@ def predict_mnist(img, model, return_steps=False, rembg_model="u2netp", use_tta=
     - ✅ TTA (Test-Time Augmentation) pour gain de +0.2-0.4%
     - ✅ Score de qualité du preprocessing
 
+    Pour traiter plusieurs images d'un coup, utiliser Predictor.predict_batch.
+
     Args:
         img: Image PIL
         model: Modèle Keras chargé
@@ -131,252 +231,182 @@ def predict_mnist(img, model, return_steps=False, rembg_model="u2netp", use_tta=
             - "u2netp" (défaut, recommandé pour MNIST) : Léger et performant
             - "u2net" : Bon équilibre qualité/vitesse
             - "isnet-general-use" : Plus récent, meilleure qualité générale
-        use_tta: Si True, utilise Test-Time Augmentation (5 rotations, gain +0.2-0.4%, 5× plus lent)
+        use_tta: Si True, utilise Test-Time Augmentation (5 rotations évaluées en un seul batch, gain +0.2-0.4%).
+            Accepte aussi un TTAEngine pour configurer les variantes et l'early exit.
         return_quality: Si True, retourne le score de qualité du preprocessing
+        return_timings: Si True, ajoute en dernier élément la latence par étape
+            {'stages': {'rembg': ms, 'composition': ms, ..., 'inference': ms}, 'total_ms': ms}
+        timing_callback: Fonction appelée avec ce même dict (export des latences)
+        rembg_max_side: Plus grand côté de l'image passée à rembg (défaut 1024, None = natif).
+            Au-delà, l'image est réduite et tout le pipeline tourne à cette résolution.
+        use_cache: Si True (défaut), réutilise les sorties rembg, canvas et prédictions déjà
+            calculées pour la même image (cache partagé, voir get_cache_stats)
+        use_cascade: Si True (défaut), les entrées propres (dessins, scans sur fond uniforme)
+            sont segmentées par seuillage + composantes connexes, sans rembg
 
     Returns:
         Si return_steps=False et return_quality=False: list: Top 3 prédictions [(digit, confidence), ...]
         Si return_steps=True: tuple: (top3, steps_dict, [quality_dict si return_quality])
         Si return_quality=True: tuple: (top3, quality_dict, [steps_dict si return_steps])
+        quality_dict vaut None si aucun chiffre exploitable n'a été détecté.
+        Si return_timings=True, timings_dict est ajouté à la fin du tuple.
     """
+    predictor = Predictor(model, rembg_model=rembg_model, use_tta=use_tta, timing_callback=timing_callback,
+                          rembg_max_side=rembg_max_side, cache=pipeline_cache if use_cache else None,
+                          use_cascade=use_cascade)
+    return predictor.predict(img, return_steps=return_steps, return_quality=return_quality,
+                             return_timings=return_timings)
 
-    # Dictionnaire pour stocker les étapes (si demandé)
-    steps = {} if return_steps else None
-
-    # --- 0. Suppression automatique de l'arrière-plan avec rembg ---
-    # Cela isole le chiffre même avec fond complexe/texturé
-    # Utiliser une session cachée pour meilleure performance (évite recréation)
-    if rembg_model not in _rembg_sessions:
-        _rembg_sessions[rembg_model] = new_session(rembg_model)
-    session = _rembg_sessions[rembg_model]
-    img_no_bg = remove(img, session=session)  # Retourne une image RGBA avec fond transparent
-
-    # --- 1. Composer sur fond adaptatif (analyse du chiffre) ---
-    # Analyser les pixels non-transparents pour déterminer si le chiffre est clair ou foncé
-    img_rgba = img_no_bg.convert("RGBA")
-    pixels = np.array(img_rgba)
-    alpha_mask = pixels[:, :, 3] > 0  # Pixels non-transparents
-
-    if np.any(alpha_mask):
-        # Calculer la moyenne des pixels du chiffre (RGB seulement)
-        digit_pixels = pixels[alpha_mask][:, :3]  # RGB seulement
-        mean_digit_intensity = np.mean(digit_pixels)
-
-        # Si chiffre clair → fond noir, si chiffre foncé → fond blanc
-        # Cela garantit un bon contraste quelle que soit la couleur du chiffre
-        bg_color = (0, 0, 0) if mean_digit_intensity > 127 else (255, 255, 255)
-    else:
-        # Fallback : fond blanc par défaut si rien détecté
-        bg_color = (255, 255, 255)
-
-    bg = Image.new("RGB", img_no_bg.size, bg_color)
-    img_composite = Image.alpha_composite(bg.convert("RGBA"), img_rgba).convert("RGB")
-
-    if return_steps:
-        # Pour la visualisation
-        steps['0_background_removed'] = np.array(img_composite.convert("L"))
-
-    # --- 2. Passage en niveaux de gris ---
-    img_gray = np.array(img_composite.convert("L"))
-    if return_steps:
-        steps['1_grayscale'] = img_gray.copy()
-
-    # --- 3. Débruitage adaptatif ---
-    # Adapter le kernel selon la taille de l'image pour un débruitage optimal
-    kernel_size = max(3, min(7, img_gray.shape[0] // 100))
-    if kernel_size % 2 == 0:  # Le kernel doit être impair
-        kernel_size += 1
-    img_blur = cv2.GaussianBlur(img_gray, (kernel_size, kernel_size), 0)
-    if return_steps:
-        steps['2_blurred'] = img_blur.copy()
-
-    # --- 4. Détection automatique du type de fond (noir ou blanc) ---
-    # Calculer la moyenne de l'image pour savoir si fond clair ou foncé
-    mean_intensity = np.mean(img_blur)
-    is_light_background = mean_intensity > 127
-
-    # --- 5. Binarisation adaptée au fond (détection temporaire pour bounding box) ---
-    if is_light_background:
-        # Fond clair → BINARY_INV (chiffre noir devient blanc)
-        _, img_bin_temp = cv2.threshold(img_blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    else:
-        # Fond foncé → BINARY (chiffre blanc reste blanc)
-        _, img_bin_temp = cv2.threshold(img_blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-    if return_steps:
-        steps['3_binary_detection'] = img_bin_temp.copy()
-
-    # --- 6. Extraction de la région d'intérêt avec padding ---
-    coords = np.column_stack(np.where(img_bin_temp > 0))
-    if coords.size == 0:
-        # Cas pathologique : rien détecté
-        empty = np.zeros((1, 28, 28, 1), dtype=np.float32)
-        preds = model.predict(empty, verbose=0)[0]
-        top3 = np.argsort(preds)[::-1][:3]
-        if return_steps:
-            steps['4_cropped_grayscale'] = np.zeros((28, 28), dtype=np.uint8)
-            steps['5_resized'] = np.zeros((28, 28), dtype=np.uint8)
-            steps['6_final_28x28'] = np.zeros((28, 28), dtype=np.uint8)
-            return list(zip(top3, preds[top3])), steps
-        return list(zip(top3, preds[top3]))
-
-    y0, x0 = coords.min(axis=0)
-    y1, x1 = coords.max(axis=0)
-
-    # --- 6.1. Validation de la détection ---
-    # Vérifier que la forme détectée est raisonnable (pas trop déformée)
-    h_bbox, w_bbox = y1 - y0, x1 - x0
-    aspect_ratio = max(h_bbox, w_bbox) / max(1, min(h_bbox, w_bbox))
-
-    # Rejeter les détections avec aspect ratio aberrant (probablement pas un chiffre)
-    if aspect_ratio > 5:  # Trop allongé/déformé
-        # Retourner une prédiction vide
-        empty = np.zeros((1, 28, 28, 1), dtype=np.float32)
-        preds = model.predict(empty, verbose=0)[0]
-        top3 = np.argsort(preds)[::-1][:3]
-        if return_steps:
-            steps['4_cropped_grayscale'] = np.zeros((28, 28), dtype=np.uint8)
-            steps['5_resized'] = np.zeros((28, 28), dtype=np.uint8)
-            steps['6_final_28x28'] = np.zeros((28, 28), dtype=np.uint8)
-            return list(zip(top3, preds[top3])), steps
-        return list(zip(top3, preds[top3]))
-
-    # --- 6.2. Padding optimisé ---
-    # MNIST a généralement 4 pixels de marge, on optimise le padding
-    target_digit_size = 20  # Les chiffres MNIST font ~20×20
-    current_max_size = max(h_bbox, w_bbox)
-
-    # Calculer un padding qui amènera le chiffre vers 20×20 dans le canvas 28×28
-    if current_max_size > 0:
-        optimal_pad = max(2, int((28 - target_digit_size) / 2))
-        pad = int(max(h_bbox, w_bbox) * 0.1) + optimal_pad  # 10% + padding optimal
-    else:
-        pad = 2
-
-    y0 = max(0, y0 - pad)
-    y1 = min(img_blur.shape[0], y1 + pad)
-    x0 = max(0, x0 - pad)
-    x1 = min(img_blur.shape[1], x1 + pad)
-
-    # IMPORTANT : Extraire depuis l'image GRAYSCALE (pas binarisée)
-    digit_crop = img_blur[y0:y1+1, x0:x1+1]
-
-    # Inverser si fond clair (MNIST = blanc sur noir)
-    if is_light_background:
-        digit_gray = 255 - digit_crop
-    else:
-        digit_gray = digit_crop
-
-    # --- 7. Normaliser le contraste avec CLAHE ---
-    # CLAHE (Contrast Limited Adaptive Histogram Equalization) améliore le contraste
-    # tout en évitant l'amplification excessive du bruit
-    if digit_gray.max() > digit_gray.min():
-        # Étirement d'histogramme d'abord
-        digit_gray = ((digit_gray - digit_gray.min()) * 255.0 /
-                      (digit_gray.max() - digit_gray.min())).astype(np.uint8)
-
-        # Puis CLAHE pour améliorer les détails
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(4, 4))
-        digit_gray = clahe.apply(digit_gray)
-
-    # --- Calcul du score de qualité du preprocessing (si demandé) ---
-    quality_score = None
-    if return_quality:
-        quality_score = calculate_preprocessing_quality(digit_gray, aspect_ratio, current_max_size)
-
-    if return_steps:
-        steps['4_cropped_grayscale'] = digit_gray.copy()
-
-    # --- 8. Resize proportionnel vers 20×20 avec interpolation de qualité ---
-    h, w = digit_gray.shape
-    scale = 20.0 / max(h, w)
-    new_w = max(1, int(w * scale))
-    new_h = max(1, int(h * scale))
-
-    # Utiliser INTER_AREA pour shrinking (meilleur anti-aliasing)
-    digit_resized = cv2.resize(
-        digit_gray,
-        (new_w, new_h),
-        interpolation=cv2.INTER_AREA
-    )
-
-    if return_steps:
-        steps['5_resized'] = digit_resized.copy()
+class Predictor:
+    """
+    Prédicteur réutilisable pour le traitement d'images en lot
 
-    # --- 8. Centrage par centre de masse (comme MNIST) ---
-    canvas = np.zeros((28, 28), dtype=np.uint8)
+    Conserve le modèle, la session rembg et les réglages, puis classe tous les
+    canvas 28×28 d'un lot en une seule passe du modèle (au lieu d'un
+    model.predict par image).
 
-    # Calcul du centre de masse
-    M = cv2.moments(digit_resized)
-    if M["m00"] != 0:
-        cx_digit = M["m10"] / M["m00"]
-        cy_digit = M["m01"] / M["m00"]
-    else:
-        # Fallback : centre géométrique
-        cy_digit, cx_digit = np.array(digit_resized.shape) / 2
-
-    # Centrer dans le canvas 28×28
-    y_offset = int(14 - cy_digit)
-    x_offset = int(14 - cx_digit)
-
-    # Placer le chiffre (avec vérification des limites)
-    for i in range(digit_resized.shape[0]):
-        for j in range(digit_resized.shape[1]):
-            y_canvas = y_offset + i
-            x_canvas = x_offset + j
-            if 0 <= y_canvas < 28 and 0 <= x_canvas < 28:
-                canvas[y_canvas, x_canvas] = digit_resized[i, j]
-
-    # --- 9. Post-processing morphologique ---
-    # Légère opération de closing pour améliorer la forme et mieux matcher MNIST
-    # Cela comble les petits trous et lisse légèrement les contours
-    kernel = np.ones((2, 2), np.uint8)
-    canvas = cv2.morphologyEx(canvas, cv2.MORPH_CLOSE, kernel)
-
-    # --- 10. Préparation pour le modèle ---
-    # Le modèle attend [0, 255] en float32 (normalise lui-même avec mu=33.32, std=78.57)
-    if return_steps:
-        steps['6_final_28x28'] = canvas.copy()
-
-    img_array = canvas.astype(np.float32)
-    img_array = img_array[np.newaxis, ..., np.newaxis]  # (1, 28, 28, 1)
-
-    # --- 11. Prédiction (avec ou sans TTA) ---
-    if use_tta:
-        # Test-Time Augmentation : 5 rotations + moyenne
-        angles = [-5, -3, 0, 3, 5]  # Rotations légères en degrés
-        all_predictions = []
-
-        for angle in angles:
-            if angle == 0:
-                # Pas de rotation
-                pred = model.predict(img_array, verbose=0)[0]
-            else:
-                # Appliquer rotation
-                rotated = apply_rotation(canvas, angle)
-                rotated_array = rotated.astype(np.float32)[np.newaxis, ..., np.newaxis]
-                pred = model.predict(rotated_array, verbose=0)[0]
-
-            all_predictions.append(pred)
-
-        # Moyenne des 5 prédictions
-        predictions = np.mean(all_predictions, axis=0)
-    else:
-        # Prédiction simple (sans TTA)
-        predictions = model.predict(img_array, verbose=0)[0]
-
-    # --- 12. Top 3 ---
-    top3_indices = np.argsort(predictions)[::-1][:3]
-    top3_confidences = predictions[top3_indices]
-
-    top3 = list(zip(top3_indices, top3_confidences))
+    Exemple :
+        predictor = Predictor(model, rembg_model="u2netp")
+        results = predictor.predict_batch(images, return_quality=True)
+        for top3, quality in results:
+            ...
+    """
 
-    # --- 13. Return selon les options ---
-    if return_steps and return_quality:
-        return top3, steps, quality_score
-    elif return_steps:
-        return top3, steps
-    elif return_quality:
-        return top3, quality_score
-    else:
-        return top3
+    def __init__(self, model, rembg_model="u2netp", use_tta=False, batch_size=256, timing_callback=None,
+                 rembg_max_side=DEFAULT_REMBG_MAX_SIDE, rembg_backproject=False, cache=None,
+                 use_cascade=True):
+        """
+        Args:
+            model: Modèle Keras chargé
+            rembg_model: Modèle rembg à utiliser (voir predict_mnist)
+            use_tta: Si True, moyenne les prédictions sur 5 rotations légères.
+                Un TTAEngine permet de choisir les variantes et l'early exit.
+            batch_size: Taille de batch maximale passée à model.predict
+            timing_callback: Fonction appelée avec la latence par étape de chaque image
+            rembg_max_side: Plus grand côté de l'image passée à rembg (None = résolution native)
+            rembg_backproject: Si True, projette le masque basse résolution sur l'image
+                d'origine (étapes 1 à 10 en pleine résolution)
+            cache: PipelineCache optionnel (rembg, canvas et prédictions mémoïsés)
+            use_cascade: Si True, segmentation classique d'abord, rembg seulement si elle échoue
+        """
+        self.model = model
+        self.rembg_model = rembg_model
+        self.use_tta = use_tta
+        self.batch_size = batch_size
+        self.timing_callback = timing_callback
+        self.rembg_max_side = rembg_max_side
+        self.rembg_backproject = rembg_backproject
+        self.cache = cache
+        self.use_cascade = use_cascade
+
+        if isinstance(use_tta, TTAEngine):
+            self.tta = use_tta
+        else:
+            self.tta = DEFAULT_TTA if use_tta else None
+
+    def _forward(self, batch):
+        """Passe du modèle sur un batch (B, 28, 28, 1) float32"""
+        return run_model(self.model, batch, batch_size=self.batch_size)
+
+    def _classify(self, canvases, detected):
+        """Probabilités (N, 10) pour des canvas (N, 28, 28), TTA seulement si détecté"""
+        if self.tta is not None:
+            return self.tta.predict(canvases, self._forward, augment_mask=detected)
+        return self._forward(canvases.astype(np.float32)[..., np.newaxis])
+
+    def predict_canvases(self, canvases, detected):
+        """
+        Probabilités (N, 10) pour des canvas déjà prétraités, en une passe du modèle
+
+        Comme _classify, en ne calculant que les canvas absents du cache des prédictions.
+
+        Args:
+            canvases: Canvas (N, 28, 28) uint8
+            detected: Booléens (N,), False = aucun chiffre détecté (pas de TTA)
+        """
+        if self.cache is None:
+            return self._classify(canvases, detected)
+
+        # Clé : contenu du canvas + modèle + configuration TTA
+        tta_key = self.tta.cache_key if self.tta is not None else None
+        model_key = model_token(self.model)
+        keys = [(array_digest(canvas), model_key, tta_key if is_detected else None)
+                for canvas, is_detected in zip(canvases, detected)]
+        cached = [self.cache.predictions.get(key) for key in keys]
+
+        missing = [i for i, predictions in enumerate(cached) if predictions is None]
+        if missing:
+            computed = self._classify(canvases[missing], detected[missing])
+            for i, predictions in zip(missing, computed):
+                cached[i] = predictions
+                self.cache.predictions.put(keys[i], predictions)
+        return np.stack(cached)
+
+    def preprocess(self, img, return_steps=False, return_quality=False, timer=NULL_TIMER):
+        """
+        Prétraitement d'une image avec les réglages du prédicteur
+
+        Returns:
+            tuple: (canvas 28×28 ou None si aucun chiffre, steps, quality)
+        """
+        return preprocess_digit(img, self.rembg_model, return_steps=return_steps, return_quality=return_quality,
+                                timer=timer, rembg_max_side=self.rembg_max_side,
+                                rembg_backproject=self.rembg_backproject, cache=self.cache,
+                                use_cascade=self.use_cascade)
+
+    def predict(self, img, return_steps=False, return_quality=False, return_timings=False):
+        """Prédiction pour une seule image (même retour que predict_mnist)"""
+        return self.predict_batch([img], return_steps=return_steps, return_quality=return_quality,
+                                  return_timings=return_timings)[0]
+
+    def predict_batch(self, images, return_steps=False, return_quality=False, return_timings=False):
+        """
+        Prédiction pour une liste d'images PIL en une seule passe du modèle
+
+        Args:
+            images: Liste d'images PIL
+            return_steps: Si True, retourne aussi les étapes pour chaque image
+            return_quality: Si True, retourne aussi le score de qualité pour chaque image
+            return_timings: Si True, retourne aussi la latence par étape pour chaque image
+                (l'étape 'inference' est la part de l'image dans la passe du batch)
+
+        Returns:
+            list: Un résultat par image, au même format que predict_mnist
+        """
+        images = list(images)
+        if not images:
+            return []
+
+        # Chronométrage seulement s'il est demandé ou exporté
+        measure = return_timings or self.timing_callback is not None or has_timing_callbacks()
+        timers = [StageTimer() if measure else NULL_TIMER for _ in images]
+
+        # --- Prétraitement image par image ---
+        preprocessed = [
+            self.preprocess(img, return_steps=return_steps, return_quality=return_quality, timer=timer)
+            for img, timer in zip(images, timers)
+        ]
+
+        # --- Construction du batch ---
+        # Aucun chiffre détecté : prédiction sur un canvas vide (sans TTA)
+        detected = np.array([canvas is not None for canvas, _, _ in preprocessed])
+        canvases = np.stack([
+            canvas if canvas is not None else np.zeros((28, 28), dtype=np.uint8)
+            for canvas, _, _ in preprocessed
+        ])  # (N, 28, 28)
+
+        # --- Une seule passe du modèle pour tout le lot (variantes TTA incluses) ---
+        batch_timer = StageTimer()
+        with batch_timer.stage('inference'):
+            all_predictions = self.predict_canvases(canvases, detected)
+
+        # --- Top 3 par image ---
+        results = []
+        for predictions, (_, steps, quality_score), timer in zip(all_predictions, preprocessed, timers):
+            timings = None
+            if measure:
+                timer.add('inference', batch_timer.total_ms / len(images))
+                timings = timer.emit(self.timing_callback)
+            results.append(_pack_result(_top3(predictions), steps, quality_score, timings,
+                                        return_steps, return_quality, return_timings))
+        return results
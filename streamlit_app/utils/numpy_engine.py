@@ -0,0 +1,125 @@
+"""
+Moteur d'inférence NumPy pour SimpleCNN_MNIST
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Exécute le CNN sans TensorFlow, à partir des poids repliés
+              (BatchNorm et normalisation absorbées dans les convolutions)
+              produits par training/utils/folding.py.
+
+Chaque bloc est une convolution 3×3 calculée en im2col + GEMM (un seul produit
+matriciel BLAS par couche et par batch), suivie d'un ReLU et éventuellement
+d'un max-pool 2×2. Sans l'import de TensorFlow, le démarrage à froid et la
+mémoire résidente des workers d'inférence diminuent fortement.
+
+Exemple :
+    engine = NumpyCNN.from_npz('models/mnist_cnn_folded.npz')
+    probs = engine.serve(batch)   # (N, 28, 28, 1) en [0, 255] → (N, 10)
+"""
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+def _im2col_3x3(x, pad_value):
+    """
+    Patchs 3×3 (padding 'same') de chaque pixel, en une matrice pour le GEMM
+
+    Args:
+        x: Activations (N, H, W, C) float32
+        pad_value: Valeur du padding (mu pour la première couche repliée, 0 ensuite)
+
+    Returns:
+        np.ndarray: (N·H·W, 9·C), colonnes dans l'ordre du noyau Keras (kh, kw, c)
+    """
+    n, h, w, c = x.shape
+    padded = np.full((n, h + 2, w + 2, c), pad_value, dtype=np.float32)
+    padded[:, 1:-1, 1:-1] = x
+    sn, sh, sw, sc = padded.strides
+    patches = as_strided(padded, shape=(n, h, w, 3, 3, c), strides=(sn, sh, sw, sh, sw, sc), writeable=False)
+    return patches.reshape(n * h * w, 9 * c)
+
+
+def _max_pool_2x2(x):
+    """Max-pool 2×2 de pas 2 (N, H, W, C) → (N, H/2, W/2, C)"""
+    out = np.maximum(x[:, 0::2, 0::2], x[:, 0::2, 1::2])
+    np.maximum(out, x[:, 1::2, 0::2], out=out)
+    np.maximum(out, x[:, 1::2, 1::2], out=out)
+    return out
+
+
+class NumpyCNN:
+    """
+    SimpleCNN_MNIST en inférence pure NumPy
+
+    Expose serve(batch) comme les backends de backends.py : utilisable partout
+    où le modèle Keras est attendu (predict_mnist, Predictor, run_model).
+    """
+
+    name = 'numpy'
+
+    def __init__(self, weights, max_batch=128):
+        """
+        Args:
+            weights: Poids repliés (dict ou NpzFile) de training/utils/folding.py
+            max_batch: Taille maximale des sous-batchs (borne la mémoire de l'im2col)
+        """
+        self.layers = []
+        i = 1
+        while f'conv{i}_kernel' in weights:
+            kernel = np.asarray(weights[f'conv{i}_kernel'], dtype=np.float32)
+            self.layers.append((
+                np.ascontiguousarray(kernel.reshape(-1, kernel.shape[-1])),
+                np.asarray(weights[f'conv{i}_bias'], dtype=np.float32),
+                bool(weights['pools'][i - 1])
+            ))
+            i += 1
+        self.fc_kernel = np.asarray(weights['fc_kernel'], dtype=np.float32)
+        self.fc_bias = np.asarray(weights['fc_bias'], dtype=np.float32)
+        self.pad_value = float(weights['pad_value'])
+        self.max_batch = max_batch
+
+    @classmethod
+    def from_npz(cls, path, **kwargs):
+        """Charge les poids repliés enregistrés par save_folded_weights"""
+        with np.load(path) as weights:
+            return cls(dict(weights), **kwargs)
+
+    def _forward(self, x):
+        """Passe avant d'un sous-batch (N, 28, 28, 1) → probabilités (N, 10)"""
+        n = len(x)
+        pad_value = self.pad_value
+        for kernel, bias, pool in self.layers:
+            h, w = x.shape[1:3]
+            x = (_im2col_3x3(x, pad_value) @ kernel).reshape(n, h, w, -1)
+            if pool:
+                # Le max-pool commute avec le biais (par canal) et le ReLU : pooler d'abord
+                # divise par 4 le coût des deux opérations suivantes
+                x = _max_pool_2x2(x)
+            x += bias
+            np.maximum(x, 0.0, out=x)
+            # Après la première couche, le padding 'same' est à nouveau un padding à zéro
+            pad_value = 0.0
+
+        logits = x.mean(axis=(1, 2)) @ self.fc_kernel + self.fc_bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        return probs
+
+    def serve(self, batch):
+        """
+        Inférence batchée
+
+        Args:
+            batch: (N, 28, 28, 1) en [0, 255]
+
+        Returns:
+            np.ndarray: Probabilités (N, num_classes) float32
+        """
+        batch = np.asarray(batch, dtype=np.float32)
+        if len(batch) == 0:
+            return np.zeros((0, self.fc_kernel.shape[1]), dtype=np.float32)
+        return np.concatenate([
+            self._forward(batch[start:start + self.max_batch])
+            for start in range(0, len(batch), self.max_batch)
+        ])
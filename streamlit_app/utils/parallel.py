@@ -0,0 +1,209 @@
+"""
+Prétraitement en lot sur un pool de processus
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Répartit le prétraitement (rembg, flou, Otsu, CLAHE, resize,
+              morphologie) sur plusieurs processus pour les traitements en lot.
+              Les workers écrivent les canvas 28×28 dans un buffer en mémoire
+              partagée que le processus d'inférence lit sans copie ni sérialisation.
+
+Dans un seul processus, ces étapes partagent le GIL avec les parties Python du
+pipeline ; réparties sur des processus, le débit du prétraitement suit le nombre
+de cœurs. Le modèle reste dans le processus principal (une passe batchée).
+
+Exemple :
+    predictor = Predictor(model)
+    with ParallelPreprocessor(processes=8) as preprocessor:
+        results = preprocessor.predict_batch(predictor, paths, return_quality=True)
+"""
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from .inference import DEFAULT_REMBG_MAX_SIDE, preprocess_digit, _pack_result, _top3
+
+
+class SharedCanvasBuffer:
+    """
+    Batch de canvas (N, 28, 28) uint8 + indicateurs de détection (N,) en mémoire partagée
+
+    Le processus qui crée le buffer le libère avec close() (ou un bloc with) ;
+    les workers s'y attachent par son nom.
+    """
+
+    def __init__(self, capacity, name=None):
+        """
+        Args:
+            capacity: Nombre de canvas
+            name: Nom d'un buffer existant (worker) ; None = création
+        """
+        self.capacity = capacity
+        self._owner = name is None
+        size = max(1, capacity * (28 * 28 + 1))
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+        self.canvases = np.ndarray((capacity, 28, 28), dtype=np.uint8, buffer=self._shm.buf)
+        self.detected = np.ndarray((capacity,), dtype=np.bool_, buffer=self._shm.buf, offset=capacity * 28 * 28)
+        if self._owner:
+            self.canvases.fill(0)
+            self.detected.fill(False)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def close(self):
+        """Détache le buffer (et le supprime s'il a été créé ici)"""
+        # Les vues NumPy doivent disparaître avant la fermeture du segment
+        self.canvases = self.detected = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Réglages du prétraitement dans chaque worker (fixés par l'initializer du pool)
+_worker_settings = {}
+
+
+def _init_worker(settings):
+    _worker_settings.update(settings)
+
+
+def _open_image(image):
+    """Image PIL depuis une image, un chemin ou des octets encodés"""
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, (bytes, bytearray)):
+        image = io.BytesIO(image)
+    img = Image.open(image)
+    img.load()
+    return img
+
+
+def _preprocess_chunk(buffer_name, capacity, items, return_quality):
+    """
+    Prétraite un groupe d'images (dans un worker) et écrit leurs canvas dans le buffer
+
+    Returns:
+        list: (index, score de qualité) pour chaque image du groupe
+    """
+    buffer = SharedCanvasBuffer(capacity, name=buffer_name)
+    try:
+        qualities = []
+        for index, image in items:
+            canvas, _, quality = preprocess_digit(_open_image(image), return_quality=return_quality,
+                                                  **_worker_settings)
+            if canvas is not None:
+                buffer.canvases[index] = canvas
+                buffer.detected[index] = True
+            qualities.append((index, quality))
+        return qualities
+    finally:
+        buffer.close()
+
+
+class ParallelPreprocessor:
+    """Pool de processus de prétraitement (réutilisable d'un lot à l'autre)"""
+
+    def __init__(self, processes=None, rembg_model="u2netp", rembg_max_side=DEFAULT_REMBG_MAX_SIDE,
+                 rembg_backproject=False, use_cascade=True, chunks_per_process=4, start_method="spawn"):
+        """
+        Args:
+            processes: Nombre de processus (défaut : nombre de cœurs)
+            rembg_model: Modèle rembg (une session par processus)
+            rembg_max_side: Plus grand côté de l'image passée à rembg
+            rembg_backproject: Voir preprocess_digit
+            use_cascade: Segmentation classique d'abord, rembg seulement si elle échoue
+            chunks_per_process: Groupes d'images par processus et par lot (équilibrage)
+            start_method: 'spawn' par défaut : les workers n'héritent pas de l'état
+                de TensorFlow du processus principal
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.chunks_per_process = chunks_per_process
+        settings = {'rembg_model': rembg_model, 'rembg_max_side': rembg_max_side,
+                    'rembg_backproject': rembg_backproject, 'use_cascade': use_cascade}
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(settings,)
+        )
+
+    def preprocess(self, images, return_quality=False):
+        """
+        Prétraite un lot dans le pool
+
+        Args:
+            images: Images PIL, chemins de fichiers ou octets encodés (PNG/JPEG).
+                Les chemins évitent de transférer les pixels aux workers.
+            return_quality: Si True, calcule aussi le score de qualité
+
+        Returns:
+            tuple: (SharedCanvasBuffer à fermer par l'appelant, scores de qualité ou None)
+        """
+        images = list(images)
+        buffer = SharedCanvasBuffer(len(images))
+        try:
+            n_chunks = min(len(images), self.processes * self.chunks_per_process)
+            items = list(enumerate(images))
+            chunks = [items[i::n_chunks] for i in range(n_chunks)]
+            futures = [
+                self._executor.submit(_preprocess_chunk, buffer.name, len(images), chunk, return_quality)
+                for chunk in chunks
+            ]
+
+            qualities = [None] * len(images)
+            for future in futures:
+                for index, quality in future.result():
+                    qualities[index] = quality
+        except BaseException:
+            buffer.close()
+            raise
+        return buffer, (qualities if return_quality else None)
+
+    def predict_batch(self, predictor, images, return_quality=False):
+        """
+        Prétraitement parallèle puis une passe du modèle sur le buffer partagé
+
+        Args:
+            predictor: Predictor (modèle, TTA, cache des prédictions)
+            images: Voir preprocess()
+            return_quality: Si True, retourne aussi le score de qualité
+
+        Returns:
+            list: Un résultat par image, au format de predict_mnist (sans étapes)
+        """
+        images = list(images)
+        if not images:
+            return []
+
+        buffer, qualities = self.preprocess(images, return_quality=return_quality)
+        with buffer:
+            # Lecture directe des canvas écrits par les workers (aucune copie)
+            all_predictions = predictor.predict_canvases(buffer.canvases, buffer.detected)
+
+        qualities = qualities or [None] * len(images)
+        return [
+            _pack_result(_top3(predictions), None, quality, None, False, return_quality)
+            for predictions, quality in zip(all_predictions, qualities)
+        ]
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
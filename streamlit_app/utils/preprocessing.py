@@ -0,0 +1,309 @@
+"""
+Prétraitement MNIST-like sans allocations superflues
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Étapes 1 à 10 du pipeline (après rembg) exécutées dans un espace de travail
+              réutilisable : buffers préalloués, opérations OpenCV en place, placement
+              vectorisé dans le canvas 28×28.
+
+Par rapport à la version PIL/NumPy d'origine :
+- Une seule conversion PIL → NumPy (au lieu de convert/alpha_composite/convert/np.array)
+- Composition sur fond adaptatif calculée directement en niveaux de gris
+- Bounding box via cv2.boundingRect (pas de tableau de coordonnées pleine résolution)
+- Étirement de contraste en une passe (cv2.convertScaleAbs), sans temporaires float
+- Copies des étapes de debug uniquement si return_steps=True
+
+Un espace de travail n'est pas thread-safe : utiliser get_workspace() (un par thread).
+"""
+import threading
+
+import numpy as np
+import cv2
+from PIL import Image
+
+from .profiling import NULL_TIMER
+
+
+def calculate_preprocessing_quality(digit_gray, aspect_ratio, current_max_size):
+    """
+    Calcule un score de confiance pour le preprocessing
+
+    Args:
+        digit_gray: Image en niveaux de gris du chiffre extrait
+        aspect_ratio: Ratio largeur/hauteur de la détection
+        current_max_size: Taille maximale du chiffre détecté
+
+    Returns:
+        dict: Score de qualité avec métriques détaillées
+    """
+    # Calcul du contraste (std de l'image, sans temporaire float pleine taille)
+    contrast = float(cv2.meanStdDev(digit_gray)[1][0, 0])
+
+    # Score de contraste (bon si > 50)
+    contrast_score = min(contrast / 50.0, 1.0)
+
+    # Score de taille (bon si entre 50 et 500 pixels)
+    if 50 <= current_max_size <= 500:
+        size_score = 1.0
+    elif current_max_size < 50:
+        size_score = current_max_size / 50.0
+    else:
+        size_score = max(0.0, 1.0 - (current_max_size - 500) / 500.0)
+
+    # Score d'aspect ratio (bon si entre 0.5 et 2.0)
+    if 0.5 <= aspect_ratio <= 2.0:
+        aspect_score = 1.0
+    else:
+        aspect_score = max(0.0, 1.0 - abs(aspect_ratio - 1.0) / 2.0)
+
+    # Score global (moyenne pondérée)
+    global_score = (contrast_score * 0.5 + size_score * 0.3 + aspect_score * 0.2)
+
+    # Déterminer le niveau de qualité
+    if global_score >= 0.75:
+        quality_level = "Excellente"
+    elif global_score >= 0.5:
+        quality_level = "Bonne"
+    elif global_score >= 0.3:
+        quality_level = "Moyenne"
+    else:
+        quality_level = "Faible"
+
+    return {
+        'global_score': round(global_score, 2),
+        'quality_level': quality_level,
+        'contrast': round(contrast, 2),
+        'contrast_score': round(contrast_score, 2),
+        'size': current_max_size,
+        'size_score': round(size_score, 2),
+        'aspect_ratio': round(aspect_ratio, 2),
+        'aspect_score': round(aspect_score, 2)
+    }
+
+
+def empty_steps(steps):
+    """Complète les étapes de visualisation quand aucun chiffre n'est détecté"""
+    steps['4_cropped_grayscale'] = np.zeros((28, 28), dtype=np.uint8)
+    steps['5_resized'] = np.zeros((28, 28), dtype=np.uint8)
+    steps['6_final_28x28'] = np.zeros((28, 28), dtype=np.uint8)
+
+
+class PreprocessWorkspace:
+    """
+    Espace de travail réutilisable pour les étapes 1 à 10 du prétraitement
+
+    Les buffers pleine résolution sont alloués une fois puis réutilisés (et
+    agrandis seulement si une image plus grande arrive).
+
+    Exemple :
+        workspace = PreprocessWorkspace()
+        canvas, steps, quality = workspace.run(img_no_bg, return_quality=True)
+    """
+
+    def __init__(self):
+        self._buffers = {}
+        self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(4, 4))
+        self._close_kernel = np.ones((2, 2), np.uint8)
+        self._canvas = np.zeros((28, 28), dtype=np.uint8)
+
+    def _buffer(self, name, shape):
+        """Vue uint8 contiguë de forme `shape` sur un buffer réutilisé"""
+        size = int(np.prod(shape))
+        buf = self._buffers.get(name)
+        if buf is None or buf.size < size:
+            buf = np.empty(size, dtype=np.uint8)
+            self._buffers[name] = buf
+        return buf[:size].reshape(shape)
+
+    def run(self, img_no_bg, return_steps=False, return_quality=False, timer=NULL_TIMER, size_scale=1.0):
+        """
+        Exécute les étapes 1 à 10 sur la sortie de rembg
+
+        Chaque étape nommée est chronométrée par `timer` : composition, blur,
+        threshold, bbox, contrast, resize, centering, morphology.
+
+        Args:
+            img_no_bg: Image PIL RGBA (fond transparent) ou tableau (H, W, 4) uint8
+            return_steps: Si True, conserve une copie des images de chaque étape
+            return_quality: Si True, calcule le score de qualité du preprocessing
+            timer: StageTimer recevant la latence de chaque étape (inactif par défaut)
+            size_scale: Facteur de réduction déjà appliqué à l'image (la taille du chiffre
+                du score de qualité est exprimée en pixels de l'image d'origine)
+
+        Returns:
+            tuple: (canvas, steps, quality_score)
+                - canvas : np.ndarray uint8 (28, 28), ou None si aucun chiffre exploitable
+                - steps : dict des étapes (None si return_steps=False)
+                - quality_score : dict (None si return_quality=False ou canvas None)
+        """
+        steps = {} if return_steps else None
+
+        with timer.stage('composition'):
+            # Unique conversion PIL → NumPy
+            if isinstance(img_no_bg, Image.Image):
+                if img_no_bg.mode != "RGBA":
+                    img_no_bg = img_no_bg.convert("RGBA")
+                rgba = np.asarray(img_no_bg)
+            else:
+                rgba = np.ascontiguousarray(img_no_bg)
+            shape = rgba.shape[:2]
+
+            # --- 1. Composer sur fond adaptatif (analyse du chiffre) ---
+            alpha = cv2.extractChannel(rgba, 3, dst=self._buffer('alpha', shape))
+
+            if cv2.countNonZero(alpha) > 0:
+                # Moyenne RGB des pixels non-transparents (alpha sert de masque)
+                mean_digit_intensity = sum(cv2.mean(rgba, mask=alpha)[:3]) / 3.0
+                # Si chiffre clair → fond noir, si chiffre foncé → fond blanc
+                light_digit = mean_digit_intensity > 127
+            else:
+                # Fallback : fond blanc par défaut si rien détecté
+                light_digit = False
+
+            # --- 2. Passage en niveaux de gris (composition faite directement en gris) ---
+            # gris = gris_chiffre × α/255 + fond × (1 − α/255)
+            img_gray = cv2.cvtColor(rgba, cv2.COLOR_RGBA2GRAY, dst=self._buffer('gray', shape))
+            cv2.multiply(img_gray, alpha, dst=img_gray, scale=1.0 / 255)
+            if not light_digit:
+                # Fond blanc : ajouter 255 − α (saturé)
+                cv2.add(img_gray, cv2.bitwise_not(alpha, dst=alpha), dst=img_gray)
+
+        if return_steps:
+            steps['0_background_removed'] = img_gray.copy()
+            steps['1_grayscale'] = img_gray.copy()
+
+        # --- 3. Débruitage adaptatif ---
+        with timer.stage('blur'):
+            kernel_size = max(3, min(7, shape[0] // 100))
+            if kernel_size % 2 == 0:  # Le kernel doit être impair
+                kernel_size += 1
+            img_blur = cv2.GaussianBlur(img_gray, (kernel_size, kernel_size), 0,
+                                        dst=self._buffer('blur', shape))
+        if return_steps:
+            steps['2_blurred'] = img_blur.copy()
+
+        with timer.stage('threshold'):
+            # --- 4. Détection automatique du type de fond (noir ou blanc) ---
+            is_light_background = cv2.mean(img_blur)[0] > 127
+
+            # --- 5. Binarisation Otsu temporaire (réutilise le buffer des niveaux de gris) ---
+            thresh_type = cv2.THRESH_BINARY_INV if is_light_background else cv2.THRESH_BINARY
+            _, img_bin_temp = cv2.threshold(img_blur, 0, 255, thresh_type + cv2.THRESH_OTSU, dst=img_gray)
+
+        if return_steps:
+            steps['3_binary_detection'] = img_bin_temp.copy()
+
+        # --- 6. Extraction de la région d'intérêt ---
+        with timer.stage('bbox'):
+            found = cv2.countNonZero(img_bin_temp) > 0
+            if found:
+                x0, y0, w_rect, h_rect = cv2.boundingRect(img_bin_temp)
+                y1, x1 = y0 + h_rect - 1, x0 + w_rect - 1
+
+        if not found:
+            # Cas pathologique : rien détecté
+            if return_steps:
+                empty_steps(steps)
+            return None, steps, None
+
+        # --- 6.1. Validation de la détection ---
+        h_bbox, w_bbox = y1 - y0, x1 - x0
+        aspect_ratio = max(h_bbox, w_bbox) / max(1, min(h_bbox, w_bbox))
+
+        if aspect_ratio > 5:  # Trop allongé/déformé
+            if return_steps:
+                empty_steps(steps)
+            return None, steps, None
+
+        # --- 6.2. Padding optimisé (chiffre ~20×20 dans le canvas 28×28) ---
+        target_digit_size = 20
+        current_max_size = max(h_bbox, w_bbox)
+        if current_max_size > 0:
+            optimal_pad = max(2, int((28 - target_digit_size) / 2))
+            pad = int(current_max_size * 0.1) + optimal_pad
+        else:
+            pad = 2
+
+        y0 = max(0, y0 - pad)
+        y1 = min(shape[0], y1 + pad)
+        x0 = max(0, x0 - pad)
+        x1 = min(shape[1], x1 + pad)
+
+        with timer.stage('contrast'):
+            # Extraire depuis l'image GRAYSCALE (pas binarisée), inversée si fond clair
+            digit_crop = img_blur[y0:y1+1, x0:x1+1]
+            digit_gray = self._buffer('digit', digit_crop.shape)
+            if is_light_background:
+                cv2.bitwise_not(digit_crop, dst=digit_gray)
+            else:
+                np.copyto(digit_gray, digit_crop)
+
+            # --- 7. Étirement d'histogramme en place puis CLAHE ---
+            min_val, max_val = cv2.minMaxLoc(digit_gray)[:2]
+            if max_val > min_val:
+                alpha_scale = 255.0 / (max_val - min_val)
+                cv2.convertScaleAbs(digit_gray, dst=digit_gray, alpha=alpha_scale, beta=-min_val * alpha_scale)
+                self._clahe.apply(digit_gray, dst=digit_gray)
+
+        quality_score = None
+        if return_quality:
+            quality_score = calculate_preprocessing_quality(digit_gray, aspect_ratio,
+                                                            int(round(current_max_size / size_scale)))
+
+        if return_steps:
+            steps['4_cropped_grayscale'] = digit_gray.copy()
+
+        # --- 8. Resize proportionnel vers 20×20 (INTER_AREA) ---
+        with timer.stage('resize'):
+            h, w = digit_gray.shape
+            scale = 20.0 / max(h, w)
+            new_w = max(1, int(w * scale))
+            new_h = max(1, int(h * scale))
+            digit_resized = cv2.resize(digit_gray, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+        if return_steps:
+            steps['5_resized'] = digit_resized.copy()
+
+        # --- 9. Centrage par centre de masse, placement vectorisé ---
+        with timer.stage('centering'):
+            M = cv2.moments(digit_resized)
+            if M["m00"] != 0:
+                cx_digit = M["m10"] / M["m00"]
+                cy_digit = M["m01"] / M["m00"]
+            else:
+                cy_digit, cx_digit = new_h / 2, new_w / 2
+
+            y_offset = int(14 - cy_digit)
+            x_offset = int(14 - cx_digit)
+
+            # Intersection entre le chiffre décalé et le canvas 28×28
+            canvas = self._canvas
+            canvas.fill(0)
+            cy0, cx0 = max(0, y_offset), max(0, x_offset)
+            cy1, cx1 = min(28, y_offset + new_h), min(28, x_offset + new_w)
+            if cy1 > cy0 and cx1 > cx0:
+                canvas[cy0:cy1, cx0:cx1] = digit_resized[cy0 - y_offset:cy1 - y_offset,
+                                                         cx0 - x_offset:cx1 - x_offset]
+
+        # --- 10. Post-processing morphologique (closing léger) ---
+        with timer.stage('morphology'):
+            # Nouveau tableau 28×28 : le canvas retourné n'est pas partagé avec le workspace
+            canvas = cv2.morphologyEx(canvas, cv2.MORPH_CLOSE, self._close_kernel)
+
+        if return_steps:
+            steps['6_final_28x28'] = canvas.copy()
+
+        return canvas, steps, quality_score
+
+
+# Un espace de travail par thread (les sessions Streamlit tournent dans des threads distincts)
+_local = threading.local()
+
+
+def get_workspace():
+    """Retourne l'espace de travail du thread courant (créé au premier appel)"""
+    workspace = getattr(_local, 'workspace', None)
+    if workspace is None:
+        workspace = _local.workspace = PreprocessWorkspace()
+    return workspace
@@ -0,0 +1,98 @@
+"""
+Chronométrage par étape du pipeline de prédiction
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Mesure la latence de chaque étape nommée (rembg, débruitage, CLAHE,
+              inférence, ...) et la transmet aux callbacks enregistrés pour l'export
+              (logs, métriques, fichiers).
+
+Exemple :
+    from utils.profiling import add_timing_callback
+    add_timing_callback(lambda timings: logger.info(timings))
+
+    top3, timings = predict_mnist(image, model, return_timings=True)
+    timings['stages']   # {'rembg': 412.3, 'blur': 3.1, ..., 'inference': 1.4} (ms)
+"""
+import time
+from contextlib import contextmanager
+
+# Callbacks globaux appelés à la fin de chaque prédiction : fn(timings_dict)
+_timing_callbacks = []
+
+
+def add_timing_callback(callback):
+    """Enregistre un callback appelé avec le dict de latences de chaque prédiction"""
+    if callback not in _timing_callbacks:
+        _timing_callbacks.append(callback)
+
+
+def remove_timing_callback(callback):
+    """Retire un callback enregistré avec add_timing_callback"""
+    if callback in _timing_callbacks:
+        _timing_callbacks.remove(callback)
+
+
+def has_timing_callbacks():
+    """True si au moins un callback global est enregistré"""
+    return bool(_timing_callbacks)
+
+
+class StageTimer:
+    """
+    Accumule la durée des étapes nommées d'une prédiction (en millisecondes)
+
+    Exemple :
+        timer = StageTimer()
+        with timer.stage('blur'):
+            ...
+        timer.as_dict()  # {'stages': {'blur': 3.1}, 'total_ms': 3.1}
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Chronomètre le bloc et l'ajoute à l'étape `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000.0)
+
+    def add(self, name, duration_ms):
+        """Ajoute une durée mesurée ailleurs (ex: part d'un batch) à l'étape `name`"""
+        self.stages[name] = self.stages.get(name, 0.0) + duration_ms
+
+    @property
+    def total_ms(self):
+        return sum(self.stages.values())
+
+    def as_dict(self):
+        """Résumé structuré : latence par étape (ordre d'exécution) et total, en ms"""
+        return {
+            'stages': {name: round(ms, 3) for name, ms in self.stages.items()},
+            'total_ms': round(self.total_ms, 3)
+        }
+
+    def emit(self, callback=None):
+        """Publie le résumé vers les callbacks globaux (et `callback` s'il est fourni)"""
+        timings = self.as_dict()
+        for fn in list(_timing_callbacks) + ([callback] if callback else []):
+            fn(timings)
+        return timings
+
+
+class _NullTimer:
+    """Timer inactif (aucune mesure) utilisé quand le chronométrage n'est pas demandé"""
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def add(self, name, duration_ms):
+        pass
+
+
+NULL_TIMER = _NullTimer()
@@ -0,0 +1,315 @@
+"""
+Pool thread-safe de sessions rembg
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Remplace le dict global de sessions (rempli paresseusement, sans verrou)
+              par un pool partagé par tous les threads des sessions Streamlit :
+              - N sessions ONNX par modèle (utilisateurs concurrents non sérialisés)
+              - Emprunt/restitution thread-safe (pas de double création au premier appel)
+              - Préchargement au démarrage des modèles configurés
+              - Budget mémoire : éviction LRU des sessions inactives
+              - Métriques de temps d'attente, de chargement et de mémoire résidente
+
+Configuration par variables d'environnement :
+    MNIST_REMBG_PRELOAD    Modèles préchargés, séparés par des virgules (défaut : aucun,
+                           la session est alors créée à la première suppression de fond)
+    MNIST_REMBG_SESSIONS   Nombre de sessions par modèle (défaut : 1)
+    MNIST_REMBG_MEMORY_MB  Budget mémoire des sessions en MB (défaut : 256, 0 = illimité)
+
+Exemple :
+    with rembg_pool.session("u2netp") as session:
+        img_no_bg = remove(img, session=session)
+"""
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Taille des poids ONNX (MB) quand le fichier n'est pas encore téléchargé
+KNOWN_MODEL_MB = {
+    'u2netp': 4.7,
+    'u2net': 176.0,
+    'isnet-general-use': 179.0
+}
+DEFAULT_MODEL_MB = 176.0
+
+
+def estimate_model_mb(model_name):
+    """
+    Estime la mémoire résidente d'une session rembg (MB)
+
+    Utilise la taille du fichier .onnx dans le dossier de rembg (U2NET_HOME,
+    ~/.u2net par défaut) s'il existe, sinon la table KNOWN_MODEL_MB.
+    """
+    home = os.environ.get("U2NET_HOME", os.path.join(os.path.expanduser("~"), ".u2net"))
+    path = os.path.join(home, f"{model_name}.onnx")
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 1e6
+    return KNOWN_MODEL_MB.get(model_name, DEFAULT_MODEL_MB)
+
+
+def _new_rembg_session(model_name):
+    """Crée une session rembg (import paresseux : onnxruntime est lourd)"""
+    from rembg import new_session
+    return new_session(model_name)
+
+
+class _ModelSessions:
+    """Sessions d'un modèle : file des sessions libres + compteurs"""
+
+    def __init__(self):
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.created = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.evictions = 0
+        self.checkouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.load_ms = 0.0
+
+
+class RembgSessionPool:
+    """
+    Pool de sessions rembg par modèle, sûr en accès concurrent
+
+    Une session est créée à la demande tant que le modèle en a moins de
+    `sessions_per_model` ; au-delà, l'appelant attend qu'une session se libère.
+
+    Avec un budget mémoire, la création d'une session libère d'abord les sessions
+    inactives des modèles les moins récemment utilisés jusqu'à ce que la nouvelle
+    tienne dans le budget. Les sessions en cours d'utilisation ne sont jamais
+    libérées : si elles suffisent à dépasser le budget, la session est tout de
+    même créée (dépassement temporaire plutôt que blocage).
+    """
+
+    def __init__(self, sessions_per_model=1, session_factory=_new_rembg_session,
+                 memory_budget_mb=None, model_size_mb=estimate_model_mb):
+        """
+        Args:
+            sessions_per_model: Nombre maximal de sessions ONNX par modèle
+            session_factory: Fonction model_name → session (rembg.new_session par défaut)
+            memory_budget_mb: Mémoire maximale des sessions en MB (None = illimitée)
+            model_size_mb: Fonction model_name → mémoire résidente estimée d'une session (MB)
+        """
+        self.sessions_per_model = max(1, int(sessions_per_model))
+        self.memory_budget_mb = memory_budget_mb or None
+        self._factory = session_factory
+        self._model_size_mb = model_size_mb
+        self._lock = threading.Lock()
+        self._models = {}
+        self._sizes = {}
+        self._lru = OrderedDict()
+        self._preload_thread = None
+
+    @classmethod
+    def from_env(cls):
+        """Pool configuré par MNIST_REMBG_SESSIONS et MNIST_REMBG_MEMORY_MB"""
+        return cls(
+            sessions_per_model=int(os.environ.get("MNIST_REMBG_SESSIONS", "1")),
+            memory_budget_mb=float(os.environ.get("MNIST_REMBG_MEMORY_MB", "256"))
+        )
+
+    def _entry(self, model_name):
+        with self._lock:
+            entry = self._models.get(model_name)
+            if entry is None:
+                entry = self._models[model_name] = _ModelSessions()
+                self._sizes[model_name] = self._model_size_mb(model_name)
+            return entry
+
+    def _touch(self, model_name):
+        """Marque le modèle comme le plus récemment utilisé"""
+        with self._lock:
+            self._lru[model_name] = None
+            self._lru.move_to_end(model_name)
+
+    def resident_mb(self):
+        """Mémoire résidente estimée de toutes les sessions (MB)"""
+        with self._lock:
+            models = list(self._models.items())
+        return sum(entry.created * self._sizes[name] for name, entry in models)
+
+    def _evict_idle(self, model_name, entry):
+        """
+        Libère les sessions inactives d'un modèle
+
+        Ignoré si un thread attend une session de ce modèle (il ne serait
+        plus jamais servi si toutes ses sessions disparaissaient).
+        """
+        freed = 0
+        with entry.lock:
+            if entry.waiting:
+                return 0
+            while True:
+                try:
+                    entry.idle.get_nowait()
+                except queue.Empty:
+                    break
+                entry.created -= 1
+                entry.evictions += 1
+                freed += 1
+        return freed
+
+    def _make_room(self, model_name):
+        """Évince les sessions inactives (LRU) pour qu'une session de `model_name` tienne dans le budget"""
+        if self.memory_budget_mb is None:
+            return
+        with self._lock:
+            candidates = [name for name in self._lru if name != model_name]
+        for name in candidates:
+            # resident_mb() inclut déjà la session réservée pour `model_name`
+            if self.resident_mb() <= self.memory_budget_mb:
+                return
+            self._evict_idle(name, self._models[name])
+
+    def _create(self, model_name, entry):
+        """Crée une session (hors verrou : le chargement peut prendre plusieurs secondes)"""
+        self._make_room(model_name)
+        start = time.perf_counter()
+        try:
+            session = self._factory(model_name)
+        except Exception:
+            with entry.lock:
+                entry.created -= 1
+            raise
+        with entry.lock:
+            entry.load_ms += (time.perf_counter() - start) * 1000.0
+        return session
+
+    def checkout(self, model_name, timeout=None):
+        """
+        Emprunte une session (à rendre avec checkin, ou utiliser session())
+
+        Args:
+            model_name: Modèle rembg ("u2netp", "u2net", "isnet-general-use")
+            timeout: Attente maximale en secondes (None = illimitée)
+        """
+        entry = self._entry(model_name)
+        self._touch(model_name)
+        start = time.perf_counter()
+
+        try:
+            session = entry.idle.get_nowait()
+        except queue.Empty:
+            with entry.lock:
+                can_create = entry.created < self.sessions_per_model
+                if can_create:
+                    entry.created += 1
+                else:
+                    entry.waiting += 1
+            if can_create:
+                session = self._create(model_name, entry)
+            else:
+                # Toutes les sessions sont occupées (ou en cours de création) : attendre
+                try:
+                    session = entry.idle.get(timeout=timeout)
+                finally:
+                    with entry.lock:
+                        entry.waiting -= 1
+
+        wait_ms = (time.perf_counter() - start) * 1000.0
+        with entry.lock:
+            entry.in_use += 1
+            entry.checkouts += 1
+            entry.total_wait_ms += wait_ms
+            entry.max_wait_ms = max(entry.max_wait_ms, wait_ms)
+        return session
+
+    def checkin(self, model_name, session):
+        """Rend une session empruntée avec checkout"""
+        entry = self._entry(model_name)
+        with entry.lock:
+            entry.in_use -= 1
+        entry.idle.put(session)
+
+    @contextmanager
+    def session(self, model_name, timeout=None):
+        """Emprunte une session le temps du bloc `with`"""
+        session = self.checkout(model_name, timeout=timeout)
+        try:
+            yield session
+        finally:
+            self.checkin(model_name, session)
+
+    def preload(self, model_names, background=True):
+        """
+        Crée à l'avance toutes les sessions des modèles donnés
+
+        Args:
+            model_names: Modèles à précharger
+            background: Si True, charge dans un thread (ne bloque pas l'affichage de la page)
+        """
+        def _load():
+            for model_name in model_names:
+                entry = self._entry(model_name)
+                self._touch(model_name)
+                while True:
+                    with entry.lock:
+                        if entry.created >= self.sessions_per_model:
+                            break
+                        entry.created += 1
+                    entry.idle.put(self._create(model_name, entry))
+
+        if not background:
+            _load()
+            return None
+
+        with self._lock:
+            # Un seul préchargement à la fois (les reruns Streamlit rappellent preload)
+            if self._preload_thread is None or not self._preload_thread.is_alive():
+                self._preload_thread = threading.Thread(target=_load, name="rembg-preload", daemon=True)
+                self._preload_thread.start()
+            return self._preload_thread
+
+    def metrics(self):
+        """
+        Métriques par modèle : sessions, emprunts, attente moyenne/max et chargement (ms),
+        mémoire résidente estimée (MB) et nombre de sessions évincées
+        """
+        with self._lock:
+            models = dict(self._models)
+        result = {}
+        for model_name, entry in models.items():
+            with entry.lock:
+                result[model_name] = {
+                    'sessions': entry.created,
+                    'in_use': entry.in_use,
+                    'checkouts': entry.checkouts,
+                    'mean_wait_ms': round(entry.total_wait_ms / entry.checkouts, 3) if entry.checkouts else 0.0,
+                    'max_wait_ms': round(entry.max_wait_ms, 3),
+                    'load_ms': round(entry.load_ms, 3),
+                    'resident_mb': round(entry.created * self._sizes[model_name], 1),
+                    'evictions': entry.evictions
+                }
+        return result
+
+    def memory(self):
+        """Résumé mémoire : budget, total résident et mémoire résidente par modèle (MB)"""
+        models = self.metrics()
+        return {
+            'budget_mb': self.memory_budget_mb,
+            'resident_mb': round(sum(m['resident_mb'] for m in models.values()), 1),
+            'models': {name: m['resident_mb'] for name, m in models.items()}
+        }
+
+
+# Pool partagé par toute l'application
+rembg_pool = RembgSessionPool.from_env()
+
+
+def preload_configured_models(background=True):
+    """
+    Précharge les modèles listés dans MNIST_REMBG_PRELOAD (ex: "u2netp")
+
+    Sans configuration, rien n'est chargé : les pages n'importent ni rembg ni
+    onnxruntime tant qu'aucune image ne passe par la suppression de fond.
+    """
+    model_names = [m.strip() for m in os.environ.get("MNIST_REMBG_PRELOAD", "").split(",") if m.strip()]
+    if not model_names:
+        return None
+    return rembg_pool.preload(model_names, background=background)
@@ -0,0 +1,96 @@
+"""
+Segmentation classique (premier étage de la cascade avant rembg)
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Seuillage Otsu + composantes connexes pour isoler le chiffre sur les
+              entrées « propres » (dessins du canvas, scans sur fond uniforme), avec un
+              test de qualité qui décide si le réseau rembg est nécessaire.
+
+La sortie a le même format que rembg (RGBA, fond transparent), de sorte que les
+étapes 1 à 10 du pipeline sont inchangées. Si le test échoue (fond texturé, ombres,
+chiffre coupé par le bord...), la fonction retourne None et rembg prend le relais.
+"""
+import numpy as np
+import cv2
+
+# Seuils du test de qualité
+MAX_BORDER_STD = 20.0          # Bord de l'image quasi uniforme (fond propre)
+MAX_BACKGROUND_STD = 25.0      # Fond (hors chiffre) quasi uniforme
+MIN_CONTRAST = 60.0            # Écart d'intensité moyen chiffre / fond
+MIN_FOREGROUND_RATIO = 0.001   # Au moins 0.1% de l'image
+MAX_FOREGROUND_RATIO = 0.35    # Au plus 35% de l'image
+MAX_COMPONENTS = 4             # Un chiffre = 1 à quelques traits (ex: 5, 4 en deux morceaux)
+NOISE_AREA_RATIO = 0.02        # Composantes < 2% du plus gros trait = bruit, ignorées
+
+
+def classical_segmentation(img):
+    """
+    Isole le chiffre par seuillage et composantes connexes si l'entrée est propre
+
+    Args:
+        img: Image PIL
+
+    Returns:
+        np.ndarray: Image RGBA (H, W, 4) uint8 au format de la sortie de rembg,
+            ou None si la segmentation classique n'est pas fiable
+    """
+    rgb = np.asarray(img.convert("RGB") if img.mode != "RGB" else img)
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    h, w = gray.shape
+    if min(h, w) < 16:
+        return None
+
+    # --- 1. Bord de l'image : doit être un fond uniforme ---
+    border = max(2, min(h, w) // 40)
+    border_pixels = np.concatenate([
+        gray[:border].ravel(), gray[-border:].ravel(),
+        gray[:, :border].ravel(), gray[:, -border:].ravel()
+    ])
+    if border_pixels.std() > MAX_BORDER_STD:
+        return None
+    is_light_background = np.median(border_pixels) > 127
+
+    # --- 2. Binarisation Otsu selon la polarité du fond ---
+    thresh_type = cv2.THRESH_BINARY_INV if is_light_background else cv2.THRESH_BINARY
+    _, binary = cv2.threshold(gray, 0, 255, thresh_type + cv2.THRESH_OTSU)
+
+    # --- 3. Composantes connexes, bruit filtré ---
+    n_labels, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if n_labels <= 1:
+        return None
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    kept = np.flatnonzero(areas >= NOISE_AREA_RATIO * areas.max()) + 1
+    if len(kept) > MAX_COMPONENTS:
+        return None
+
+    # Aucun trait ne doit toucher le bord (chiffre coupé, bord de feuille, ombre)
+    x, y = stats[kept, cv2.CC_STAT_LEFT], stats[kept, cv2.CC_STAT_TOP]
+    right = x + stats[kept, cv2.CC_STAT_WIDTH]
+    bottom = y + stats[kept, cv2.CC_STAT_HEIGHT]
+    if (x <= 0).any() or (y <= 0).any() or (right >= w).any() or (bottom >= h).any():
+        return None
+
+    # --- 4. Test de qualité : surface, contraste et uniformité du fond ---
+    lut = np.zeros(n_labels, dtype=np.uint8)
+    lut[kept] = 255
+    mask = lut[labels]
+
+    foreground_ratio = cv2.countNonZero(mask) / float(h * w)
+    if not MIN_FOREGROUND_RATIO <= foreground_ratio <= MAX_FOREGROUND_RATIO:
+        return None
+
+    fg_mean = cv2.mean(gray, mask=mask)[0]
+    bg_mean, bg_std = (v[0, 0] for v in cv2.meanStdDev(gray, mask=cv2.bitwise_not(binary)))
+    if abs(fg_mean - bg_mean) < MIN_CONTRAST or bg_std > MAX_BACKGROUND_STD:
+        return None
+
+    # --- 5. Masque alpha : traits gardés, légèrement dilatés pour conserver l'anti-aliasing ---
+    radius = max(1, min(h, w) // 100)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * radius + 1, 2 * radius + 1))
+    alpha = cv2.dilate(mask, kernel)
+
+    rgba = np.empty((h, w, 4), dtype=np.uint8)
+    rgba[..., :3] = rgb
+    rgba[..., 3] = alpha
+    return rgba
@@ -0,0 +1,348 @@
+"""
+Serveur HTTP local d'inférence avec micro-batching dynamique
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Sert le pipeline de prétraitement et le modèle d'inference.py sur un
+              port local, pour que les pages Streamlit, les traitements en lot et
+              les autres outils partagent un seul modèle chaud.
+
+Chaque requête est prétraitée dans un pool de threads (rembg, OpenCV et NumPy
+libèrent le GIL), puis son canvas 28×28 rejoint une file asyncio. Le batcher
+regroupe les canvas arrivés pendant la fenêtre max_wait_ms (ou jusqu'à
+max_batch_size) et les classe en une seule passe du modèle : sous charge
+concurrente, le débit augmente avec la taille des batchs au lieu de sérialiser
+des prédictions unitaires.
+
+API (bibliothèque standard uniquement, pas de framework web) :
+    POST /predict    Corps : image PNG/JPEG brute → {"top3": [[chiffre, confiance], ...],
+                     "detected": bool, "quality": {...}, "timings": {...}}
+    GET  /health     {"status": "ok"}
+    GET  /stats      Batchs, taille moyenne des batchs, cache, sessions rembg
+
+Usage :
+    cd streamlit_app
+    python -m utils.server --port 8765 --max-batch-size 32 --max-wait-ms 5
+
+    from utils.server import remote_predict
+    top3 = remote_predict(image)  # même format que predict_mnist
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+
+class MicroBatcher:
+    """
+    File asyncio qui regroupe les canvas concurrents en une passe du modèle
+
+    Le premier canvas d'un batch ouvre une fenêtre de max_wait_ms ; le batch part
+    à la fin de la fenêtre ou dès qu'il atteint max_batch_size. La passe du modèle
+    s'exécute dans un thread dédié (la boucle asyncio continue d'accepter des requêtes).
+    """
+
+    def __init__(self, predict_canvases, max_batch_size=32, max_wait_ms=5.0):
+        """
+        Args:
+            predict_canvases: Fonction (canvases (N, 28, 28), detected (N,)) → probabilités (N, 10)
+            max_batch_size: Nombre maximal de canvas par passe du modèle
+            max_wait_ms: Attente maximale après le premier canvas d'un batch
+        """
+        self.predict_canvases = predict_canvases
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = None
+        self._worker = None
+        # Un seul thread : les passes du modèle ne se chevauchent pas
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model")
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+
+    def start(self):
+        """Démarre la tâche de batching (à appeler dans la boucle asyncio)"""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, canvas, detected):
+        """Ajoute un canvas à la file et attend ses probabilités (10,)"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((canvas, detected, future))
+        return await future
+
+    async def _collect(self):
+        """Attend un premier canvas puis regroupe ceux qui arrivent dans la fenêtre"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            # Canvas déjà en file : pris sans attendre
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            canvases = np.stack([canvas for canvas, _, _ in batch])
+            detected = np.array([is_detected for _, is_detected, _ in batch])
+            try:
+                probabilities = await loop.run_in_executor(self._executor, self.predict_canvases, canvases, detected)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            for (_, _, future), probs in zip(batch, probabilities):
+                if not future.done():
+                    future.set_result(probs)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'max_batch_size_seen': self.max_batch_seen,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms
+        }
+
+
+class InferenceServer:
+    """
+    Serveur HTTP/1.1 minimal (keep-alive) au-dessus d'asyncio
+
+    Exemple :
+        server = InferenceServer(Predictor(model, cache=pipeline_cache))
+        asyncio.run(server.serve_forever(port=8765))
+    """
+
+    def __init__(self, predictor, max_batch_size=32, max_wait_ms=5.0, preprocess_workers=4):
+        """
+        Args:
+            predictor: Predictor (modèle, rembg, TTA et cache)
+            max_batch_size: Nombre maximal de canvas par passe du modèle
+            max_wait_ms: Fenêtre de regroupement des requêtes concurrentes
+            preprocess_workers: Threads de prétraitement (rembg, OpenCV)
+        """
+        self.predictor = predictor
+        self.batcher = MicroBatcher(predictor.predict_canvases, max_batch_size, max_wait_ms)
+        self._preprocess_pool = ThreadPoolExecutor(max_workers=preprocess_workers, thread_name_prefix="preprocess")
+        self.requests = 0
+        self.errors = 0
+
+    # --- Pipeline ---
+
+    def _preprocess(self, body, return_quality):
+        """Décode l'image et la prétraite (exécuté dans le pool de threads)"""
+        from .profiling import StageTimer
+
+        timer = StageTimer()
+        img = Image.open(io.BytesIO(body))
+        img.load()
+        canvas, _, quality = self.predictor.preprocess(img, return_quality=return_quality, timer=timer)
+        return canvas, quality, timer
+
+    async def predict(self, body, return_quality=False):
+        """Prédiction pour une image encodée : dict JSON-sérialisable"""
+        loop = asyncio.get_running_loop()
+        canvas, quality, timer = await loop.run_in_executor(self._preprocess_pool, self._preprocess, body, return_quality)
+
+        detected = canvas is not None
+        if not detected:
+            canvas = np.zeros((28, 28), dtype=np.uint8)
+
+        start = time.perf_counter()
+        probabilities = await self.batcher.submit(canvas, detected)
+        # Attente dans la file + part de la passe du modèle
+        timer.add('inference', (time.perf_counter() - start) * 1000.0)
+
+        top3 = np.argsort(probabilities)[::-1][:3]
+        result = {
+            'top3': [[int(digit), float(probabilities[digit])] for digit in top3],
+            'detected': detected,
+            'timings': timer.as_dict()
+        }
+        if return_quality:
+            result['quality'] = quality
+        return result
+
+    def stats(self):
+        from .inference import get_cache_stats
+        from .rembg_pool import rembg_pool
+
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'batching': self.batcher.stats(),
+            'cache': get_cache_stats() if self.predictor.cache is not None else None,
+            'rembg': rembg_pool.metrics()
+        }
+
+    # --- HTTP ---
+
+    async def _handle(self, reader, writer):
+        """Traite les requêtes d'une connexion (keep-alive) jusqu'à sa fermeture"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': "Image trop volumineuse"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self._route(method, target, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, body):
+        url = urlsplit(target)
+        query = dict(part.split('=', 1) for part in url.query.split('&') if '=' in part)
+
+        if method == 'GET' and url.path == '/health':
+            return 200, {'status': 'ok'}
+        if method == 'GET' and url.path == '/stats':
+            return 200, self.stats()
+        if method == 'POST' and url.path == '/predict':
+            self.requests += 1
+            try:
+                return 200, await self.predict(body, return_quality=query.get('quality') == '1')
+            except Exception as e:
+                self.errors += 1
+                return 400, {'error': f"{type(e).__name__}: {e}"}
+        return 404, {'error': f"Route inconnue : {method} {url.path}"}
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive=True):
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large'}
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def serve_forever(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self.batcher.start()
+        server = await asyncio.start_server(self._handle, host, port)
+        print(f"Serveur d'inférence prêt sur http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+            self._preprocess_pool.shutdown(wait=False)
+
+
+def remote_predict(img, url=None, timeout=30.0):
+    """
+    Prédiction via le serveur d'inférence (même format que predict_mnist)
+
+    Args:
+        img: Image PIL
+        url: Adresse du serveur (défaut : MNIST_INFERENCE_URL ou http://127.0.0.1:8765)
+
+    Returns:
+        list: Top 3 [(chiffre, confiance), ...]
+    """
+    url = url or os.environ.get("MNIST_INFERENCE_URL", f"http://127.0.0.1:{DEFAULT_PORT}")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    request = urllib.request.Request(f"{url.rstrip('/')}/predict", data=buffer.getvalue(),
+                                     headers={'Content-Type': 'image/png'}, method='POST')
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        result = json.loads(response.read())
+    return [(digit, confidence) for digit, confidence in result['top3']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur HTTP local d'inférence MNIST")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--preprocess-workers', type=int, default=4)
+    parser.add_argument('--rembg-model', default='u2netp')
+    parser.add_argument('--tta', action='store_true', help="TTA avec early exit (confiance ≥ 99%)")
+    parser.add_argument('--backend', default=None, help="keras, tflite, onnx ou numpy (défaut : MNIST_BACKEND)")
+    args = parser.parse_args()
+
+    # Racine du projet dans le path (import de training.utils pour le modèle Keras)
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from .inference import Predictor, load_app_model, pipeline_cache
+    from .rembg_pool import rembg_pool
+    from .tta import TTAEngine
+
+    # Serveur longue durée : modèle et rembg chargés avant la première requête
+    model = load_app_model(backend=args.backend)
+    rembg_pool.preload([args.rembg_model], background=False)
+
+    predictor = Predictor(
+        model, rembg_model=args.rembg_model,
+        use_tta=TTAEngine(early_exit_threshold=0.99) if args.tta else False,
+        cache=pipeline_cache
+    )
+    server = InferenceServer(predictor, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+                             preprocess_workers=args.preprocess_workers)
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
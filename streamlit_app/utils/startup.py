@@ -0,0 +1,102 @@
+"""
+Rapport de temps de démarrage par page
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Exécute chaque page Streamlit dans un processus Python neuf (mode
+              « bare », sans serveur) et mesure le temps d'affichage, la mémoire
+              résidente et les dépendances lourdes effectivement importées.
+
+Une page qui n'a pas besoin de TensorFlow ou d'onnxruntime pour s'afficher ne doit
+pas les importer : le rapport permet de le vérifier page par page.
+
+Usage :
+    cd streamlit_app
+    python -m utils.startup              # toutes les pages, 3 exécutions chacune
+    python -m utils.startup --runs 5 --json startup.json
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+# Dépendances dont l'import coûte cher (temps et mémoire)
+HEAVY_MODULES = ('tensorflow', 'keras', 'onnxruntime', 'rembg', 'scipy', 'cv2')
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code exécuté dans le sous-processus : exécute la page et imprime les mesures en JSON
+_PROBE = """
+import json, resource, runpy, sys, time, warnings, logging
+warnings.filterwarnings('ignore')
+logging.disable(logging.WARNING)
+sys.path.insert(0, {app_dir!r})
+start = time.perf_counter()
+runpy.run_path({script!r}, run_name='__main__')
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': round(elapsed, 3),
+    'rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    'heavy_modules': [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def app_pages():
+    """Scripts des pages de l'application (accueil puis pages numérotées)"""
+    return [os.path.join(APP_DIR, 'Acceuil.py')] + sorted(glob.glob(os.path.join(APP_DIR, 'pages', '*.py')))
+
+
+def measure_page(script, runs=3):
+    """
+    Mesure l'affichage d'une page dans des processus neufs
+
+    Args:
+        script: Chemin du script de la page
+        runs: Nombre d'exécutions (la médiane du temps est retenue)
+
+    Returns:
+        dict: {seconds, rss_mb, heavy_modules}
+    """
+    code = _PROBE.format(app_dir=APP_DIR, script=script, heavy=HEAVY_MODULES)
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=APP_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    results.sort(key=lambda r: r['seconds'])
+    median = results[len(results) // 2]
+    return {
+        'seconds': median['seconds'],
+        'rss_mb': max(r['rss_mb'] for r in results),
+        'heavy_modules': median['heavy_modules']
+    }
+
+
+def startup_report(runs=3):
+    """Mesures de toutes les pages : {nom de la page: mesures}"""
+    return {os.path.relpath(script, APP_DIR): measure_page(script, runs=runs) for script in app_pages()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage des pages Streamlit")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--json', default=None, help="Fichier JSON où écrire le rapport")
+    args = parser.parse_args()
+
+    report = startup_report(runs=args.runs)
+    print(f"{'Page':<28} {'Temps (s)':>10} {'RSS (MB)':>10}  Imports lourds")
+    for page, m in report.items():
+        print(f"{page:<28} {m['seconds']:>10.2f} {m['rss_mb']:>10.1f}  {', '.join(m['heavy_modules']) or '-'}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
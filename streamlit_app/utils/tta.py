@@ -0,0 +1,161 @@
+"""
+TTA (Test-Time Augmentation) vectorisé
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Construit toutes les variantes augmentées (rotations, décalages sub-pixel,
+              zooms) en une seule interpolation vectorisée, puis les évalue en un seul
+              batch du modèle.
+
+Sortie anticipée (early exit) optionnelle : si la prédiction sur le canvas original
+dépasse un seuil de confiance, les variantes ne sont pas évaluées. Sur les images
+faciles (la majorité), le TTA coûte alors environ une seule inférence.
+"""
+import numpy as np
+
+# Centre du canvas 28×28 (convention de scipy.ndimage.rotate)
+_CENTER = (28 - 1) / 2.0
+
+
+class TTAEngine:
+    """
+    Moteur TTA configurable
+
+    La variante 0 est toujours le canvas original, suivie des rotations,
+    des décalages puis des zooms (une transformation par variante).
+
+    Exemple :
+        engine = TTAEngine(angles=(-5, -3, 3, 5), early_exit_threshold=0.99)
+        predictions = engine.predict(canvases, forward)
+    """
+
+    def __init__(self, angles=(-5, -3, 3, 5), shifts=(), scales=(), early_exit_threshold=None):
+        """
+        Args:
+            angles: Rotations en degrés (0 est ignoré, l'original est toujours inclus)
+            shifts: Décalages (dy, dx) en pixels, éventuellement sub-pixel (ex: (0.5, 0))
+            scales: Facteurs de zoom autour du centre (ex: 0.9, 1.1)
+            early_exit_threshold: Si défini (ex: 0.99), saute les variantes quand la
+                confiance sur l'original atteint ce seuil
+        """
+        self.angles = tuple(a for a in angles if a != 0)
+        self.shifts = tuple(tuple(s) for s in shifts)
+        self.scales = tuple(s for s in scales if s != 1)
+        self.early_exit_threshold = early_exit_threshold
+
+        # Grille de coordonnées source pour chaque variante (hors original) : (2, V-1, 28, 28)
+        self._grid = self._build_grid()
+
+    @property
+    def n_variants(self):
+        """Nombre de variantes évaluées par image (original inclus)"""
+        return 1 + len(self.angles) + len(self.shifts) + len(self.scales)
+
+    @property
+    def cache_key(self):
+        """Configuration qui détermine les prédictions (pour le cache des prédictions)"""
+        return (self.angles, self.shifts, self.scales, self.early_exit_threshold)
+
+    def _build_grid(self):
+        """Pré-calcule les coordonnées d'échantillonnage inverses de chaque variante"""
+        yy, xx = np.mgrid[0:28, 0:28].astype(np.float32)
+        dy, dx = yy - _CENTER, xx - _CENTER
+
+        grids = []
+        # Rotations (même sens que ndimage.rotate(canvas, angle, reshape=False))
+        for angle in self.angles:
+            theta = np.deg2rad(angle)
+            c, s = np.cos(theta), np.sin(theta)
+            grids.append((c * dy + s * dx + _CENTER, -s * dy + c * dx + _CENTER))
+        # Décalages sub-pixel
+        for shift_y, shift_x in self.shifts:
+            grids.append((yy - shift_y, xx - shift_x))
+        # Zooms autour du centre
+        for scale in self.scales:
+            grids.append((dy / scale + _CENTER, dx / scale + _CENTER))
+
+        if not grids:
+            return np.zeros((2, 0, 28, 28), dtype=np.float32)
+        return np.stack([np.stack(g) for g in grids], axis=1).astype(np.float32)
+
+    def build_variants(self, canvases):
+        """
+        Construit toutes les variantes augmentées en une seule interpolation
+
+        Args:
+            canvases: Canvas (N, 28, 28), uint8 ou float
+
+        Returns:
+            np.ndarray: float32 (N, n_variants, 28, 28), variante 0 = original
+        """
+        canvases = np.asarray(canvases, dtype=np.float32)
+        n = len(canvases)
+        n_aug = self._grid.shape[1]
+
+        variants = np.empty((n, 1 + n_aug, 28, 28), dtype=np.float32)
+        variants[:, 0] = canvases
+        if n == 0 or n_aug == 0:
+            return variants
+
+        # Coordonnées (image, y, x) pour toutes les images et variantes à la fois
+        coords = np.empty((3, n, n_aug, 28, 28), dtype=np.float32)
+        coords[0] = np.arange(n, dtype=np.float32)[:, None, None, None]
+        coords[1:] = self._grid[:, None]
+
+        # Interpolation bilinéaire (order=1) avec fond noir, comme l'ancien apply_rotation
+        # (scipy importé ici : inutile tant qu'aucun TTA n'est calculé)
+        from scipy import ndimage
+        variants[:, 1:] = ndimage.map_coordinates(canvases, coords, order=1, mode='constant', cval=0.0)
+        return variants
+
+    def predict(self, canvases, forward, augment_mask=None):
+        """
+        Prédictions moyennées sur les variantes
+
+        Au plus deux passes du modèle : une pour les originaux, une pour toutes
+        les variantes restantes (ou une seule sans early exit).
+
+        Args:
+            canvases: Canvas (N, 28, 28)
+            forward: Fonction batch (B, 28, 28, 1) float32 → probabilités (B, num_classes)
+            augment_mask: Booléens (N,), False = pas de TTA pour cette image
+
+        Returns:
+            np.ndarray: Probabilités moyennées (N, num_classes)
+        """
+        canvases = np.asarray(canvases)
+        n = len(canvases)
+        augment_mask = np.ones(n, dtype=bool) if augment_mask is None else np.asarray(augment_mask, dtype=bool)
+
+        if self.n_variants == 1 or not augment_mask.any():
+            return forward(canvases.astype(np.float32)[..., np.newaxis])
+
+        if self.early_exit_threshold is None:
+            # --- Une seule passe : originaux + variantes des images augmentées ---
+            variants = self.build_variants(canvases[augment_mask])
+            plain = canvases[~augment_mask].astype(np.float32)
+            batch = np.concatenate([plain, variants.reshape(-1, 28, 28)])
+            preds = forward(batch[..., np.newaxis])
+
+            predictions = np.empty((n, preds.shape[1]), dtype=preds.dtype)
+            predictions[~augment_mask] = preds[:len(plain)]
+            predictions[augment_mask] = preds[len(plain):].reshape(len(variants), self.n_variants, -1).mean(axis=1)
+            return predictions
+
+        # --- Early exit : originaux d'abord ---
+        predictions = forward(canvases.astype(np.float32)[..., np.newaxis])
+        uncertain = augment_mask & (predictions.max(axis=1) < self.early_exit_threshold)
+        if not uncertain.any():
+            return predictions
+
+        # --- Puis variantes des seules images incertaines, en un batch ---
+        variants = self.build_variants(canvases[uncertain])[:, 1:]
+        preds = forward(variants.reshape(-1, 28, 28, 1))
+        preds = preds.reshape(len(variants), self.n_variants - 1, -1)
+        predictions = predictions.copy()
+        predictions[uncertain] = (predictions[uncertain] + preds.sum(axis=1)) / self.n_variants
+        return predictions
+
+
+# Configuration historique : 5 rotations (-5°, -3°, 0°, +3°, +5°), sans early exit
+DEFAULT_TTA = TTAEngine()
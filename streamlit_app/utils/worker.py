@@ -0,0 +1,131 @@
+"""
+Worker d'inférence partagé entre les sessions Streamlit
+Projet MNIST CNN Classification
+
+Auteur : ALLOUKOUTOU Tundé Lionel Alex
+Description : Un thread dédié possède le modèle et vide une file de requêtes.
+              Les threads de script des sessions déposent leur batch et reçoivent
+              un Future ; le worker concatène tout ce qui attend dans la file et
+              l'évalue en une seule passe du modèle.
+
+Le modèle n'est plus appelé en parallèle par plusieurs threads (pas de contention
+dans TensorFlow), et une rafale d'utilisateurs devient une passe batchée.
+
+InferenceWorker expose serve(batch) : il se passe à la place du modèle partout où
+un modèle est attendu (predict_mnist, Predictor, run_model).
+
+Exemple :
+    worker = InferenceWorker(load_app_model())
+    top3 = predict_mnist(image, worker)
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from .inference import run_model
+
+
+class InferenceWorker:
+    """Thread d'inférence unique, batching des requêtes en attente"""
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=0.0):
+        """
+        Args:
+            model: Modèle ou backend (serve(batch) ou predict)
+            max_batch_size: Nombre maximal de lignes par passe (une requête plus
+                grande est évaluée seule, sans être découpée). 32 correspond à un
+                bucket de serve() : un batch de 33 lignes serait complété jusqu'à 128
+            max_wait_ms: Attente supplémentaire après la première requête pour
+                laisser d'autres sessions rejoindre le batch (0 = uniquement ce qui
+                attend déjà, aucune latence ajoutée)
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        # Requête trop grande pour le batch précédent : elle ouvre le suivant
+        self._pending = None
+        self._thread = threading.Thread(target=self._run, name="inference-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, batch):
+        """
+        Dépose un batch (N, 28, 28, 1) dans la file
+
+        Returns:
+            concurrent.futures.Future: Probabilités (N, num_classes)
+        """
+        future = Future()
+        self._queue.put((np.asarray(batch, dtype=np.float32), future))
+        return future
+
+    def serve(self, batch):
+        """Comme model.serve : attend le résultat de la passe batchée"""
+        return self.submit(batch).result()
+
+    def _collect(self):
+        """Première requête (bloquant) puis celles qui attendent, dans la limite de max_batch_size"""
+        if self._pending is not None:
+            requests, self._pending = [self._pending], None
+        else:
+            requests = [self._queue.get()]
+        rows = len(requests[0][0])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while rows < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout > 0:
+                    request = self._queue.get(timeout=timeout)
+                else:
+                    request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if rows + len(request[0]) > self.max_batch_size:
+                # Trop grande pour ce batch : ouvre la prochaine passe
+                self._pending = request
+                break
+            requests.append(request)
+            rows += len(request[0])
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            requests = [(batch, future) for batch, future in requests if future.set_running_or_notify_cancel()]
+            if not requests:
+                continue
+
+            batches = [batch for batch, _ in requests]
+            try:
+                probabilities = run_model(self.model, np.concatenate(batches))
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self.batches += 1
+                self.requests += len(requests)
+                self.rows += len(probabilities)
+
+            offsets = np.cumsum([len(batch) for batch in batches])[:-1]
+            for (_, future), probs in zip(requests, np.split(probabilities, offsets)):
+                future.set_result(probs)
+
+    def stats(self):
+        """Passes du modèle, requêtes et lignes traitées, requêtes par passe"""
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'requests': self.requests,
+                'rows': self.rows,
+                'requests_per_batch': round(self.requests / self.batches, 2) if self.batches else 0.0,
+                'queued': self._queue.qsize()
+            }
@@ -0,0 +1,12 @@
+"""
+Configuration pytest : la racine du projet (training.utils) et streamlit_app (utils.*)
+sont importables comme dans l'application et les scripts d'entraînement
+"""
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'streamlit_app')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,79 @@
+"""
+Poids repliés (training/utils/folding.py) : le moteur NumPy et FusedCNN_MNIST
+doivent reproduire SimpleCNN_MNIST en inférence
+"""
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from training.utils.folding import fold_weights, save_folded_weights  # noqa: E402
+from training.utils.model_definition import SimpleCNN_MNIST, FusedCNN_MNIST  # noqa: E402
+from utils.numpy_engine import NumpyCNN  # noqa: E402
+
+# BatchNorm repliée dans les convolutions : mêmes calculs, arrondis float32 dans un autre ordre
+ATOL = 2e-5
+
+
+@pytest.fixture(scope='module')
+def model():
+    """SimpleCNN_MNIST non entraîné, BatchNorm aux statistiques non triviales, mu / std non nuls"""
+    tf.keras.utils.set_random_seed(0)
+    model = SimpleCNN_MNIST(mu=31.5, std=72.25, augment=False)
+    model(tf.zeros((1, 28, 28, 1)))
+
+    rng = np.random.default_rng(0)
+    for bn in (model.bn1, model.bn2, model.bn3, model.bn4):
+        channels = bn.gamma.shape[0]
+        bn.set_weights([
+            rng.uniform(0.5, 1.5, channels),   # gamma
+            rng.normal(0.0, 0.2, channels),    # beta
+            rng.normal(0.0, 0.5, channels),    # moving_mean
+            rng.uniform(0.2, 2.0, channels),   # moving_variance
+        ])
+    return model
+
+
+@pytest.fixture(scope='module')
+def batch():
+    return np.random.default_rng(1).uniform(0, 255, (16, 28, 28, 1)).astype(np.float32)
+
+
+@pytest.fixture(scope='module')
+def calibrated(model, batch):
+    """
+    Tête recentrée sur le batch : sans entraînement, une composante commune des features
+    donne la même classe à toutes les images. Logits centrés par classe et ramenés à un
+    écart-type de 3 (log_softmax = logits à une constante par image près).
+    """
+    kernel, bias = model.fc.get_weights()
+    logits = np.log(model(batch, training=False).numpy().astype(np.float64)) - bias
+    centered = logits - logits.mean(axis=0)
+    scale = 3.0 / centered.std()
+    model.fc.set_weights([kernel * scale, -scale * logits.mean(axis=0)])
+    return model
+
+
+@pytest.fixture(scope='module')
+def reference(calibrated, batch):
+    expected = calibrated(batch, training=False).numpy()
+    # Sans ce contraste, l'égalité des argmax ne vérifierait rien
+    assert len(set(expected.argmax(axis=1))) > 1
+    return expected
+
+
+def test_numpy_engine_matches_keras(model, batch, reference):
+    probs = NumpyCNN(fold_weights(model)).serve(batch)
+    np.testing.assert_allclose(probs, reference, atol=ATOL)
+    np.testing.assert_array_equal(probs.argmax(axis=1), reference.argmax(axis=1))
+
+
+def test_fused_model_matches_keras(model, batch, reference):
+    probs = FusedCNN_MNIST.from_trained(model)(batch, training=False).numpy()
+    np.testing.assert_allclose(probs, reference, atol=ATOL)
+    np.testing.assert_array_equal(probs.argmax(axis=1), reference.argmax(axis=1))
+
+
+def test_npz_round_trip(model, batch, reference, tmp_path):
+    path = save_folded_weights(model, str(tmp_path / 'folded.npz'))
+    np.testing.assert_allclose(NumpyCNN.from_npz(path).serve(batch), reference, atol=ATOL)
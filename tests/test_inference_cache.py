@@ -0,0 +1,61 @@
+"""
+Cache des prédictions (streamlit_app/utils/inference.py) : un modèle ne doit jamais
+lire les prédictions mises en cache pour un autre modèle
+"""
+import gc
+
+import numpy as np
+import pytest
+
+from utils.cache import PipelineCache, model_token
+from utils.inference import Predictor
+
+
+class ConstantModel:
+    """Modèle factice : même classe prédite pour tout canvas"""
+
+    def __init__(self, digit):
+        self.digit = digit
+
+    def serve(self, batch):
+        probs = np.full((len(batch), 10), 0.01, dtype=np.float32)
+        probs[:, self.digit] = 0.91
+        return probs
+
+
+@pytest.fixture
+def canvas():
+    canvas = np.zeros((1, 28, 28), dtype=np.uint8)
+    canvas[0, 6:22, 12:16] = 255
+    return canvas
+
+
+def test_two_models_same_canvas(canvas):
+    cache = PipelineCache()
+    detected = np.array([True])
+    first = Predictor(ConstantModel(3), cache=cache).predict_canvases(canvas, detected)
+    second = Predictor(ConstantModel(7), cache=cache).predict_canvases(canvas, detected)
+    assert first.argmax() == 3
+    assert second.argmax() == 7
+
+    # Le premier modèle retrouve ses propres prédictions
+    again = Predictor(ConstantModel(3), cache=cache)
+    assert again.predict_canvases(canvas, detected).argmax() == 3
+
+
+def test_freed_models_do_not_share_predictions(canvas):
+    """Modèles créés puis libérés l'un après l'autre : CPython réutilise leur id"""
+    cache = PipelineCache()
+    detected = np.array([True])
+    for i in range(50):
+        model = ConstantModel(i % 10)
+        predictions = Predictor(model, cache=cache).predict_canvases(canvas, detected)
+        assert predictions.argmax() == i % 10
+        del model
+        gc.collect()
+
+
+def test_model_token_is_stable():
+    model, other = ConstantModel(0), ConstantModel(0)
+    assert model_token(model) == model_token(model)
+    assert model_token(model) != model_token(other)
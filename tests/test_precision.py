@@ -0,0 +1,33 @@
+"""
+Précision mixte (training/utils/precision.py) : sous mixed_bfloat16, seules les
+convolutions calculent en bfloat16 ; la tête de SimpleCNN_MNIST reste en float32
+"""
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+keras = pytest.importorskip('keras')
+
+from training.utils.model_definition import SimpleCNN_MNIST  # noqa: E402
+
+
+@pytest.fixture
+def mixed_model():
+    # Politique appliquée directement : le test ne dépend pas du support matériel du bfloat16
+    previous = keras.mixed_precision.global_policy()
+    keras.mixed_precision.set_global_policy('mixed_bfloat16')
+    try:
+        model = SimpleCNN_MNIST(augment=False)
+        model(tf.zeros((1, 28, 28, 1)))
+    finally:
+        keras.mixed_precision.set_global_policy(previous)
+    return model
+
+
+def test_head_stays_float32(mixed_model):
+    assert mixed_model.conv1.compute_dtype == 'bfloat16'
+    for layer in (mixed_model.bn1, mixed_model.bn4, mixed_model.gap, mixed_model.dropout, mixed_model.fc):
+        assert layer.compute_dtype == 'float32', layer.name
+
+    features = mixed_model.gap(tf.zeros((2, 3, 3, mixed_model.filters[-1])))
+    assert mixed_model.dropout(features, training=True).dtype == tf.float32
+    assert mixed_model(tf.zeros((2, 28, 28, 1))).dtype == tf.float32
@@ -0,0 +1,31 @@
+"""
+Recherche d'hyperparamètres (training/search.py) : un palier relancé après coup
+reprend ses checkpoints et reste noté
+"""
+import numpy as np
+import pytest
+
+keras = pytest.importorskip('keras')
+
+from training.search import run_trial  # noqa: E402
+
+
+@pytest.fixture
+def small_mnist(monkeypatch):
+    """MNIST réduit et aléatoire : pas de téléchargement, une epoch en quelques secondes"""
+    rng = np.random.default_rng(0)
+    data = ((rng.integers(0, 256, (640, 28, 28), dtype=np.uint8), rng.integers(0, 10, 640)),
+            (rng.integers(0, 256, (128, 28, 28), dtype=np.uint8), rng.integers(0, 10, 128)))
+    monkeypatch.setattr(keras.datasets.mnist, 'load_data', lambda: data)
+
+
+def test_rerun_of_finished_rung_is_scored(small_mnist, tmp_path):
+    """Arrêt entre train() et store.record : la relance n'a aucune epoch à entraîner"""
+    task = {'trial': 0, 'rung': 0, 'epochs': 1, 'params': {}, 'config_path': None,
+            'trial_dir': str(tmp_path / 'trial_000')}
+    first = run_trial(task)
+    rerun = run_trial(task)
+
+    assert first['status'] == 'completed', first.get('error')
+    assert rerun['status'] == 'completed', rerun.get('error')
+    assert rerun['val_accuracy'] == pytest.approx(first['val_accuracy'])
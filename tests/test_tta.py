@@ -0,0 +1,54 @@
+"""
+Variantes du TTA (streamlit_app/utils/tta.py) : une seule interpolation doit donner
+les mêmes images que scipy.ndimage appliqué variante par variante
+"""
+import numpy as np
+import pytest
+
+ndimage = pytest.importorskip('scipy.ndimage')
+
+from utils.tta import TTAEngine  # noqa: E402
+
+# Niveaux de gris 0-255 : écart d'arrondi float32 / float64
+ATOL = 1e-3
+
+
+@pytest.fixture(scope='module')
+def canvases():
+    """Deux canvas asymétriques : trait lissé excentré (une rotation à l'envers ne coïncide pas)"""
+    canvases = np.zeros((2, 28, 28), dtype=np.float32)
+    canvases[0, 5:22, 9:12] = 255
+    canvases[0, 5:8, 9:20] = 255
+    canvases[1, 14:24, 6:22] = 255
+    canvases[1] = ndimage.gaussian_filter(canvases[1], 1.5)
+    return canvases
+
+
+@pytest.mark.parametrize('angles', [(-5, 5), (-5, -3, 3, 5), (-15, 0, 10)])
+def test_rotations_match_ndimage_rotate(canvases, angles):
+    engine = TTAEngine(angles=angles)
+    variants = engine.build_variants(canvases)
+    kept = [a for a in angles if a != 0]
+    assert variants.shape == (len(canvases), 1 + len(kept), 28, 28)
+
+    np.testing.assert_array_equal(variants[:, 0], canvases)
+    for index, angle in enumerate(kept, start=1):
+        for canvas, variant in zip(canvases, variants[:, index]):
+            expected = ndimage.rotate(canvas, angle, reshape=False, order=1, mode='constant', cval=0.0)
+            np.testing.assert_allclose(variant, expected, atol=ATOL)
+
+
+def test_rotation_direction(canvases):
+    """Le sens compte : +5° ne coïncide pas avec ndimage.rotate(-5°)"""
+    variant = TTAEngine(angles=(5,)).build_variants(canvases[:1])[0, 1]
+    opposite = ndimage.rotate(canvases[0], -5, reshape=False, order=1, mode='constant', cval=0.0)
+    assert np.abs(variant - opposite).max() > 10
+
+
+def test_shifts_match_ndimage_shift(canvases):
+    shifts = ((0.5, 0.0), (0.0, -0.5), (1.0, 1.0))
+    variants = TTAEngine(angles=(), shifts=shifts).build_variants(canvases)
+    for index, shift in enumerate(shifts, start=1):
+        for canvas, variant in zip(canvases, variants[:, index]):
+            expected = ndimage.shift(canvas, shift, order=1, mode='constant', cval=0.0)
+            np.testing.assert_allclose(variant, expected, atol=ATOL)
@@ -0,0 +1,5 @@
+"""
+Entraînement de SimpleCNN_MNIST
+
+Point d'entrée : python -m training --config training/configs/default.json (voir train.py)
+"""
@@ -0,0 +1,275 @@
+"""
+Entraînement data-parallèle synchrone sur plusieurs processus locaux (CPU)
+
+N processus workers forment un cluster MultiWorkerMirroredStrategy sur localhost
+(TF_CONFIG, un port par worker). Chaque worker ne lit et n'augmente que sa part des
+images (1/N du jeu, découpée avant le batch) ; les gradients sont moyennés par
+all-reduce à chaque pas et les métriques d'epoch entre les workers.
+data.batch_size reste la taille par worker : le batch global vaut N × batch_size et
+le learning rate est multiplié par N (règle linéaire, voir train.train). Les threads
+intra-op de TensorFlow sont répartis entre les workers pour ne pas surcharger les cœurs.
+
+Le rapport de scaling lance l'entraînement à 1, 2, 4 et 8 workers et compare le débit
+(images/s, journal du worker 0) au débit idéal N × débit à 1 worker.
+
+Usage :
+    python -m training.distributed --workers 4 --config training/configs/default.json
+    python -m training.distributed --scaling 1,2,4,8 --epochs 2 --report scaling.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from .train import PROJECT_ROOT, load_config
+
+
+def _free_ports(count):
+    """Ports TCP libres sur localhost (un par worker)"""
+    sockets = [socket.socket() for _ in range(count)]
+    try:
+        for s in sockets:
+            s.bind(('localhost', 0))
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+def launch(num_workers, config_path=None, overrides=None, threads_per_worker=None):
+    """
+    Lance num_workers processus d'entraînement sur localhost et attend leur fin
+
+    Args:
+        num_workers: Nombre de processus workers
+        config_path: Fichier de configuration JSON (voir train.load_config)
+        overrides: Surcharges de la configuration ({section: {clé: valeur}})
+        threads_per_worker: Threads intra-op par worker (défaut : cœurs / workers)
+
+    Returns:
+        int: Code de retour (0 si tous les workers ont terminé sans erreur)
+    """
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+    ports = _free_ports(num_workers)
+    cluster = {'worker': [f'localhost:{port}' for port in ports]}
+
+    processes = []
+    for index in range(num_workers):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get('PYTHONPATH')]))
+        env['TF_CONFIG'] = json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}})
+        command = [sys.executable, '-m', 'training.distributed', '--worker',
+                   '--threads', str(threads_per_worker), '--overrides', json.dumps(overrides or {})]
+        if config_path:
+            command += ['--config', config_path]
+        processes.append(subprocess.Popen(command, env=env, cwd=os.getcwd()))
+
+    # Un worker en échec bloquerait les autres dans l'all-reduce : on les arrête tous
+    codes = {}
+    while len(codes) < num_workers:
+        for index, process in enumerate(processes):
+            if index not in codes and process.poll() is not None:
+                codes[index] = process.returncode
+                if process.returncode != 0:
+                    for other in processes:
+                        if other.poll() is None:
+                            other.terminate()
+        time.sleep(0.2)
+    return max(codes.values(), key=abs)
+
+
+def fit_multi_worker(model, strategy, train_ds, validation_ds, epochs, callbacks, verbose=True):
+    """
+    Boucle d'epochs équivalente à model.fit pour MultiWorkerMirroredStrategy
+
+    model.fit de Keras 3 échoue dès le premier batch avec plusieurs workers (réduction
+    d'un batch PerReplica lors de la construction symbolique du modèle). Cette boucle
+    exécute les mêmes train_step / test_step de Keras sur chaque worker (strategy.run),
+    l'optimiseur moyenne les gradients par all-reduce, et appelle les mêmes callbacks
+    (BackupAndRestore, ReduceLROnPlateau, EarlyStopping, ThroughputLogger).
+
+    Les métriques de fin d'epoch (entraînement et validation) sont moyennées entre les
+    workers, pondérées par le nombre d'exemples : tous les workers voient les mêmes logs
+    et les callbacks prennent les mêmes décisions (learning rate, arrêt, restauration).
+
+    Args:
+        model: Modèle compilé, construit dans strategy.scope()
+        strategy: MultiWorkerMirroredStrategy
+        train_ds, validation_ds: Datasets propres à ce worker, batchés à la taille par worker
+            (même nombre de batchs d'entraînement sur chaque worker ; la part de validation
+            peut être plus petite, voire vide)
+        epochs: Nombre total d'epochs (une reprise commence à l'epoch restaurée)
+        callbacks: Callbacks Keras
+        verbose: Affiche les métriques à la fin de chaque epoch
+
+    Returns:
+        keras.callbacks.History
+    """
+    import tensorflow as tf
+    import keras
+
+    # Datasets déjà partagés par worker : pas de re-batch ni de partage automatique
+    train_dist = strategy.distribute_datasets_from_function(lambda context: train_ds)
+    validation_dist = strategy.distribute_datasets_from_function(lambda context: validation_ds)
+
+    @tf.function
+    def train_step(batch):
+        return strategy.run(model.train_step, args=(batch,))
+
+    @tf.function
+    def test_step(batch):
+        return strategy.run(model.test_step, args=(batch,))
+
+    @tf.function
+    def all_reduce_sum(values):
+        return strategy.reduce('SUM', strategy.run(tf.identity, args=(values,)), axis=None)
+
+    def local_logs(logs):
+        return {name: float(strategy.experimental_local_results(value)[0]) for name, value in logs.items()}
+
+    def global_logs(names, logs, count):
+        """Moyenne sur les workers des métriques locales pondérées par count (appel collectif)"""
+        local = [logs.get(name, 0.0) * count for name in names] + [float(count)]
+        total = all_reduce_sum(tf.constant(local, dtype=tf.float64)).numpy()
+        if total[-1] == 0:
+            return {}
+        return {name: float(value / total[-1]) for name, value in zip(names, total[:-1])}
+
+    callback_list = keras.callbacks.CallbackList(callbacks, add_history=True, model=model, epochs=epochs)
+    model.stop_training = False
+    callback_list.on_train_begin()
+    # BackupAndRestore fixe l'epoch de reprise dans on_train_begin
+    initial_epoch = getattr(model, '_initial_epoch', None) or 0
+
+    logs = {}
+    for epoch in range(initial_epoch, epochs):
+        model.reset_metrics()
+        callback_list.on_epoch_begin(epoch)
+        train_logs, train_count = {}, 0
+        for step, (images, labels) in enumerate(train_dist):
+            callback_list.on_train_batch_begin(step)
+            train_logs = local_logs(train_step((images, labels)))
+            train_count += int(sum(tf.shape(x)[0] for x in strategy.experimental_local_results(images)))
+            callback_list.on_train_batch_end(step, train_logs)
+
+        model.reset_metrics()
+        validation_logs, validation_count = {}, 0
+        for images, labels in validation_dist:
+            # L'itérateur distribué avance au même rythme sur tous les workers : une part plus
+            # courte (ou vide) reçoit des batchs vides, ignorés ici (test_step est purement local)
+            batch_count = int(sum(tf.shape(x)[0] for x in strategy.experimental_local_results(images)))
+            if batch_count == 0:
+                continue
+            validation_logs = local_logs(test_step((images, labels)))
+            validation_count += batch_count
+
+        # Mêmes noms sur tous les workers (ceux de l'entraînement), même si la part de validation est vide
+        names = sorted(train_logs)
+        logs = global_logs(names, train_logs, train_count)
+        logs.update({f'val_{name}': value for name, value in
+                     global_logs(names, validation_logs, validation_count).items()})
+
+        callback_list.on_epoch_end(epoch, logs)
+        if verbose:
+            print(f"Epoch {epoch + 1}/{epochs} - " + ' - '.join(f"{k}: {v:.4f}" for k, v in logs.items()))
+        if model.stop_training:
+            break
+    callback_list.on_train_end(logs)
+    return model.history
+
+
+def run_worker(config_path=None, overrides=None, threads=None):
+    """Corps d'un worker : la stratégie est créée avant toute autre opération TensorFlow"""
+    import tensorflow as tf
+    from .train import train
+
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+    strategy = tf.distribute.MultiWorkerMirroredStrategy(
+        communication_options=tf.distribute.experimental.CommunicationOptions(
+            implementation=tf.distribute.experimental.CommunicationImplementation.RING
+        )
+    )
+    train(load_config(config_path, overrides), strategy=strategy)
+
+
+def _last_epoch_throughput(log_path):
+    """Images/s de la dernière epoch du journal (la première inclut le traçage)"""
+    with open(log_path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return records[-1]['images_per_second']
+
+
+def scaling_report(worker_counts=(1, 2, 4, 8), config_path=None, epochs=2):
+    """
+    Débit et efficacité de scaling pour chaque nombre de workers
+
+    Chaque exécution repart de zéro dans un dossier temporaire (checkpoints, journal, modèle).
+
+    Returns:
+        dict: {workers: {images_per_second, speedup, efficiency}}
+    """
+    report = {}
+    for num_workers in worker_counts:
+        with tempfile.TemporaryDirectory() as run_dir:
+            overrides = {
+                'training': {'epochs': epochs},
+                'output': {
+                    'model_path': os.path.join(run_dir, 'model.keras'),
+                    'checkpoint_dir': os.path.join(run_dir, 'checkpoints'),
+                    'log_path': os.path.join(run_dir, 'throughput.jsonl')
+                }
+            }
+            if launch(num_workers, config_path, overrides) != 0:
+                raise RuntimeError(f"Échec de l'entraînement à {num_workers} workers")
+            report[num_workers] = {'images_per_second': _last_epoch_throughput(overrides['output']['log_path'])}
+
+    baseline = report[worker_counts[0]]['images_per_second'] / worker_counts[0]
+    for num_workers, entry in report.items():
+        entry['speedup'] = round(entry['images_per_second'] / baseline, 2)
+        entry['efficiency'] = round(entry['speedup'] / num_workers, 3)
+
+    print(f"{'Workers':>7} {'Images/s':>10} {'Accélération':>13} {'Efficacité':>11}")
+    for num_workers, entry in report.items():
+        print(f"{num_workers:>7} {entry['images_per_second']:>10.1f} {entry['speedup']:>12.2f}× "
+              f"{entry['efficiency']:>10.1%}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraînement data-parallèle multi-processus (localhost)")
+    parser.add_argument('--config', default=None, help="Fichier de configuration JSON")
+    parser.add_argument('--workers', type=int, default=2, help="Nombre de processus workers")
+    parser.add_argument('--epochs', type=int, default=None, help="Surcharge training.epochs")
+    parser.add_argument('--scaling', default=None, help="Rapport de scaling, ex. 1,2,4,8")
+    parser.add_argument('--report', default=None, help="Fichier JSON du rapport de scaling")
+    # Options internes des processus workers
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--threads', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--overrides', default='{}', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.config, json.loads(args.overrides), threads=args.threads)
+        return
+
+    if args.scaling:
+        report = scaling_report(tuple(int(n) for n in args.scaling.split(',')), args.config,
+                                epochs=args.epochs or 2)
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+        return
+
+    overrides = {'training': {'epochs': args.epochs}} if args.epochs is not None else None
+    sys.exit(launch(args.workers, args.config, overrides))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""
+Recherche d'hyperparamètres de SimpleCNN_MNIST par successive halving
+
+Les essais (dropout, learning rate, label smoothing, amplitudes d'augmentation…)
+sont tirés aléatoirement dans SEARCH_SPACE et entraînés par train.train dans des
+processus workers, plusieurs à la fois. Successive halving : tous les essais
+commencent avec un petit nombre d'epochs ; à chaque palier, seul le meilleur
+1/eta (précision de validation) continue avec eta fois plus d'epochs, en reprenant
+à partir de ses checkpoints. Les essais perdants sont arrêtés tôt : le budget
+total est une fraction de celui d'une grille entraînée jusqu'au bout.
+
+La validation se fait sur les 10 % finaux du jeu d'entraînement (data.validation_split) :
+le jeu de test ne sert pas à choisir le modèle.
+
+Chaque palier de chaque essai est enregistré dans une base SQLite (table trials) ;
+relancer la même étude reprend là où elle s'était arrêtée. La configuration du
+meilleur essai est écrite dans best_config.json, prête pour python -m training.
+
+Usage :
+    python -m training.search --trials 27 --min-epochs 2 --max-epochs 18 --workers 3
+    python -m training.search --study dropout --space space.json --config training/configs/default.json
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from .train import load_config
+
+# Espace de recherche : {section.clé: (loi, min, max)}
+SEARCH_SPACE = {
+    'model.dropout_rate': ('uniform', 0.1, 0.5),
+    'training.learning_rate': ('log_uniform', 3e-4, 3e-3),
+    'training.label_smoothing': ('uniform', 0.0, 0.2),
+    'data.rotation': ('uniform', 0.0, 0.1),
+    'data.translation': ('uniform', 0.0, 0.15),
+    'data.zoom': ('uniform', 0.0, 0.15),
+}
+
+
+def sample_params(space, rng):
+    """
+    Tire un jeu d'hyperparamètres
+
+    Args:
+        space: {section.clé: (loi, min, max)}, loi 'uniform', 'log_uniform' ou 'choice'
+            (pour 'choice' : (loi, [valeurs]))
+        rng: np.random.Generator
+
+    Returns:
+        dict: {section.clé: valeur}
+    """
+    params = {}
+    for name, (law, *bounds) in space.items():
+        if law == 'uniform':
+            value = rng.uniform(*bounds)
+        elif law == 'log_uniform':
+            value = math.exp(rng.uniform(math.log(bounds[0]), math.log(bounds[1])))
+        elif law == 'choice':
+            value = bounds[0][rng.integers(len(bounds[0]))]
+        else:
+            raise ValueError(f"Loi inconnue pour {name} : {law}")
+        params[name] = float(f"{value:.4g}") if isinstance(value, float) else value
+    return params
+
+
+def params_to_overrides(params):
+    """{section.clé: valeur} → {section: {clé: valeur}} (format de train.load_config)"""
+    overrides = {}
+    for name, value in params.items():
+        section, key = name.split('.', 1)
+        overrides.setdefault(section, {})[key] = value
+    return overrides
+
+
+def rung_epochs(min_epochs, max_epochs, eta):
+    """Epochs cumulées de chaque palier : min_epochs, min_epochs × eta, … jusqu'à max_epochs"""
+    epochs = [min_epochs]
+    while epochs[-1] * eta <= max_epochs:
+        epochs.append(epochs[-1] * eta)
+    return epochs
+
+
+class ResultsStore:
+    """Résultats des essais dans une base SQLite (une ligne par essai et par palier)"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Fichier .sqlite (créé si absent)
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS trials (
+                    study TEXT NOT NULL,
+                    trial INTEGER NOT NULL,
+                    rung INTEGER NOT NULL,
+                    epochs INTEGER NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    val_accuracy REAL,
+                    seconds REAL,
+                    model_path TEXT,
+                    error TEXT,
+                    finished_at TEXT,
+                    PRIMARY KEY (study, trial, rung)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def record(self, study, result):
+        """Enregistre (ou remplace) le résultat d'un palier renvoyé par run_trial"""
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (study, result['trial'], result['rung'], result['epochs'], json.dumps(result['params']),
+                 result['status'], result.get('val_accuracy'), result.get('seconds'), result.get('model_path'),
+                 result.get('error'), time.strftime('%Y-%m-%dT%H:%M:%S'))
+            )
+
+    def completed(self, study, rung):
+        """{essai: résultat} des essais terminés au palier rung"""
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            rows = db.execute("SELECT * FROM trials WHERE study = ? AND rung = ? AND status = 'completed'",
+                              (study, rung)).fetchall()
+        return {row['trial']: dict(row, params=json.loads(row['params'])) for row in rows}
+
+    def results(self, study):
+        """Tous les paliers de l'étude, meilleurs en premier"""
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            rows = db.execute("SELECT * FROM trials WHERE study = ? ORDER BY rung DESC, val_accuracy DESC",
+                              (study,)).fetchall()
+        return [dict(row, params=json.loads(row['params'])) for row in rows]
+
+
+def _init_worker(threads):
+    """Threads TensorFlow du worker (fixés avant toute opération)"""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+
+def validation_accuracy(model, config):
+    """Précision du modèle sur la part de validation de config (voir train.load_splits)"""
+    from .train import load_splits
+    from .utils.data import make_dataset
+
+    _, (x_validation, y_validation) = load_splits(config)
+    dataset = make_dataset(x_validation, y_validation, batch_size=config['data']['batch_size'], augment=False,
+                           shuffle=False)
+    return float(model.evaluate(dataset, verbose=0, return_dict=True)['accuracy'])
+
+
+def run_trial(task):
+    """
+    Entraîne un essai jusqu'aux epochs de son palier (reprise depuis les checkpoints du palier précédent)
+
+    Args:
+        task: {trial, rung, epochs, params, config_path, trial_dir}
+
+    Returns:
+        dict: task complété de status, val_accuracy, seconds, model_path (ou error)
+    """
+    from .train import train
+
+    trial_dir = task['trial_dir']
+    overrides = params_to_overrides(task['params'])
+    overrides.setdefault('training', {})['epochs'] = task['epochs']
+    overrides['output'] = {
+        'model_path': os.path.join(trial_dir, 'model.keras'),
+        'checkpoint_dir': os.path.join(trial_dir, 'checkpoints'),
+        'log_path': os.path.join(trial_dir, 'throughput.jsonl'),
+        'keep_checkpoints': True
+    }
+
+    result = dict(task)
+    start = time.perf_counter()
+    try:
+        config = load_config(task['config_path'], overrides)
+        # Sélection sur une partie du jeu d'entraînement, jamais sur le jeu de test
+        config['data']['validation_split'] = config['data']['validation_split'] or 0.1
+        model, history = train(config, verbose=False)
+        scores = history.history.get('val_accuracy')
+        # Palier déjà entraîné (relance après un arrêt avant store.record) : aucune epoch
+        # dans cette exécution, le modèle restauré par BackupAndRestore est évalué
+        score = max(scores) if scores else validation_accuracy(model, config)
+    except Exception as e:
+        return dict(result, status='failed', error=f"{type(e).__name__}: {e}")
+    return dict(result, status='completed', val_accuracy=float(score),
+                seconds=round(time.perf_counter() - start, 1), model_path=overrides['output']['model_path'])
+
+
+def successive_halving(num_trials=27, min_epochs=2, max_epochs=18, eta=3, workers=2, space=None, config_path=None,
+                       study='default', search_dir='searches', seed=0):
+    """
+    Recherche aléatoire avec successive halving, essais exécutés en parallèle
+
+    Args:
+        num_trials: Nombre d'essais au premier palier
+        min_epochs: Epochs du premier palier
+        max_epochs: Epochs maximales (dernier palier)
+        eta: Facteur de réduction : 1/eta des essais passe au palier suivant, avec eta × plus d'epochs
+        workers: Processus d'entraînement simultanés
+        space: Espace de recherche (défaut : SEARCH_SPACE)
+        config_path: Configuration de base (voir train.load_config)
+        study: Nom de l'étude (reprise et comparaison dans la base)
+        search_dir: Dossier de l'étude : base results.sqlite, essais, best_config.json
+
+    Returns:
+        dict: Meilleur essai du dernier palier ({trial, params, val_accuracy, model_path, …})
+    """
+    space = space or SEARCH_SPACE
+    rng = np.random.default_rng(seed)
+    trials = {trial: sample_params(space, rng) for trial in range(num_trials)}
+    study_dir = os.path.abspath(os.path.join(search_dir, study))
+    store = ResultsStore(os.path.join(search_dir, 'results.sqlite'))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    schedule = rung_epochs(min_epochs, max_epochs, eta)
+    survivors = list(trials)
+    epochs_used, previous_epochs = 0, 0
+    # Processus neuf par essai : la mémoire de TensorFlow est rendue à la fin de chaque palier
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers, initializer=_init_worker, initargs=(threads,), maxtasksperchild=1) as pool:
+        for rung, epochs in enumerate(schedule):
+            done = store.completed(study, rung)
+            tasks = [
+                {'trial': trial, 'rung': rung, 'epochs': epochs, 'params': trials[trial], 'config_path': config_path,
+                 'trial_dir': os.path.join(study_dir, f"trial_{trial:03d}")}
+                for trial in survivors if trial not in done
+            ]
+            print(f"Palier {rung} : {len(survivors)} essais × {epochs} epochs ({len(tasks)} à entraîner)")
+            for result in pool.imap_unordered(run_trial, tasks):
+                store.record(study, result)
+                done[result['trial']] = result
+                if result['status'] == 'completed':
+                    print(f"  essai {result['trial']:>3} : {result['val_accuracy']:.4f} ({result['seconds']:.0f} s)")
+                else:
+                    print(f"  essai {result['trial']:>3} : échec ({result['error']})")
+            epochs_used += len(survivors) * (epochs - previous_epochs)
+            previous_epochs = epochs
+
+            ranked = sorted((t for t in survivors if done.get(t, {}).get('status') == 'completed'),
+                            key=lambda t: done[t]['val_accuracy'], reverse=True)
+            if not ranked:
+                raise RuntimeError(f"Aucun essai terminé au palier {rung}")
+            best = done[ranked[0]]
+            survivors = ranked[:max(1, len(ranked) // eta)]
+
+    # Configuration complète du meilleur essai ; sans section output, python -m training
+    # écrit aux emplacements par défaut (models/mnist_cnn.keras et variantes repliées)
+    best_config = load_config(config_path, params_to_overrides(best['params']))
+    del best_config['output']
+    os.makedirs(study_dir, exist_ok=True)
+    with open(os.path.join(study_dir, 'best_config.json'), 'w') as f:
+        json.dump(best_config, f, indent=2)
+
+    print(f"Meilleur essai : {best['trial']} ({best['val_accuracy']:.4f}) {best['params']}")
+    print(f"Budget : {epochs_used} epochs contre {num_trials * max_epochs} pour les mêmes essais "
+          f"entraînés jusqu'au bout")
+    print(f"Configuration : {os.path.join(study_dir, 'best_config.json')} ; modèle : {best['model_path']}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche d'hyperparamètres par successive halving")
+    parser.add_argument('--config', default=None, help="Configuration de base (JSON)")
+    parser.add_argument('--space', default=None, help="Espace de recherche JSON {section.clé: [loi, min, max]}")
+    parser.add_argument('--study', default='default', help="Nom de l'étude")
+    parser.add_argument('--search-dir', default='searches')
+    parser.add_argument('--trials', type=int, default=27)
+    parser.add_argument('--min-epochs', type=int, default=2)
+    parser.add_argument('--max-epochs', type=int, default=18)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=2, help="Essais entraînés simultanément")
+    parser.add_argument('--seed', type=int, default=0, help="Graine du tirage des essais")
+    args = parser.parse_args()
+
+    space = None
+    if args.space:
+        with open(args.space) as f:
+            space = {name: tuple(spec) for name, spec in json.load(f).items()}
+
+    successive_halving(num_trials=args.trials, min_epochs=args.min_epochs, max_epochs=args.max_epochs,
+                       eta=args.eta, workers=args.workers, space=space, config_path=args.config,
+                       study=args.study, search_dir=args.search_dir, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""
+Entraînement de SimpleCNN_MNIST en ligne de commande
+
+Même recette que le notebook (Adam 1e-3, label smoothing 0.1, ReduceLROnPlateau,
+EarlyStopping) à partir d'un fichier de configuration JSON, avec le pipeline
+tf.data de training/utils/data.py :
+
+    - checkpoint à chaque epoch (BackupAndRestore) : une exécution interrompue
+      reprend à la dernière epoch terminée en relançant la même commande
+    - débit par epoch (images/s, temps de pas, attente des données) ajouté à un
+      fichier JSON Lines, une ligne par epoch
+    - modèle final écrit là où l'application le charge (models/mnist_cnn.keras),
+      avec ses variantes repliées (mnist_cnn_fused.keras, mnist_cnn_folded.npz)
+
+Les chemins relatifs de la section output sont relatifs à la racine du projet,
+quel que soit le dossier d'où la commande est lancée.
+
+Usage :
+    python -m training --config training/configs/default.json
+    python -m training --config training/configs/default.json --epochs 5 --fresh
+"""
+import argparse
+import copy
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+from .utils.model_definition import SimpleCNN_MNIST
+from .utils.data import make_dataset
+from .utils.precision import precision_policy
+from .utils.folding import save_folded_weights, save_fused_model
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Chemins de sortie résolus par rapport à la racine du projet
+OUTPUT_PATHS = ('model_path', 'checkpoint_dir', 'log_path')
+
+# Configuration par défaut (recette du notebook) ; le fichier JSON en surcharge une partie
+DEFAULT_CONFIG = {
+    'seed': 42,
+    'model': {
+        'dropout_rate': 0.3,
+        'filters': [32, 64, 128, 256]
+    },
+    'data': {
+        'batch_size': 128,
+        'augment': True,
+        'rotation': 0.05,
+        'translation': 0.1,
+        'zoom': 0.1,
+        'validation_split': 0.0
+    },
+    'training': {
+        'epochs': 50,
+        'learning_rate': 1e-3,
+        'scale_learning_rate': True,
+        'jit_compile': False,
+        'precision': 'float32',
+        'label_smoothing': 0.1,
+        'reduce_lr_patience': 3,
+        'early_stopping_patience': 10
+    },
+    'output': {
+        'model_path': 'models/mnist_cnn.keras',
+        'checkpoint_dir': 'checkpoints/mnist_cnn',
+        'log_path': 'logs/mnist_cnn_throughput.jsonl',
+        'keep_checkpoints': False
+    }
+}
+
+
+def load_config(path=None, overrides=None):
+    """
+    Configuration par défaut surchargée par un fichier JSON puis par des valeurs explicites
+
+    Args:
+        path: Fichier JSON (sections seed, model, data, training, output)
+        overrides: {section: {clé: valeur}} appliqué en dernier (ex. options de la ligne de commande)
+
+    Returns:
+        dict: Configuration complète (chemins de sortie absolus)
+    """
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    sources = []
+    if path:
+        with open(path) as f:
+            sources.append(json.load(f))
+    if overrides:
+        sources.append(overrides)
+
+    for source in sources:
+        for section, values in source.items():
+            if isinstance(values, dict):
+                config.setdefault(section, {}).update(values)
+            else:
+                config[section] = values
+
+    for key in OUTPUT_PATHS:
+        config['output'][key] = os.path.join(PROJECT_ROOT, config['output'][key])
+    return config
+
+
+def folded_paths(model_path):
+    """Variantes repliées lues par l'application : (<modèle>_fused.keras, <modèle>_folded.npz)"""
+    base = os.path.splitext(model_path)[0]
+    return f"{base}_fused.keras", f"{base}_folded.npz"
+
+
+def timed_dataset(dataset, deliveries):
+    """
+    Ajoute en fin de pipeline un map synchrone qui note l'instant où chaque batch est livré
+
+    Le map s'exécute dans l'appel get_next du pas d'entraînement, après le prefetch :
+    l'écart entre le début du pas et la livraison est le temps passé à attendre les données.
+    """
+    def stamp(images, labels):
+        tf.py_function(lambda: deliveries.append(time.perf_counter()), [], [])
+        return images, labels
+
+    options = tf.data.Options()
+    # Pas de prefetch injecté après le map (il mesurerait le remplissage du buffer, pas l'attente)
+    options.experimental_optimization.inject_prefetch = False
+    return dataset.map(stamp).with_options(options)
+
+
+class ThroughputLogger(keras.callbacks.Callback):
+    """Débit, temps de pas et attente des données par epoch, ajoutés à un fichier JSON Lines"""
+
+    def __init__(self, log_path, batch_size, deliveries, run_config=None):
+        """
+        Args:
+            log_path: Fichier .jsonl (ouvert en ajout : une reprise continue le même fichier)
+            batch_size: Taille des batchs (images/s)
+            deliveries: Liste remplie par timed_dataset
+            run_config: Configuration enregistrée avec chaque ligne (comparaison des exécutions)
+        """
+        super().__init__()
+        self.log_path = log_path
+        self.batch_size = batch_size
+        self.deliveries = deliveries
+        self.run_config = run_config
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch_start = time.perf_counter()
+        self.step_times = []
+        self.wait_times = []
+        self.deliveries.clear()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self.batch_start = time.perf_counter()
+        self.delivered = len(self.deliveries)
+
+    def on_train_batch_end(self, batch, logs=None):
+        end = time.perf_counter()
+        self.step_times.append(end - self.batch_start)
+        if len(self.deliveries) > self.delivered:
+            self.wait_times.append(max(0.0, self.deliveries[-1] - self.batch_start))
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self.epoch_start
+        steps = len(self.step_times)
+        train_seconds = sum(self.step_times)
+        record = {
+            'epoch': epoch + 1,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'epoch_seconds': round(seconds, 3),
+            'steps': steps,
+            'images_per_second': round(steps * self.batch_size / train_seconds, 1) if train_seconds else None,
+            'step_time_ms': round(1000 * train_seconds / steps, 3) if steps else None,
+            'data_wait_ms': round(1000 * float(np.mean(self.wait_times)), 3) if self.wait_times else None,
+            'data_wait_fraction': round(sum(self.wait_times) / train_seconds, 4) if train_seconds else None,
+            'learning_rate': float(keras.ops.convert_to_numpy(self.model.optimizer.learning_rate)),
+            **{name: float(value) for name, value in (logs or {}).items() if name != 'learning_rate'}
+        }
+        if self.run_config is not None:
+            record['config'] = self.run_config
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def build_model(config, mu, std, learning_rate=None):
+    """
+    SimpleCNN_MNIST selon la configuration (augmentation faite par le pipeline de données)
+
+    training.precision fixe la politique des couches ('mixed_bfloat16' : convolutions en
+    bfloat16) et training.jit_compile compile le pas d'entraînement avec XLA
+    (voir training/utils/precision.py)
+    """
+    training = config['training']
+    with precision_policy(training['precision']):
+        model = SimpleCNN_MNIST(
+            dropout_rate=config['model']['dropout_rate'],
+            filters=tuple(config['model']['filters']),
+            mu=float(mu), std=float(std), augment=False
+        )
+        model(tf.zeros((1, 28, 28, 1)))
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate or training['learning_rate']),
+        loss=keras.losses.CategoricalCrossentropy(label_smoothing=training['label_smoothing']),
+        metrics=['accuracy'],
+        jit_compile=training['jit_compile']
+    )
+    return model
+
+
+def _is_chief(strategy):
+    """Worker 0 (ou exécution sans cluster) : seul à écrire le modèle et le journal de débit"""
+    resolver = getattr(strategy, 'cluster_resolver', None)
+    return resolver is None or resolver.task_id in (None, 0)
+
+
+def load_splits(config):
+    """
+    Jeux d'entraînement et de validation MNIST
+
+    Avec data.validation_split, la validation est la fin du jeu d'entraînement (le jeu
+    de test reste hors de la sélection) ; sinon c'est le jeu de test.
+
+    Returns:
+        tuple: ((x_train, y_train), (x_validation, y_validation)), images uint8
+    """
+    (x_train, y_train), (x_test, y_test) = keras.datasets.mnist.load_data()
+    if config['data']['validation_split']:
+        num_validation = int(len(x_train) * config['data']['validation_split'])
+        return ((x_train[:-num_validation], y_train[:-num_validation]),
+                (x_train[-num_validation:], y_train[-num_validation:]))
+    return (x_train, y_train), (x_test, y_test)
+
+
+def train(config, strategy=None, verbose=True):
+    """
+    Entraîne, checkpointe à chaque epoch (reprise automatique) et enregistre le modèle final
+
+    Args:
+        config: Configuration (voir load_config)
+        strategy: Stratégie tf.distribute (défaut : un seul processus). Avec N workers,
+            data.batch_size est la taille par worker : le batch global vaut N × batch_size
+            et le learning rate est multiplié par N (si training.scale_learning_rate)
+        verbose: Si False, pas de barre de progression (ex. essais de training/search.py)
+
+    Returns:
+        tuple: (modèle entraîné, historique Keras)
+    """
+    keras.utils.set_random_seed(config['seed'])
+    data, training, output = config['data'], config['training'], config['output']
+    strategy = strategy or tf.distribute.get_strategy()
+    num_workers = strategy.num_replicas_in_sync
+    chief = _is_chief(strategy)
+
+    global_batch_size = data['batch_size'] * num_workers
+    learning_rate = training['learning_rate']
+    if training.get('scale_learning_rate', True):
+        learning_rate *= num_workers
+
+    (x_train, y_train), (x_test, y_test) = load_splits(config)
+
+    # Normalisation calculée sur tout le jeu d'entraînement, comme dans le notebook
+    mu, std = x_train.mean(), x_train.std()
+
+    if num_workers > 1:
+        # Chaque worker ne lit (et n'augmente) que sa part des tableaux, avant le batch.
+        # Parts d'entraînement de même taille : même nombre de pas (all-reduce) sur chaque worker
+        task_id = strategy.cluster_resolver.task_id
+        train_size = len(x_train) // num_workers
+        x_train, y_train = x_train[task_id::num_workers][:train_size], y_train[task_id::num_workers][:train_size]
+        x_test, y_test = x_test[task_id::num_workers], y_test[task_id::num_workers]
+
+    deliveries = []
+    augmentation = {k: data[k] for k in ('rotation', 'translation', 'zoom')}
+    # Plusieurs workers : batchs d'entraînement complets (data.batch_size par worker)
+    train_ds = timed_dataset(
+        make_dataset(x_train, y_train, batch_size=data['batch_size'], augment=data['augment'],
+                     seed=config['seed'], drop_remainder=num_workers > 1, **augmentation),
+        deliveries
+    )
+    test_ds = make_dataset(x_test, y_test, batch_size=data['batch_size'], augment=False, shuffle=False)
+    if num_workers > 1:
+        # Parts déjà faites à la main : pas de partage automatique par tf.data
+        options = tf.data.Options()
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+        train_ds, test_ds = train_ds.with_options(options), test_ds.with_options(options)
+
+    with strategy.scope():
+        model = build_model(config, mu, std, learning_rate=learning_rate)
+
+    # Un dossier de sauvegarde par worker : chacun restaure ses propres variables à la reprise
+    checkpoint_dir = output['checkpoint_dir']
+    if num_workers > 1:
+        checkpoint_dir = os.path.join(checkpoint_dir, f"worker_{strategy.cluster_resolver.task_id}")
+
+    callbacks = [
+        # Checkpoints gardés en fin d'exécution si demandé : un entraînement plus long reprend de là
+        keras.callbacks.BackupAndRestore(checkpoint_dir, save_freq='epoch',
+                                         delete_checkpoint=not output['keep_checkpoints']),
+        keras.callbacks.ReduceLROnPlateau(factor=0.5, patience=training['reduce_lr_patience'], min_lr=1e-6),
+        keras.callbacks.EarlyStopping(patience=training['early_stopping_patience'], restore_best_weights=True)
+    ]
+    if chief:
+        run_info = dict(config, num_workers=num_workers, global_batch_size=global_batch_size,
+                        scaled_learning_rate=learning_rate)
+        callbacks.append(ThroughputLogger(output['log_path'], global_batch_size, deliveries, run_config=run_info))
+    if num_workers > 1:
+        from .distributed import fit_multi_worker
+        history = fit_multi_worker(model, strategy, train_ds, test_ds, training['epochs'], callbacks,
+                                   verbose=chief and verbose)
+    else:
+        history = model.fit(train_ds, epochs=training['epochs'], validation_data=test_ds, callbacks=callbacks,
+                            verbose='auto' if chief and verbose else 0)
+
+    if chief:
+        os.makedirs(os.path.dirname(os.path.abspath(output['model_path'])), exist_ok=True)
+        model.save(output['model_path'])
+        # L'application charge la variante repliée en priorité : elle doit suivre le nouveau modèle
+        fused_path, npz_path = folded_paths(output['model_path'])
+        save_fused_model(model, fused_path)
+        save_folded_weights(model, npz_path)
+        print(f"Modèle enregistré : {output['model_path']} (replié : {fused_path}, {npz_path})")
+    return model, history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraînement de SimpleCNN_MNIST")
+    parser.add_argument('--config', default=None, help="Fichier de configuration JSON")
+    parser.add_argument('--epochs', type=int, default=None, help="Surcharge training.epochs")
+    parser.add_argument('--output', default=None, help="Surcharge output.model_path")
+    parser.add_argument('--fresh', action='store_true',
+                        help="Supprime les checkpoints existants au lieu de reprendre l'exécution")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.epochs is not None:
+        overrides['training'] = {'epochs': args.epochs}
+    if args.output is not None:
+        overrides['output'] = {'model_path': args.output}
+    config = load_config(args.config, overrides)
+
+    if args.fresh:
+        shutil.rmtree(config['output']['checkpoint_dir'], ignore_errors=True)
+    train(config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Coût d'inférence des modèles MNIST : paramètres, FLOPs et latence CPU
+
+Les FLOPs sont calculés analytiquement à partir des largeurs des blocs
+(convolutions 3×3, max-pool après les blocs 1 et 2) ; la latence est mesurée
+sur le chemin d'inférence compilé serve(), celui de l'application.
+
+Usage :
+    python -m training.utils.benchmark models/mnist_cnn.keras models/mnist_cnn_student_w050.keras
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+# Max-pool après chaque bloc de SimpleCNN_MNIST
+POOLS = (True, True, False, False)
+
+
+def conv_flops(filters, pools=POOLS, num_classes=10, input_size=28):
+    """
+    FLOPs d'une passe (1 image) : 2 × multiplications-additions des convolutions et du classifieur
+
+    Args:
+        filters: Largeur de chaque bloc, ex. (32, 64, 128, 256)
+        pools: Max-pool après le bloc
+        num_classes: Nombre de classes
+
+    Returns:
+        int: FLOPs par image
+    """
+    macs = 0
+    size, channels = input_size, 1
+    for f, pool in zip(filters, pools):
+        macs += size * size * 9 * channels * f
+        channels = f
+        if pool:
+            size //= 2
+    macs += channels * num_classes
+    return 2 * macs
+
+
+def measure_latency(model, batch_sizes=(1, 32), repeats=50):
+    """
+    Latence médiane (ms) de model.serve pour chaque taille de batch
+
+    Args:
+        model: Modèle exposant serve(batch)
+        batch_sizes: Tailles de batch mesurées
+        repeats: Nombre d'appels par mesure
+
+    Returns:
+        dict: {batch_size: latence en ms}
+    """
+    latency = {}
+    for batch_size in batch_sizes:
+        batch = np.random.default_rng(0).uniform(0, 255, (batch_size, 28, 28, 1)).astype(np.float32)
+        model.serve(batch)
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.serve(batch)
+            samples.append((time.perf_counter() - start) * 1000.0)
+        latency[batch_size] = round(float(np.median(samples)), 3)
+    return latency
+
+
+def accuracy(model, x, y, batch_size=256):
+    """Précision de model.serve sur (x (N, 28, 28, 1) float32, labels entiers)"""
+    model.compile_inference(warmup=False)
+    predictions = np.concatenate([
+        model.serve(x[start:start + batch_size]).argmax(axis=1) for start in range(0, len(x), batch_size)
+    ])
+    return float((predictions == np.asarray(y)).mean())
+
+
+def model_cost(model, batch_sizes=(1, 32), repeats=50):
+    """
+    Paramètres, MFLOPs et latence d'un SimpleCNN_MNIST (ou FusedCNN_MNIST)
+
+    Returns:
+        dict: {filters, params, mflops, latency_ms}
+    """
+    model.compile_inference(warmup=True)
+    return {
+        'filters': list(model.filters),
+        'params': int(model.count_params()),
+        'mflops': round(conv_flops(model.filters, num_classes=model.num_classes) / 1e6, 3),
+        'latency_ms': measure_latency(model, batch_sizes=batch_sizes, repeats=repeats)
+    }
+
+
+def main():
+    import keras
+    from .model_definition import SimpleCNN_MNIST, FusedCNN_MNIST  # noqa: F401 (enregistre les classes)
+
+    parser = argparse.ArgumentParser(description="Paramètres, FLOPs et latence CPU de modèles MNIST")
+    parser.add_argument('model_paths', nargs='+')
+    parser.add_argument('--batch-sizes', default='1,32')
+    parser.add_argument('--json', default=None, help="Fichier JSON où écrire le rapport")
+    args = parser.parse_args()
+
+    batch_sizes = tuple(int(b) for b in args.batch_sizes.split(','))
+    report = {path: model_cost(keras.models.load_model(path), batch_sizes=batch_sizes) for path in args.model_paths}
+    for path, cost in report.items():
+        latency = ', '.join(f"b{b}: {ms:.2f} ms" for b, ms in cost['latency_ms'].items())
+        print(f"{path}: {cost['params']:,} paramètres, {cost['mflops']:.1f} MFLOPs, {latency}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Pipeline tf.data d'entraînement MNIST : images uint8, augmentation parallèle par batch
+
+Les images restent en uint8 (4× moins de mémoire que les tableaux float32 du
+notebook) jusqu'au batch. L'augmentation (rotation, translation, zoom, mêmes
+amplitudes que les couches Random* de SimpleCNN_MNIST) est combinée en une seule
+transformation affine par image, appliquée à tout le batch par un seul opérateur
+(ImageProjectiveTransformV3). Les batchs sont augmentés en parallèle sur les cœurs
+CPU et préchargés (prefetch) pendant le pas d'entraînement.
+
+Le modèle s'entraîne alors avec SimpleCNN_MNIST(augment=False) : il ne contient
+plus de couches d'augmentation, ni à l'entraînement ni à l'export.
+
+Usage :
+    train_ds = make_dataset(x_train, y_train, batch_size=128, augment=True)
+    model = SimpleCNN_MNIST(augment=False)
+    model.fit(train_ds, epochs=50, validation_data=make_dataset(x_test, y_test, augment=False))
+
+    python -m training.utils.data --samples 20000   # temps d'epoch : couches Random* vs pipeline
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def random_affine_transforms(batch_size, height=28, width=28, rotation=0.05, translation=0.1, zoom=0.1):
+    """
+    Transformations affines aléatoires (rotation, zoom, translation), une par image
+
+    Les amplitudes suivent les couches Keras : rotation en fraction de 2π,
+    translation et zoom en fraction de la taille de l'image.
+
+    Returns:
+        tf.Tensor: (batch_size, 8) au format de ImageProjectiveTransformV3
+            (coordonnées de sortie → coordonnées d'entrée)
+    """
+    def uniform(amplitude):
+        return tf.random.uniform((batch_size,), -amplitude, amplitude)
+
+    angle = uniform(rotation * 2 * math.pi)
+    scale = 1.0 + uniform(zoom)  # > 1 : l'image est réduite (dézoom)
+    tx = uniform(translation * width)
+    ty = uniform(translation * height)
+
+    # Rotation et zoom autour du centre de l'image, puis translation
+    cx, cy = (width - 1) / 2.0, (height - 1) / 2.0
+    cos, sin = tf.cos(angle) * scale, tf.sin(angle) * scale
+    zeros = tf.zeros_like(angle)
+    return tf.stack([
+        cos, -sin, cx - cos * cx + sin * cy - tx,
+        sin, cos, cy - sin * cx - cos * cy - ty,
+        zeros, zeros
+    ], axis=1)
+
+
+def augment_batch(images, rotation=0.05, translation=0.1, zoom=0.1):
+    """
+    Augmente un batch (B, 28, 28, 1) en un seul opérateur (interpolation bilinéaire, fond à 0)
+
+    Args:
+        images: Batch float32
+        rotation, translation, zoom: Amplitudes (0 = désactivé)
+
+    Returns:
+        tf.Tensor: Batch augmenté, même forme
+    """
+    shape = tf.shape(images)
+    transforms = random_affine_transforms(shape[0], images.shape[1], images.shape[2], rotation=rotation,
+                                          translation=translation, zoom=zoom)
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images, transforms=transforms, output_shape=shape[1:3], fill_value=0.0,
+        interpolation='BILINEAR', fill_mode='CONSTANT'
+    )
+
+
+def make_dataset(x, y, batch_size=128, augment=True, shuffle=True, num_classes=10, rotation=0.05,
+                 translation=0.1, zoom=0.1, seed=None, drop_remainder=False):
+    """
+    Dataset d'entraînement ou de validation à partir des tableaux MNIST uint8
+
+    Args:
+        x: Images (N, 28, 28) uint8
+        y: Labels entiers (N,)
+        batch_size: Taille des batchs
+        augment: Si True, augmentation aléatoire de chaque batch
+        shuffle: Si True, mélange à chaque epoch
+        num_classes: Nombre de classes (labels one-hot, pour le label smoothing)
+        rotation, translation, zoom: Amplitudes de l'augmentation
+        seed: Graine du mélange (l'augmentation reste aléatoire)
+        drop_remainder: Si True, le dernier batch incomplet est ignoré (batchs de taille fixe)
+
+    Returns:
+        tf.data.Dataset: (images float32 (B, 28, 28, 1) en [0, 255], labels one-hot)
+    """
+    x = np.asarray(x, dtype=np.uint8)
+    dataset = tf.data.Dataset.from_tensor_slices((x, np.asarray(y)))
+    if shuffle:
+        dataset = dataset.shuffle(len(x), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size, drop_remainder=drop_remainder)
+
+    def to_training_batch(images, labels):
+        images = tf.cast(images, tf.float32)[..., tf.newaxis]
+        if augment:
+            images = augment_batch(images, rotation=rotation, translation=translation, zoom=zoom)
+        return images, tf.one_hot(tf.cast(labels, tf.int32), num_classes)
+
+    # Batchs augmentés en parallèle (ordre libre), préparés pendant le pas d'entraînement
+    dataset = dataset.map(to_training_batch, num_parallel_calls=AUTOTUNE, deterministic=not shuffle)
+    return dataset.prefetch(AUTOTUNE)
+
+
+def _compiled(model):
+    model.compile(
+        optimizer=keras.optimizers.Adam(1e-3),
+        loss=keras.losses.CategoricalCrossentropy(label_smoothing=0.1),
+        metrics=['accuracy']
+    )
+    return model
+
+
+def benchmark_epoch(x, y, batch_size=128, epochs=2):
+    """
+    Temps d'epoch : recette du notebook (float32 en mémoire, couches Random* dans le modèle)
+    contre le pipeline tf.data (uint8, augmentation parallèle, prefetch)
+
+    Returns:
+        dict: {in_model_s, pipeline_s, speedup} (dernière epoch, la première inclut le traçage)
+    """
+    from .model_definition import SimpleCNN_MNIST
+
+    def last_epoch_seconds(model, *fit_args, **fit_kwargs):
+        times = []
+        callback = keras.callbacks.LambdaCallback(
+            on_epoch_begin=lambda epoch, logs: times.append(time.perf_counter()),
+            on_epoch_end=lambda epoch, logs: times.append(time.perf_counter())
+        )
+        model.fit(*fit_args, epochs=epochs, callbacks=[callback], verbose=0, **fit_kwargs)
+        return times[-1] - times[-2]
+
+    x_float = x[..., np.newaxis].astype(np.float32)
+    y_onehot = keras.utils.to_categorical(y, 10)
+    in_model = last_epoch_seconds(_compiled(SimpleCNN_MNIST()), x_float, y_onehot, batch_size=batch_size)
+    pipeline = last_epoch_seconds(_compiled(SimpleCNN_MNIST(augment=False)),
+                                  make_dataset(x, y, batch_size=batch_size))
+    return {'in_model_s': round(in_model, 2), 'pipeline_s': round(pipeline, 2),
+            'speedup': round(in_model / pipeline, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps d'epoch : augmentation dans le modèle vs pipeline tf.data")
+    parser.add_argument('--samples', type=int, default=20000, help="Images d'entraînement utilisées")
+    parser.add_argument('--batch-size', type=int, default=128)
+    args = parser.parse_args()
+
+    (x_train, y_train), _ = keras.datasets.mnist.load_data()
+    result = benchmark_epoch(x_train[:args.samples], y_train[:args.samples], batch_size=args.batch_size)
+    print(f"Augmentation dans le modèle : {result['in_model_s']:.2f} s / epoch")
+    print(f"Pipeline tf.data            : {result['pipeline_s']:.2f} s / epoch (×{result['speedup']:.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Distillation de SimpleCNN_MNIST vers des modèles étudiants plus étroits
+
+Chaque étudiant est un SimpleCNN_MNIST dont la largeur des blocs est multipliée
+par un facteur (0.25, 0.5, 0.75...). Il apprend à la fois les labels (cross-entropy
+avec label smoothing, comme le notebook) et les probabilités adoucies du modèle
+enseignant sur les mêmes images augmentées :
+
+    loss = alpha · CE(y, p_étudiant) + (1 - alpha) · T² · KL(p_enseignant^(1/T) ‖ p_étudiant^(1/T))
+
+Pour chaque étudiant, le rapport donne précision, paramètres, FLOPs et latence CPU.
+Il est écrit dans models/students.json, que l'application lit pour choisir le
+modèle le plus précis qui tient dans un budget de latence (MNIST_LATENCY_BUDGET_MS).
+
+Usage :
+    python -m training.utils.distillation models/mnist_cnn.keras --widths 0.25,0.5,0.75 --epochs 20
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+from .model_definition import SimpleCNN_MNIST, FusedCNN_MNIST
+from .benchmark import accuracy, model_cost
+from .data import make_dataset
+
+
+def student_filters(teacher_filters, width):
+    """Largeurs des blocs d'un étudiant (multiple de 8, au moins 8)"""
+    return tuple(max(8, int(round(f * width / 8)) * 8) for f in teacher_filters)
+
+
+class Distiller(keras.Model):
+    """Entraîne un étudiant SimpleCNN_MNIST sur les labels et les prédictions de l'enseignant"""
+
+    def __init__(self, student, teacher, temperature=4.0, alpha=0.1, label_smoothing=0.1):
+        """
+        Args:
+            student: SimpleCNN_MNIST à entraîner
+            teacher: Modèle entraîné (figé) ; sa variante repliée suffit et est plus rapide
+            temperature: Température d'adoucissement des probabilités
+            alpha: Poids de la loss sur les labels (1 - alpha sur les cibles de l'enseignant)
+            label_smoothing: Label smoothing de la loss sur les labels
+        """
+        super().__init__()
+        self.student = student
+        self.teacher = teacher
+        self.temperature = temperature
+        self.alpha = alpha
+        self.hard_loss = keras.losses.CategoricalCrossentropy(label_smoothing=label_smoothing)
+        self.loss_tracker = keras.metrics.Mean(name='loss')
+        self.accuracy = keras.metrics.CategoricalAccuracy(name='accuracy')
+
+    @property
+    def metrics(self):
+        return [self.loss_tracker, self.accuracy]
+
+    def _soften(self, probabilities):
+        """Probabilités à la température T (les modèles sortent un softmax, pas des logits)"""
+        return tf.nn.softmax(tf.math.log(probabilities + 1e-8) / self.temperature)
+
+    def train_step(self, data):
+        x, y = data
+        # Mêmes images augmentées pour l'enseignant et l'étudiant
+        if self.student.augmentation is not None:
+            x = self.student.augmentation(x, training=True)
+        teacher_probs = self.teacher(x, training=False)
+
+        with tf.GradientTape() as tape:
+            student_probs = self.student.forward(x, training=True)
+            soft_loss = keras.losses.kl_divergence(self._soften(teacher_probs), self._soften(student_probs))
+            loss = (self.alpha * self.hard_loss(y, student_probs)
+                    + (1 - self.alpha) * self.temperature ** 2 * tf.reduce_mean(soft_loss))
+
+        variables = self.student.trainable_variables
+        self.optimizer.apply_gradients(zip(tape.gradient(loss, variables), variables))
+
+        self.loss_tracker.update_state(loss)
+        self.accuracy.update_state(y, student_probs)
+        return {m.name: m.result() for m in self.metrics}
+
+    def test_step(self, data):
+        x, y = data
+        student_probs = self.student(x, training=False)
+        self.loss_tracker.update_state(self.hard_loss(y, student_probs))
+        self.accuracy.update_state(y, student_probs)
+        return {m.name: m.result() for m in self.metrics}
+
+    def call(self, x, training=False):
+        return self.student(x, training=training)
+
+
+def distill_student(teacher, width, train_data, validation_data, epochs=20, batch_size=128,
+                    temperature=4.0, alpha=0.1):
+    """
+    Entraîne un étudiant de largeur width × celle de l'enseignant
+
+    Args:
+        teacher: SimpleCNN_MNIST entraîné
+        width: Multiplicateur de largeur des blocs
+        train_data, validation_data: (x uint8 (N, 28, 28), labels entiers)
+        epochs, batch_size: Comme le notebook
+        temperature, alpha: Voir Distiller
+
+    Returns:
+        SimpleCNN_MNIST: Étudiant entraîné (augment comme l'enseignant)
+    """
+    student = SimpleCNN_MNIST(
+        num_classes=teacher.num_classes, dropout_rate=teacher.dropout_rate,
+        mu=teacher.mu, std=teacher.std_val, filters=student_filters(teacher.filters, width),
+        augment=teacher.augment
+    )
+    student(tf.zeros((1, 28, 28, 1)))
+
+    # Sans couches Random* dans l'étudiant, le pipeline tf.data augmente les batchs :
+    # une seule augmentation dans les deux cas, mêmes images pour l'enseignant et l'étudiant
+    train_ds = make_dataset(*train_data, batch_size=batch_size, augment=student.augmentation is None,
+                            num_classes=teacher.num_classes)
+    validation_ds = make_dataset(*validation_data, batch_size=batch_size, augment=False, shuffle=False,
+                                 num_classes=teacher.num_classes)
+
+    distiller = Distiller(student, FusedCNN_MNIST.from_trained(teacher), temperature=temperature, alpha=alpha)
+    distiller.compile(optimizer=keras.optimizers.Adam(1e-3))
+    distiller.fit(
+        train_ds,
+        epochs=epochs,
+        validation_data=validation_ds,
+        callbacks=[
+            keras.callbacks.ReduceLROnPlateau(monitor='val_accuracy', mode='max', factor=0.5, patience=3,
+                                              min_lr=1e-6),
+            keras.callbacks.EarlyStopping(monitor='val_accuracy', mode='max', patience=6, restore_best_weights=True)
+        ]
+    )
+    return student
+
+
+def distill_family(teacher_path, widths=(0.25, 0.5, 0.75), output_dir='models', epochs=20,
+                   temperature=4.0, alpha=0.1):
+    """
+    Distille un étudiant par largeur et écrit le rapport précision / coût
+
+    Returns:
+        dict: Contenu de students.json ({teacher, students})
+    """
+    teacher = keras.models.load_model(teacher_path)
+
+    train_data, validation_data = keras.datasets.mnist.load_data()
+    x_test, y_test = validation_data
+    x_test = x_test[..., np.newaxis].astype(np.float32)
+
+    # Chemins relatifs au dossier du rapport : l'application les résout depuis models/
+    manifest = {
+        'teacher': dict(path=os.path.relpath(teacher_path, output_dir), width=1.0,
+                        accuracy=accuracy(teacher, x_test, y_test), **model_cost(teacher)),
+        'students': []
+    }
+    for width in widths:
+        student = distill_student(teacher, width, train_data, validation_data, epochs=epochs,
+                                  temperature=temperature, alpha=alpha)
+        filename = f"mnist_cnn_student_w{int(round(width * 100)):03d}.keras"
+        student.save(os.path.join(output_dir, filename))
+        manifest['students'].append(dict(path=filename, width=width,
+                                         accuracy=accuracy(student, x_test, y_test), **model_cost(student)))
+
+    with open(os.path.join(output_dir, 'students.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"{'Modèle':<34} {'Précision':>9} {'Params':>9} {'MFLOPs':>8} {'b1 (ms)':>8} {'b32 (ms)':>9}")
+    for entry in [manifest['teacher']] + manifest['students']:
+        latency = entry['latency_ms']
+        print(f"{entry['path']:<34} {entry['accuracy']:>9.4f} {entry['params']:>9,} {entry['mflops']:>8.1f} "
+              f"{latency[1]:>8.2f} {latency[32]:>9.2f}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distillation de SimpleCNN_MNIST en modèles étudiants")
+    parser.add_argument('teacher_path', nargs='?', default='models/mnist_cnn.keras')
+    parser.add_argument('--widths', default='0.25,0.5,0.75', help="Multiplicateurs de largeur")
+    parser.add_argument('--output-dir', default='models')
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--temperature', type=float, default=4.0)
+    parser.add_argument('--alpha', type=float, default=0.1)
+    args = parser.parse_args()
+
+    distill_family(args.teacher_path, widths=tuple(float(w) for w in args.widths.split(',')),
+                   output_dir=args.output_dir, epochs=args.epochs,
+                   temperature=args.temperature, alpha=args.alpha)
+
+
+if __name__ == '__main__':
+    main()
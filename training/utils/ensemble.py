@@ -0,0 +1,173 @@
+"""
+Ensemble de SimpleCNN_MNIST (seeds différentes) servi en une seule passe
+
+Les modèles entraînés sont repliés (voir folding.py) puis réunis dans un
+EnsembleCNN_MNIST : un seul graphe, un seul appel de serve(), moyenne des softmax.
+Le rapport compare sur le jeu de test MNIST la précision de chaque membre et de
+l'ensemble, et la latence de l'ensemble à celle d'un membre seul, des membres appelés
+l'un après l'autre et d'une variante fusionnée en convolutions groupées (grouped_forward).
+
+Le calcul d'un ensemble de M membres est M fois celui d'un membre. Sur CPU (convolutions
+oneDNN de TensorFlow), la fusion en convolutions groupées ne réduit pas ce coût : selon la
+taille de batch, elle est un peu plus rapide ou un peu plus lente que les membres côte à
+côte, et les deux variantes restent entre 3× et 6× un membre (5 membres, un cœur). Un
+ensemble de 5 modèles nettement moins cher que 5× un modèle n'est donc pas atteignable
+avec ce backend ; EnsembleCNN_MNIST garde les membres côte à côte dans un même graphe.
+
+Usage :
+    python -m training.utils.ensemble models/mnist_cnn_seed*.keras --output models/mnist_cnn_ensemble.keras
+
+L'application sert l'ensemble avec MNIST_BACKEND_PATH=models/mnist_cnn_ensemble.keras.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+from .model_definition import SimpleCNN_MNIST, FusedCNN_MNIST, EnsembleCNN_MNIST  # noqa: F401
+from .export import evaluate
+
+
+def _latency_ms(serve, batch, repeats):
+    """Latence médiane (ms) d'un appel serve(batch)"""
+    serve(batch)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        serve(batch)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(samples))
+
+
+def grouped_forward(members):
+    """
+    Ensemble fusionné en opérations batchées (variante comparée par le benchmark)
+
+    conv1 concatène les filtres des M membres, conv2 à conv4 sont des convolutions
+    groupées (un groupe de canaux par membre) et la tête est un einsum sur l'axe des
+    membres suivi de la moyenne des softmax : une opération par couche pour tout l'ensemble.
+
+    Args:
+        members: FusedCNN_MNIST de même architecture
+
+    Returns:
+        callable: x (N, 28, 28, 1) → probabilités moyennes (N, num_classes) en np.ndarray
+    """
+    reference = members[0]
+    if any(m.filters != reference.filters or m.pools != reference.pools for m in members):
+        raise ValueError("La fusion en convolutions groupées suppose des membres de même architecture")
+
+    # Canaux du membre m contigus : [m × f, (m + 1) × f[ ; tf.nn.conv2d déduit les groupes des formes
+    convs = [
+        (tf.constant(np.concatenate([m.convs[i].get_weights()[0] for m in members], axis=-1)),
+         tf.constant(np.concatenate([m.convs[i].get_weights()[1] for m in members])))
+        for i in range(len(reference.filters))
+    ]
+    head_kernel = tf.constant(np.stack([m.fc.get_weights()[0] for m in members]))  # (M, C, K)
+    head_bias = tf.constant(np.stack([m.fc.get_weights()[1] for m in members]))    # (M, K)
+    num_members, channels = len(members), reference.filters[-1]
+
+    @tf.function
+    def forward(x):
+        x = tf.pad(x, [[0, 0], [1, 1], [1, 1], [0, 0]], constant_values=reference.pad_value)
+        for i, ((kernel, bias), pool) in enumerate(zip(convs, reference.pools)):
+            x = tf.nn.relu(tf.nn.conv2d(x, kernel, 1, 'VALID' if i == 0 else 'SAME') + bias)
+            if pool:
+                x = tf.nn.max_pool2d(x, 2, 2, 'VALID')
+        features = tf.reshape(tf.reduce_mean(x, axis=[1, 2]), (-1, num_members, channels))
+        logits = tf.einsum('bmc,mck->bmk', features, head_kernel) + head_bias
+        return tf.reduce_mean(tf.nn.softmax(logits), axis=1)
+
+    return lambda x: forward(tf.constant(np.asarray(x, dtype=np.float32))).numpy()
+
+
+def benchmark_ensemble(members, ensemble, batch_sizes=(1, 8, 32, 128), repeats=50):
+    """
+    Latence de l'ensemble contre un membre seul, les membres l'un après l'autre et
+    la variante fusionnée en convolutions groupées (grouped_forward)
+
+    Args:
+        members: Modèles membres (FusedCNN_MNIST, chemin d'inférence compilé)
+        ensemble: EnsembleCNN_MNIST construit à partir de ces membres
+        batch_sizes: Tailles de batch mesurées
+        repeats: Nombre d'appels par mesure
+
+    Returns:
+        dict: {batch_size: {single_ms, sequential_ms, ensemble_ms, grouped_ms, cost_vs_single,
+            grouped_cost_vs_single}} (coûts en multiples d'un membre ; M membres = M× en FLOPs)
+    """
+    grouped = grouped_forward(members)
+    report = {}
+    for batch_size in batch_sizes:
+        batch = np.random.default_rng(0).uniform(0, 255, (batch_size, 28, 28, 1)).astype(np.float32)
+        single = _latency_ms(members[0].serve, batch, repeats)
+        sequential = _latency_ms(lambda x: np.mean([m.serve(x) for m in members], axis=0), batch, repeats)
+        stacked = _latency_ms(ensemble.serve, batch, repeats)
+        fused = _latency_ms(grouped, batch, repeats)
+        report[batch_size] = {
+            'single_ms': round(single, 3),
+            'sequential_ms': round(sequential, 3),
+            'ensemble_ms': round(stacked, 3),
+            'grouped_ms': round(fused, 3),
+            'cost_vs_single': round(stacked / single, 2),
+            'grouped_cost_vs_single': round(fused / single, 2)
+        }
+    return report
+
+
+def build_ensemble(model_paths, output_path, evaluate_test=True):
+    """
+    Construit, enregistre et évalue l'ensemble
+
+    Args:
+        model_paths: Fichiers .keras des SimpleCNN_MNIST membres
+        output_path: Fichier .keras de l'ensemble
+        evaluate_test: Si True, évalue membres et ensemble sur le jeu de test
+
+    Returns:
+        dict: Rapport (précisions et latences)
+    """
+    members = [FusedCNN_MNIST.from_trained(keras.models.load_model(path)) for path in model_paths]
+    ensemble = EnsembleCNN_MNIST.from_trained(members)
+    ensemble.save(output_path)
+
+    for model in members + [ensemble]:
+        model.compile_inference(warmup=True)
+
+    report = {'members': list(model_paths), 'output': output_path}
+    if evaluate_test:
+        (_, _), (x_test, y_test) = keras.datasets.mnist.load_data()
+        report['member_accuracy'] = [evaluate(m, x_test, y_test)[0] for m in members]
+        report['ensemble_accuracy'] = evaluate(ensemble, x_test, y_test)[0]
+        print(f"Précision des membres : {', '.join(f'{a:.4f}' for a in report['member_accuracy'])}")
+        print(f"Précision de l'ensemble : {report['ensemble_accuracy']:.4f}")
+
+    report['latency'] = benchmark_ensemble(members, ensemble)
+    print(f"{'Batch':>6} {'1 modèle':>10} {'Séquentiel':>11} {'Ensemble':>10} {'× 1 modèle':>11} "
+          f"{'Groupé':>10} {'× 1 modèle':>11}")
+    for batch_size, m in report['latency'].items():
+        print(f"{batch_size:>6} {m['single_ms']:>8.2f}ms {m['sequential_ms']:>9.2f}ms "
+              f"{m['ensemble_ms']:>8.2f}ms {m['cost_vs_single']:>10.2f}× "
+              f"{m['grouped_ms']:>8.2f}ms {m['grouped_cost_vs_single']:>10.2f}×")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ensemble de SimpleCNN_MNIST en une seule passe")
+    parser.add_argument('model_paths', nargs='+', help="Modèles .keras entraînés avec des seeds différentes")
+    parser.add_argument('--output', default='models/mnist_cnn_ensemble.keras')
+    parser.add_argument('--no-eval', action='store_true', help="Ne pas évaluer sur le jeu de test")
+    parser.add_argument('--report', default=None, help="Fichier JSON où écrire le rapport")
+    args = parser.parse_args()
+
+    report = build_ensemble(args.model_paths, args.output, evaluate_test=not args.no_eval)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Export de SimpleCNN_MNIST vers TFLite et ONNX
+
+Formats produits :
+    - mnist_cnn.tflite        TFLite float32
+    - mnist_cnn_int8.tflite   TFLite int8 (quantification post-entraînement,
+                              calibrée sur des images d'entraînement MNIST)
+    - mnist_cnn.onnx          ONNX (nécessite tf2onnx, ignoré avec un avertissement s'il
+                              n'est pas installé)
+
+Chaque export est évalué sur le jeu de test MNIST et comparé au modèle Keras
+(précision, écart de précision, accord des prédictions, taille du fichier).
+Les entrées/sorties restent en float32 [0, 255] → probabilités : les backends
+sont interchangeables avec le modèle Keras (voir streamlit_app/utils/backends.py).
+
+Usage :
+    python -m training.utils.export models/mnist_cnn.keras --output-dir models
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+from .model_definition import SimpleCNN_MNIST  # noqa: F401 (enregistre la classe pour load_model)
+
+
+# Signature d'entrée commune aux exports (batch dynamique, float32 [0, 255])
+INPUT_SIGNATURE = [tf.TensorSpec([None, 28, 28, 1], tf.float32, name='image')]
+
+
+def _export_saved_model(model, directory):
+    """Exporte l'endpoint d'inférence (training=False) en SavedModel, base de la conversion TFLite"""
+    model.export(directory, format='tf_saved_model', input_signature=INPUT_SIGNATURE, verbose=False)
+    return directory
+
+
+def export_tflite(model, output_path, quantize=None, calibration_images=None, num_calibration=500):
+    """
+    Exporte le modèle au format TFLite
+
+    Args:
+        model: Modèle Keras (SimpleCNN_MNIST)
+        output_path: Fichier .tflite produit
+        quantize: None (float32), 'dynamic' (poids int8) ou 'int8' (poids et activations int8)
+        calibration_images: Images (N, 28, 28) uint8 pour calibrer 'int8'
+        num_calibration: Nombre d'images de calibration utilisées
+
+    Returns:
+        str: Chemin du fichier produit
+    """
+    # Passage par un SavedModel : les variables y sont figées, ce que la calibration int8 exige
+    with tempfile.TemporaryDirectory() as directory:
+        converter = tf.lite.TFLiteConverter.from_saved_model(_export_saved_model(model, directory))
+        _configure_quantization(converter, quantize, calibration_images, num_calibration)
+        tflite_model = converter.convert()
+
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    return output_path
+
+
+def _configure_quantization(converter, quantize, calibration_images, num_calibration):
+    """Options de quantification du convertisseur TFLite"""
+    if quantize in ('dynamic', 'int8'):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantize == 'int8':
+        if calibration_images is None:
+            raise ValueError("La quantification int8 nécessite des images de calibration")
+        calibration = np.asarray(calibration_images[:num_calibration], dtype=np.float32)[..., np.newaxis]
+
+        def representative_dataset():
+            for image in calibration:
+                yield [image[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+        # Tous les calculs en int8 ; entrée/sortie float32 (quantifiées dans le graphe)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    elif quantize is not None and quantize != 'dynamic':
+        raise ValueError(f"Quantification inconnue : {quantize}")
+
+
+def export_onnx(model, output_path, opset=13):
+    """
+    Exporte le modèle au format ONNX (nécessite tf2onnx)
+
+    Args:
+        model: Modèle Keras (SimpleCNN_MNIST)
+        output_path: Fichier .onnx produit
+        opset: Version de l'opset ONNX
+
+    Returns:
+        str: Chemin du fichier produit
+    """
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise ImportError("L'export ONNX nécessite tf2onnx : pip install tf2onnx") from e
+
+    # Conversion depuis le TFLite float32 : les constantes de normalisation capturées
+    # par call() y sont déjà figées (from_function en ferait des entrées du graphe)
+    with tempfile.TemporaryDirectory() as directory:
+        tflite_path = export_tflite(model, os.path.join(directory, 'model.tflite'))
+        tf2onnx.convert.from_tflite(tflite_path, opset=opset, output_path=output_path)
+    return output_path
+
+
+def evaluate(backend, x_test, y_test, batch_size=256):
+    """
+    Évalue un modèle ou un backend sur le jeu de test
+
+    Args:
+        backend: Objet exposant serve(batch) (backend ou SimpleCNN_MNIST)
+        x_test: Images (N, 28, 28) uint8
+        y_test: Labels (N,)
+        batch_size: Taille des batchs d'évaluation
+
+    Returns:
+        tuple: (accuracy, predictions (N,))
+    """
+    x = np.asarray(x_test, dtype=np.float32)[..., np.newaxis]
+    predictions = np.concatenate([
+        backend.serve(x[start:start + batch_size]).argmax(axis=1)
+        for start in range(0, len(x), batch_size)
+    ])
+    return float((predictions == np.asarray(y_test)).mean()), predictions
+
+
+def export_all(model_path, output_dir, formats=('tflite', 'tflite_int8', 'onnx'), num_calibration=500):
+    """
+    Exporte le modèle dans tous les formats et mesure l'écart de précision
+
+    Args:
+        model_path: Modèle Keras (.keras)
+        output_dir: Dossier de sortie
+        formats: Formats à produire parmi 'tflite', 'tflite_int8', 'tflite_dynamic', 'onnx'
+        num_calibration: Nombre d'images d'entraînement pour calibrer l'int8
+
+    Returns:
+        dict: Rapport par format {path, size_kb, accuracy, accuracy_delta, agreement}
+            (sans 'onnx' si tf2onnx n'est pas installé)
+    """
+    # Import local : les backends vivent côté application
+    from streamlit_app.utils.backends import load_backend
+
+    (x_train, _), (x_test, y_test) = keras.datasets.mnist.load_data()
+    model = keras.models.load_model(model_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    reference_accuracy, reference_predictions = evaluate(load_backend('keras', model=model), x_test, y_test)
+    report = {
+        'keras': {
+            'path': model_path,
+            'size_kb': round(os.path.getsize(model_path) / 1024, 1),
+            'accuracy': reference_accuracy,
+            'accuracy_delta': 0.0,
+            'agreement': 1.0
+        }
+    }
+
+    # Images de calibration tirées au hasard (graine fixe) dans le jeu d'entraînement
+    rng = np.random.default_rng(0)
+    calibration_images = x_train[rng.choice(len(x_train), num_calibration, replace=False)]
+
+    for fmt in formats:
+        if fmt == 'onnx':
+            # tf2onnx n'est pas dans requirements.txt : sans lui, les autres formats sont quand même produits
+            try:
+                path = export_onnx(model, os.path.join(output_dir, 'mnist_cnn.onnx'))
+            except ImportError as e:
+                print(f"⚠️ Export ONNX ignoré : {e}")
+                continue
+            backend = load_backend('onnx', path=path)
+        else:
+            quantize = {'tflite': None, 'tflite_int8': 'int8', 'tflite_dynamic': 'dynamic'}[fmt]
+            suffix = f"_{quantize}" if quantize else ""
+            path = export_tflite(
+                model, os.path.join(output_dir, f'mnist_cnn{suffix}.tflite'),
+                quantize=quantize, calibration_images=calibration_images
+            )
+            backend = load_backend('tflite', path=path)
+
+        accuracy, predictions = evaluate(backend, x_test, y_test)
+        report[fmt] = {
+            'path': path,
+            'size_kb': round(os.path.getsize(path) / 1024, 1),
+            'accuracy': accuracy,
+            'accuracy_delta': round(accuracy - reference_accuracy, 5),
+            'agreement': float((predictions == reference_predictions).mean())
+        }
+        print(f"{fmt:<15} {report[fmt]['size_kb']:>9.1f} KB  acc={accuracy:.4f}  "
+              f"Δ={report[fmt]['accuracy_delta']:+.4f}  accord={report[fmt]['agreement']:.4f}")
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export TFLite/ONNX de SimpleCNN_MNIST")
+    parser.add_argument('model_path', nargs='?', default='models/mnist_cnn.keras')
+    parser.add_argument('--output-dir', default='models')
+    parser.add_argument('--formats', default='tflite,tflite_int8,onnx',
+                        help="Liste séparée par des virgules : tflite, tflite_int8, tflite_dynamic, onnx")
+    parser.add_argument('--num-calibration', type=int, default=500)
+    parser.add_argument('--report', default=None, help="Fichier JSON où écrire le rapport")
+    args = parser.parse_args()
+
+    report = export_all(args.model_path, args.output_dir, formats=tuple(args.formats.split(',')),
+                        num_calibration=args.num_calibration)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
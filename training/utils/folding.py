@@ -0,0 +1,135 @@
+"""
+Repliement (folding) des poids de SimpleCNN_MNIST pour l'inférence
+
+En inférence, la normalisation d'entrée et les BatchNormalization sont des
+transformations affines fixes : elles peuvent être absorbées dans les poids
+des convolutions. Chaque bloc devient conv (poids et biais repliés) → ReLU.
+
+    Normalisation : conv1((x - mu) / std) = conv1'(x)  avec W1' = W1 / std,
+                    b1' = b1 - mu/std · ΣW1, et un padding de l'entrée à mu
+                    (le zéro de l'entrée normalisée) au lieu de 0
+    BatchNorm     : s = gamma / sqrt(var + eps) ; W' = W · s ; b' = (b - mean) · s + beta
+
+Les poids repliés sont utilisés par :
+    - le moteur NumPy (streamlit_app/utils/numpy_engine.py), sans TensorFlow (.npz)
+    - FusedCNN_MNIST, variante Keras d'inférence chargée par l'application (.keras)
+
+Usage :
+    python -m training.utils.folding models/mnist_cnn.keras
+    # → models/mnist_cnn_folded.npz et models/mnist_cnn_fused.keras
+"""
+import argparse
+
+import numpy as np
+
+# Blocs convolutifs de SimpleCNN_MNIST (couche conv, couche BN, max-pool après le bloc)
+CONV_BLOCKS = (
+    ('conv1', 'bn1', True),
+    ('conv2', 'bn2', True),
+    ('conv3', 'bn3', False),
+    ('conv4', 'bn4', False),
+)
+
+
+def fold_batchnorm(kernel, bias, gamma, beta, moving_mean, moving_variance, epsilon=1e-3):
+    """
+    Absorbe une BatchNormalization (mode inférence) dans la convolution qui la précède
+
+    Args:
+        kernel: Poids de la convolution (kh, kw, c_in, c_out)
+        bias: Biais de la convolution (c_out,)
+        gamma, beta, moving_mean, moving_variance: Paramètres de la BN (c_out,)
+        epsilon: Epsilon de la BN
+
+    Returns:
+        tuple: (kernel, bias) repliés, float32
+    """
+    scale = gamma / np.sqrt(moving_variance + epsilon)
+    folded_kernel = kernel * scale
+    folded_bias = (bias - moving_mean) * scale + beta
+    return folded_kernel.astype(np.float32), folded_bias.astype(np.float32)
+
+
+def fold_input_normalization(kernel, bias, mu, std):
+    """
+    Absorbe la normalisation (x - mu) / std dans la première convolution
+
+    L'entrée doit ensuite être complétée (padding) avec la valeur mu, et non 0,
+    pour que les bords restent identiques au modèle d'origine.
+
+    Returns:
+        tuple: (kernel, bias) repliés, float32
+    """
+    folded_kernel = kernel / std
+    folded_bias = bias - (mu / std) * kernel.sum(axis=(0, 1, 2))
+    return folded_kernel.astype(np.float32), folded_bias.astype(np.float32)
+
+
+def fold_weights(model):
+    """
+    Extrait et replie les poids d'un SimpleCNN_MNIST entraîné
+
+    Args:
+        model: SimpleCNN_MNIST (chargé avec keras.models.load_model)
+
+    Returns:
+        dict: Tableaux float32 {conv{i}_kernel, conv{i}_bias, fc_kernel, fc_bias,
+            pad_value, pools} prêts pour le moteur NumPy ou le modèle fusionné
+    """
+    weights = {}
+    for i, (conv_name, bn_name, _) in enumerate(CONV_BLOCKS, start=1):
+        conv, bn = getattr(model, conv_name), getattr(model, bn_name)
+        kernel = np.asarray(conv.kernel, dtype=np.float64)
+        bias = np.asarray(conv.bias, dtype=np.float64)
+
+        if i == 1:
+            kernel, bias = fold_input_normalization(kernel, bias, model.mu, model.std_val)
+
+        kernel, bias = fold_batchnorm(
+            np.asarray(kernel, dtype=np.float64), np.asarray(bias, dtype=np.float64),
+            np.asarray(bn.gamma), np.asarray(bn.beta),
+            np.asarray(bn.moving_mean), np.asarray(bn.moving_variance),
+            bn.epsilon
+        )
+        weights[f'{conv_name}_kernel'] = kernel
+        weights[f'{conv_name}_bias'] = bias
+
+    weights['fc_kernel'] = np.asarray(model.fc.kernel, dtype=np.float32)
+    weights['fc_bias'] = np.asarray(model.fc.bias, dtype=np.float32)
+    weights['pad_value'] = np.float32(model.mu)
+    weights['pools'] = np.array([pool for _, _, pool in CONV_BLOCKS])
+    return weights
+
+
+def save_folded_weights(model, path):
+    """Replie les poids et les enregistre au format .npz (lisible sans TensorFlow)"""
+    np.savez(path, **fold_weights(model))
+    return path
+
+
+def save_fused_model(model, path):
+    """Construit la variante Keras repliée (FusedCNN_MNIST) et l'enregistre"""
+    from .model_definition import FusedCNN_MNIST
+
+    FusedCNN_MNIST.from_trained(model).save(path)
+    return path
+
+
+def main():
+    import keras
+    from .model_definition import SimpleCNN_MNIST  # noqa: F401 (enregistre la classe pour load_model)
+
+    parser = argparse.ArgumentParser(description="Repliement BN/normalisation de SimpleCNN_MNIST")
+    parser.add_argument('model_path', nargs='?', default='models/mnist_cnn.keras')
+    parser.add_argument('--npz', default='models/mnist_cnn_folded.npz', help="Poids du moteur NumPy")
+    parser.add_argument('--fused', default='models/mnist_cnn_fused.keras', help="Modèle Keras replié")
+    args = parser.parse_args()
+
+    model = keras.models.load_model(args.model_path)
+    save_folded_weights(model, args.npz)
+    save_fused_model(model, args.fused)
+    print(f"Poids repliés enregistrés : {args.npz}, {args.fused}")
+
+
+if __name__ == '__main__':
+    main()
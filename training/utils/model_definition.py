@@ -1,13 +1,77 @@
 """
 Définition du modèle SimpleCNN_MNIST pour l'entraînement
 """
+import numpy as np
 import tensorflow as tf
 import keras
 from tensorflow.keras import layers, Model
 
 
+class ServingMixin:
+    """
+    Chemin d'inférence rapide commun aux modèles MNIST
+
+    serve(x) contourne model.predict (data adapter, callbacks) et appelle une
+    tf.function tracée une fois par taille de batch (bucket).
+    """
+
+    # Tailles de batch compilées pour serve() (le batch est complété jusqu'au bucket supérieur)
+    SERVE_BUCKETS = (1, 8, 32, 128)
+
+    def compile_inference(self, buckets=None, jit_compile=False, warmup=True):
+        """
+        Prépare le chemin d'inférence rapide utilisé par serve()
+
+        Args:
+            buckets: Tailles de batch à compiler (défaut : SERVE_BUCKETS)
+            jit_compile: Si True, compile le graphe avec XLA
+            warmup: Si True, trace chaque bucket immédiatement (sinon au premier appel)
+        """
+        self._serve_buckets = tuple(sorted(buckets or self.SERVE_BUCKETS))
+        self._serve_fn = tf.function(
+            lambda x: self(x, training=False),
+            jit_compile=jit_compile
+        )
+
+        if warmup:
+            for bucket in self._serve_buckets:
+                self._serve_fn(tf.zeros((bucket, 28, 28, 1), dtype=tf.float32))
+
+    def serve(self, x):
+        """
+        Inférence sans le surcoût de model.predict
+
+        Le batch est complété par des zéros jusqu'au bucket supérieur pour que
+        chaque forme ne soit tracée qu'une seule fois. Les batchs plus grands que
+        le dernier bucket sont découpés.
+
+        Args:
+            x: Batch (N, 28, 28, 1) en [0, 255]
+
+        Returns:
+            np.ndarray: Probabilités (N, num_classes)
+        """
+        if self._serve_fn is None:
+            self.compile_inference(warmup=False)
+
+        x = np.asarray(x, dtype=np.float32)
+        largest = self._serve_buckets[-1]
+        outputs = []
+        for start in range(0, len(x), largest):
+            chunk = x[start:start + largest]
+            bucket = next(b for b in self._serve_buckets if b >= len(chunk))
+            if bucket > len(chunk):
+                padding = np.zeros((bucket - len(chunk),) + chunk.shape[1:], dtype=np.float32)
+                chunk = np.concatenate([chunk, padding])
+            outputs.append(self._serve_fn(tf.constant(chunk)).numpy()[:len(x) - start])
+
+        if not outputs:
+            return np.zeros((0, self.num_classes), dtype=np.float32)
+        return np.concatenate(outputs)
+
+
 @keras.saving.register_keras_serializable()
-class SimpleCNN_MNIST(Model):
+class SimpleCNN_MNIST(ServingMixin, Model):
     """
     CNN optimisé pour MNIST
 
@@ -21,9 +85,21 @@ class SimpleCNN_MNIST(Model):
         - Dropout → Dense 10
 
     ~300K paramètres, cible 99.5%+
+
+    filters règle la largeur des 4 blocs (modèles étudiants plus étroits, voir
+    training/utils/distillation.py). Avec augment=False, le modèle ne contient pas
+    de couches d'augmentation : elle est faite par le pipeline tf.data
+    (training/utils/data.py).
+
+    Précision mixte (politique mixed_bfloat16, voir training/utils/precision.py) :
+    les convolutions calculent en bfloat16, les BatchNormalization, le pooling
+    global, le dropout et la tête softmax restent en float32 (dtype fixé par couche).
+
+    Inférence rapide : voir ServingMixin.serve ; variante d'inférence repliée : FusedCNN_MNIST
     """
 
-    def __init__(self, num_classes=10, dropout_rate=0.3, mu=33.3184, std=78.5675):
+    def __init__(self, num_classes=10, dropout_rate=0.3, mu=33.3184, std=78.5675, filters=(32, 64, 128, 256),
+                 augment=True):
         super().__init__()
 
         # Sauvegarder pour get_config
@@ -31,48 +107,57 @@ class SimpleCNN_MNIST(Model):
         self.dropout_rate = dropout_rate
         self.mu = mu
         self.std_val = std
+        self.filters = tuple(int(f) for f in filters)
+        self.augment = augment
 
         # Normalisation (tenseurs pour le calcul)
         self.mean = tf.constant(mu, dtype=tf.float32)
         self.std = tf.constant(std, dtype=tf.float32)
 
-        # Data Augmentation
+        # Data Augmentation (absente si le pipeline de données augmente déjà les images)
         self.augmentation = keras.Sequential([
             layers.RandomRotation(0.05),        # ±18°
             layers.RandomTranslation(0.1, 0.1), # ±10% shift
             layers.RandomZoom(0.1),             # ±10% zoom
-        ])
+        ]) if augment else None
 
         # Bloc 1 : 28×28×1 → 14×14×32
-        self.conv1 = layers.Conv2D(32, 3, padding='same', kernel_initializer='he_normal')
-        self.bn1 = layers.BatchNormalization()
+        self.conv1 = layers.Conv2D(self.filters[0], 3, padding='same', kernel_initializer='he_normal')
+        self.bn1 = layers.BatchNormalization(dtype='float32')
         self.pool1 = layers.MaxPooling2D(2)
 
         # Bloc 2 : 14×14×32 → 7×7×64
-        self.conv2 = layers.Conv2D(64, 3, padding='same', kernel_initializer='he_normal')
-        self.bn2 = layers.BatchNormalization()
+        self.conv2 = layers.Conv2D(self.filters[1], 3, padding='same', kernel_initializer='he_normal')
+        self.bn2 = layers.BatchNormalization(dtype='float32')
         self.pool2 = layers.MaxPooling2D(2)
 
         # Bloc 3 : 7×7×64 → 7×7×128
-        self.conv3 = layers.Conv2D(128, 3, padding='same', kernel_initializer='he_normal')
-        self.bn3 = layers.BatchNormalization()
+        self.conv3 = layers.Conv2D(self.filters[2], 3, padding='same', kernel_initializer='he_normal')
+        self.bn3 = layers.BatchNormalization(dtype='float32')
 
         # Bloc 4 : 7×7×128 → 7×7×256
-        self.conv4 = layers.Conv2D(256, 3, padding='same', kernel_initializer='he_normal')
-        self.bn4 = layers.BatchNormalization()
+        self.conv4 = layers.Conv2D(self.filters[3], 3, padding='same', kernel_initializer='he_normal')
+        self.bn4 = layers.BatchNormalization(dtype='float32')
 
         # Classification
-        self.gap = layers.GlobalAveragePooling2D()
-        self.dropout = layers.Dropout(dropout_rate)
-        self.fc = layers.Dense(num_classes, activation='softmax')
+        self.gap = layers.GlobalAveragePooling2D(dtype='float32')
+        self.dropout = layers.Dropout(dropout_rate, dtype='float32')
+        self.fc = layers.Dense(num_classes, activation='softmax', dtype='float32')
+
+        # Fonction d'inférence compilée (créée par compile_inference)
+        self._serve_fn = None
+        self._serve_buckets = self.SERVE_BUCKETS
 
     def call(self, x, training=False):
         # Data augmentation seulement à l'entraînement
-        if training:
+        if training and self.augmentation is not None:
             x = self.augmentation(x)
+        return self.forward(x, training=training)
 
-        # Normalisation
-        x = (x - self.mean) / self.std
+    def forward(self, x, training=False):
+        """Passe du réseau sans augmentation (entrée déjà augmentée, ex. distillation)"""
+        # Normalisation (en float32, même si la politique mixte a converti l'entrée en bfloat16)
+        x = (tf.cast(x, tf.float32) - self.mean) / self.std
 
         # Bloc 1
         x = tf.nn.relu(self.bn1(self.conv1(x), training=training))
@@ -100,7 +185,163 @@ class SimpleCNN_MNIST(Model):
             'num_classes': self.num_classes,
             'dropout_rate': self.dropout_rate,
             'mu': self.mu,
-            'std': self.std_val
+            'std': self.std_val,
+            'filters': self.filters,
+            'augment': self.augment
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**config)
+
+
+@keras.saving.register_keras_serializable()
+class FusedCNN_MNIST(ServingMixin, Model):
+    """
+    Variante d'inférence de SimpleCNN_MNIST (poids repliés)
+
+    La normalisation d'entrée est absorbée dans conv1 et chaque BatchNormalization
+    dans les poids et le biais de sa convolution (voir training/utils/folding.py).
+    Chaque bloc se réduit à conv + biais, ReLU (fusionnés dans la couche) et
+    max-pool éventuel ; pas d'augmentation ni de dropout.
+
+    L'entrée est complétée avec la valeur mu (le zéro de l'entrée normalisée) avant
+    conv1 pour que les bords soient identiques au modèle d'origine.
+
+    Création : FusedCNN_MNIST.from_trained(model) puis model.save(...)
+    """
+
+    def __init__(self, num_classes=10, filters=(32, 64, 128, 256), pools=(True, True, False, False),
+                 pad_value=33.3184):
+        super().__init__()
+
+        self.num_classes = num_classes
+        self.filters = tuple(filters)
+        self.pools = tuple(pools)
+        self.pad_value = pad_value
+
+        self.convs = [
+            layers.Conv2D(f, 3, padding='valid' if i == 0 else 'same', activation='relu', name=f'conv{i + 1}')
+            for i, f in enumerate(self.filters)
+        ]
+        self.pool_layers = [layers.MaxPooling2D(2) if pool else None for pool in self.pools]
+        self.gap = layers.GlobalAveragePooling2D()
+        self.fc = layers.Dense(num_classes, activation='softmax')
+
+        self._serve_fn = None
+        self._serve_buckets = self.SERVE_BUCKETS
+
+    def call(self, x, training=False):
+        # Padding 'same' de conv1 à la valeur mu (normalisation repliée)
+        x = tf.pad(x, [[0, 0], [1, 1], [1, 1], [0, 0]], constant_values=self.pad_value)
+
+        for conv, pool in zip(self.convs, self.pool_layers):
+            x = conv(x)
+            if pool is not None:
+                x = pool(x)
+
+        return self.fc(self.gap(x))
+
+    @classmethod
+    def from_trained(cls, model):
+        """
+        Construit la variante repliée d'un SimpleCNN_MNIST entraîné
+
+        Args:
+            model: SimpleCNN_MNIST
+
+        Returns:
+            FusedCNN_MNIST: Prédictions identiques (à l'arrondi float32 près)
+        """
+        from .folding import fold_weights
+
+        weights = fold_weights(model)
+        filters = tuple(int(weights[f'conv{i}_bias'].shape[0]) for i in range(1, len(weights['pools']) + 1))
+        fused = cls(
+            num_classes=model.num_classes,
+            filters=filters,
+            pools=tuple(bool(p) for p in weights['pools']),
+            pad_value=float(weights['pad_value'])
+        )
+        fused(tf.zeros((1, 28, 28, 1)))
+
+        for i, conv in enumerate(fused.convs, start=1):
+            conv.set_weights([weights[f'conv{i}_kernel'], weights[f'conv{i}_bias']])
+        fused.fc.set_weights([weights['fc_kernel'], weights['fc_bias']])
+        return fused
+
+    def get_config(self):
+        return {
+            'num_classes': self.num_classes,
+            'filters': self.filters,
+            'pools': self.pools,
+            'pad_value': self.pad_value
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**config)
+
+
+@keras.saving.register_keras_serializable()
+class EnsembleCNN_MNIST(ServingMixin, Model):
+    """
+    Ensemble de modèles repliés évalué en une seule passe
+
+    Les membres (FusedCNN_MNIST, typiquement le même SimpleCNN_MNIST entraîné avec
+    des seeds différentes) sont tracés côte à côte dans le même graphe : un seul
+    appel de serve() pour tout l'ensemble, une seule passe sur le batch, et la sortie
+    est la moyenne des softmax des membres.
+
+    Création : EnsembleCNN_MNIST.from_trained([model_1, ..., model_5]) puis model.save(...)
+    (voir training/utils/ensemble.py)
+    """
+
+    def __init__(self, members=(), num_classes=10):
+        """
+        Args:
+            members: Configurations (get_config) des FusedCNN_MNIST membres
+            num_classes: Nombre de classes
+        """
+        super().__init__()
+
+        self.num_classes = num_classes
+        self.member_configs = [dict(config) for config in members]
+        self.members = [FusedCNN_MNIST(**config) for config in self.member_configs]
+
+        self._serve_fn = None
+        self._serve_buckets = self.SERVE_BUCKETS
+
+    def call(self, x, training=False):
+        # Moyenne des probabilités (pas des logits) : chaque membre garde sa calibration
+        return tf.add_n([member(x) for member in self.members]) / len(self.members)
+
+    @classmethod
+    def from_trained(cls, models):
+        """
+        Construit l'ensemble à partir de SimpleCNN_MNIST entraînés
+
+        Args:
+            models: Liste de SimpleCNN_MNIST (ou de FusedCNN_MNIST déjà repliés)
+
+        Returns:
+            EnsembleCNN_MNIST
+        """
+        members = [m if isinstance(m, FusedCNN_MNIST) else FusedCNN_MNIST.from_trained(m) for m in models]
+        num_classes = members[0].num_classes
+        if any(m.num_classes != num_classes for m in members):
+            raise ValueError("Les membres de l'ensemble doivent avoir le même nombre de classes")
+
+        ensemble = cls(members=[m.get_config() for m in members], num_classes=num_classes)
+        ensemble(tf.zeros((1, 28, 28, 1)))
+        for target, member in zip(ensemble.members, members):
+            target.set_weights(member.get_weights())
+        return ensemble
+
+    def get_config(self):
+        return {
+            'members': self.member_configs,
+            'num_classes': self.num_classes
         }
 
     @classmethod
@@ -0,0 +1,168 @@
+"""
+Entraînement compilé XLA et en précision mixte bfloat16
+
+Deux options d'entraînement, indépendantes :
+
+    - jit_compile : le pas d'entraînement (forward, gradients, mise à jour Adam)
+      est compilé par XLA en un seul programme (opérations fusionnées). Keras ne
+      l'active pas par défaut sur une machine sans GPU.
+    - precision 'mixed_bfloat16' : les convolutions calculent en bfloat16, les
+      poids restent en float32. Les BatchNormalization, le pooling global et la
+      tête softmax de SimpleCNN_MNIST restent en float32. bfloat16 a la même
+      plage d'exposants que float32 : pas de loss scaling. La politique n'est
+      appliquée que si le matériel calcule nativement en bfloat16 (AVX512_BF16 /
+      AMX sur CPU, GPU Ampere ou plus récent) ; sinon l'entraînement reste en float32.
+
+La politique ne concerne que la construction du modèle : le fichier .keras
+enregistré se recharge en float32 pour l'inférence.
+
+Usage :
+    with precision_policy('mixed_bfloat16'):
+        model = SimpleCNN_MNIST(augment=False)
+    model.compile(..., jit_compile=True)
+
+    python -m training.utils.precision --samples 8000 --epochs 3   # temps d'epoch et précision par mode
+"""
+import argparse
+import contextlib
+import platform
+import time
+
+import tensorflow as tf
+import keras
+
+from .data import make_dataset
+
+PRECISIONS = ('float32', 'mixed_bfloat16')
+
+# Modes comparés par le benchmark : (jit_compile, precision)
+MODES = {
+    'default': (False, 'float32'),
+    'xla': (True, 'float32'),
+    'bf16': (False, 'mixed_bfloat16'),
+    'xla_bf16': (True, 'mixed_bfloat16'),
+}
+
+
+def bfloat16_supported():
+    """True si le matériel calcule nativement en bfloat16 (sinon il est émulé, plus lent que float32)"""
+    for gpu in tf.config.list_physical_devices('GPU'):
+        capability = tf.config.experimental.get_device_details(gpu).get('compute_capability')
+        if capability and capability >= (8, 0):
+            return True
+
+    if platform.system() != 'Linux':
+        return False
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = next((line.split(':', 1)[1].split() for line in f if line.startswith('flags')), [])
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+
+def resolve_precision(precision):
+    """
+    Politique effectivement utilisée pour precision
+
+    Raises:
+        ValueError: Si la précision n'est pas dans PRECISIONS
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Précision inconnue : {precision} (attendu : {', '.join(PRECISIONS)})")
+    if precision == 'mixed_bfloat16' and not bfloat16_supported():
+        print("⚠️ bfloat16 non supporté nativement par ce matériel : entraînement en float32")
+        return 'float32'
+    return precision
+
+
+@contextlib.contextmanager
+def precision_policy(precision):
+    """Politique Keras appliquée aux couches créées dans le bloc, puis politique précédente restaurée"""
+    previous = keras.mixed_precision.global_policy()
+    keras.mixed_precision.set_global_policy(resolve_precision(precision))
+    try:
+        yield
+    finally:
+        keras.mixed_precision.set_global_policy(previous)
+
+
+def benchmark_modes(train_data, test_data, epochs=3, batch_size=128, modes=MODES, seed=42):
+    """
+    Temps d'epoch et précision finale de chaque mode d'entraînement
+
+    Chaque mode entraîne un SimpleCNN_MNIST(augment=False) depuis la même graine,
+    sur le pipeline tf.data augmenté (training/utils/data.py).
+
+    Args:
+        train_data: (x uint8 (N, 28, 28), labels entiers)
+        test_data: (x uint8, labels entiers)
+        epochs: Epochs par mode
+        modes: {nom: (jit_compile, precision)}
+
+    Returns:
+        dict: {nom: {jit_compile, precision, epoch_s, accuracy, speedup}} (epoch_s : dernière
+            epoch, la première inclut le traçage et la compilation XLA ; speedup par rapport au premier mode)
+    """
+    from .model_definition import SimpleCNN_MNIST
+
+    (x_train, y_train), (x_test, y_test) = train_data, test_data
+    mu, std = float(x_train.mean()), float(x_train.std())
+
+    report = {}
+    for name, (jit_compile, precision) in modes.items():
+        keras.utils.set_random_seed(seed)
+        with precision_policy(precision):
+            model = SimpleCNN_MNIST(mu=mu, std=std, augment=False)
+            model(tf.zeros((1, 28, 28, 1)))
+        model.compile(
+            optimizer=keras.optimizers.Adam(1e-3),
+            loss=keras.losses.CategoricalCrossentropy(label_smoothing=0.1),
+            metrics=['accuracy'],
+            jit_compile=jit_compile
+        )
+
+        times = []
+        callback = keras.callbacks.LambdaCallback(
+            on_epoch_begin=lambda epoch, logs: times.append(time.perf_counter()),
+            on_epoch_end=lambda epoch, logs: times.append(time.perf_counter())
+        )
+        model.fit(make_dataset(x_train, y_train, batch_size=batch_size, seed=seed), epochs=epochs,
+                  callbacks=[callback], verbose=0)
+        _, test_accuracy = model.evaluate(make_dataset(x_test, y_test, batch_size=256, augment=False,
+                                                       shuffle=False), verbose=0)
+        report[name] = {
+            'jit_compile': jit_compile,
+            'precision': model.conv1.dtype_policy.name,
+            'epoch_s': round(times[-1] - times[-2], 2),
+            'accuracy': round(float(test_accuracy), 4)
+        }
+
+    baseline = next(iter(report.values()))['epoch_s']
+    for entry in report.values():
+        entry['speedup'] = round(baseline / entry['epoch_s'], 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps d'epoch et précision : XLA et bfloat16 vs défaut")
+    parser.add_argument('--samples', type=int, default=8000, help="Images d'entraînement utilisées")
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--modes', default=','.join(MODES), help="Modes comparés, ex. default,xla")
+    args = parser.parse_args()
+
+    (x_train, y_train), test_data = keras.datasets.mnist.load_data()
+    modes = {name: MODES[name] for name in args.modes.split(',')}
+    report = benchmark_modes((x_train[:args.samples], y_train[:args.samples]), test_data, epochs=args.epochs,
+                             batch_size=args.batch_size, modes=modes)
+
+    print(f"bfloat16 natif : {'oui' if bfloat16_supported() else 'non'}")
+    print(f"{'Mode':<10} {'XLA':>4} {'Précision':>15} {'Epoch (s)':>10} {'Accélération':>13} {'Test':>7}")
+    for name, entry in report.items():
+        print(f"{name:<10} {'oui' if entry['jit_compile'] else 'non':>4} {entry['precision']:>15} "
+              f"{entry['epoch_s']:>10.2f} {entry['speedup']:>12.2f}× {entry['accuracy']:>7.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Élagage structuré des canaux de conv3 / conv4 de SimpleCNN_MNIST
+
+L'importance d'un canal est mesurée par l'échelle effective de sa BatchNormalization,
+|gamma| / sqrt(moving_variance + eps) : un canal dont la BN écrase la sortie
+contribue peu aux blocs suivants. Les canaux les moins importants sont retirés
+physiquement : le modèle élagué est un SimpleCNN_MNIST plus étroit (argument
+filters), avec des Conv2D plus petites et non des poids masqués, puis il est
+réentraîné quelques epochs (fine-tuning).
+
+La courbe d'élagage donne pour chaque taux : paramètres, FLOPs, latence CPU et
+précision avant / après fine-tuning, et retient le plus petit modèle qui reste
+au-dessus de la précision cible (99.5 % par défaut).
+
+Usage :
+    python -m training.utils.pruning models/mnist_cnn.keras --ratios 0.25,0.5,0.75 --finetune-epochs 5
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import tensorflow as tf
+import keras
+
+from .model_definition import SimpleCNN_MNIST
+from .benchmark import accuracy, model_cost
+
+# Blocs élagués : (couche conv, couche BN, consommateur de la sortie)
+PRUNABLE_BLOCKS = (('conv3', 'bn3', 'conv4'), ('conv4', 'bn4', 'fc'))
+
+
+def channel_importance(bn):
+    """Échelle effective |gamma| / sqrt(var + eps) de chaque canal d'une BatchNormalization"""
+    return np.abs(np.asarray(bn.gamma)) / np.sqrt(np.asarray(bn.moving_variance) + bn.epsilon)
+
+
+def prune_channels(model, keep3, keep4):
+    """
+    Construit un SimpleCNN_MNIST réduit aux canaux les plus importants de conv3 et conv4
+
+    Args:
+        model: SimpleCNN_MNIST entraîné
+        keep3: Nombre de canaux conservés dans conv3
+        keep4: Nombre de canaux conservés dans conv4
+
+    Returns:
+        SimpleCNN_MNIST: Modèle élagué (mêmes prédictions aux canaux retirés près)
+    """
+    kept = {}
+    for (conv_name, bn_name, _), keep in zip(PRUNABLE_BLOCKS, (keep3, keep4)):
+        importance = channel_importance(getattr(model, bn_name))
+        # Canaux les plus importants, dans leur ordre d'origine
+        kept[conv_name] = np.sort(np.argsort(importance)[::-1][:keep])
+
+    pruned = SimpleCNN_MNIST(
+        num_classes=model.num_classes, dropout_rate=model.dropout_rate, mu=model.mu, std=model.std_val,
+        filters=(model.filters[0], model.filters[1], keep3, keep4), augment=model.augment
+    )
+    pruned(tf.zeros((1, 28, 28, 1)))
+
+    # Blocs 1 et 2 inchangés
+    for name in ('conv1', 'bn1', 'conv2', 'bn2'):
+        getattr(pruned, name).set_weights(getattr(model, name).get_weights())
+
+    idx3, idx4 = kept['conv3'], kept['conv4']
+    kernel, bias = model.conv3.get_weights()
+    pruned.conv3.set_weights([kernel[..., idx3], bias[idx3]])
+    pruned.bn3.set_weights([w[idx3] for w in model.bn3.get_weights()])
+
+    # conv4 perd les canaux d'entrée retirés de conv3 et ses propres canaux de sortie
+    kernel, bias = model.conv4.get_weights()
+    pruned.conv4.set_weights([kernel[:, :, idx3, :][..., idx4], bias[idx4]])
+    pruned.bn4.set_weights([w[idx4] for w in model.bn4.get_weights()])
+
+    kernel, bias = model.fc.get_weights()
+    pruned.fc.set_weights([kernel[idx4], bias])
+    return pruned
+
+
+def fine_tune(model, train_data, validation_data, epochs=5, learning_rate=3e-4, batch_size=128):
+    """Réentraîne le modèle élagué avec la recette du notebook (learning rate réduit)"""
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate),
+        loss=keras.losses.CategoricalCrossentropy(label_smoothing=0.1),
+        metrics=['accuracy']
+    )
+    model.fit(*train_data, batch_size=batch_size, epochs=epochs, validation_data=validation_data,
+              callbacks=[keras.callbacks.EarlyStopping(patience=3, restore_best_weights=True)])
+    return model
+
+
+def pruning_curve(model_path, ratios=(0.25, 0.5, 0.625, 0.75, 0.875), output_dir='models', finetune_epochs=5,
+                  target_accuracy=0.995):
+    """
+    Élague conv3 / conv4 à plusieurs taux, réentraîne et mesure chaque modèle
+
+    Args:
+        model_path: SimpleCNN_MNIST entraîné
+        ratios: Fractions de canaux retirées de conv3 et conv4
+        output_dir: Dossier des modèles élagués et du rapport pruning.json
+        finetune_epochs: Epochs de fine-tuning par modèle élagué
+        target_accuracy: Précision minimale du modèle retenu
+
+    Returns:
+        dict: {baseline, curve, selected}
+    """
+    model = keras.models.load_model(model_path)
+
+    (x_train, y_train), (x_test, y_test) = keras.datasets.mnist.load_data()
+    x_train = x_train[..., np.newaxis].astype(np.float32)
+    x_test = x_test[..., np.newaxis].astype(np.float32)
+    train_data = (x_train, keras.utils.to_categorical(y_train, model.num_classes))
+    validation_data = (x_test, keras.utils.to_categorical(y_test, model.num_classes))
+
+    report = {
+        'baseline': dict(path=os.path.relpath(model_path, output_dir), ratio=0.0,
+                         accuracy=accuracy(model, x_test, y_test), **model_cost(model)),
+        'curve': []
+    }
+    for ratio in ratios:
+        keep3 = max(1, int(round(model.filters[2] * (1 - ratio))))
+        keep4 = max(1, int(round(model.filters[3] * (1 - ratio))))
+        pruned = prune_channels(model, keep3, keep4)
+        accuracy_before = accuracy(pruned, x_test, y_test)
+        fine_tune(pruned, train_data, validation_data, epochs=finetune_epochs)
+
+        filename = f"mnist_cnn_pruned_{keep3}_{keep4}.keras"
+        pruned.save(os.path.join(output_dir, filename))
+        report['curve'].append(dict(path=filename, ratio=ratio, accuracy_before_finetune=accuracy_before,
+                                    accuracy=accuracy(pruned, x_test, y_test), **model_cost(pruned)))
+
+    # Plus petit modèle (FLOPs) au-dessus de la cible
+    eligible = [entry for entry in report['curve'] if entry['accuracy'] >= target_accuracy]
+    report['selected'] = min(eligible, key=lambda entry: entry['mflops'])['path'] if eligible else None
+
+    with open(os.path.join(output_dir, 'pruning.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'Modèle':<32} {'Taux':>5} {'Params':>9} {'MFLOPs':>8} {'b1 (ms)':>8} {'b32 (ms)':>9} "
+          f"{'Avant FT':>9} {'Précision':>9}")
+    for entry in [report['baseline']] + report['curve']:
+        latency = entry['latency_ms']
+        before = entry.get('accuracy_before_finetune')
+        before = f"{before:.4f}" if before is not None else '-'
+        print(f"{entry['path']:<32} {entry['ratio']:>5.2f} {entry['params']:>9,} {entry['mflops']:>8.1f} "
+              f"{latency[1]:>8.2f} {latency[32]:>9.2f} {before:>9} "
+              f"{entry['accuracy']:>9.4f}")
+    print(f"Modèle retenu (précision ≥ {target_accuracy:.3f}) : {report['selected'] or 'aucun'}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Élagage structuré de conv3 / conv4 de SimpleCNN_MNIST")
+    parser.add_argument('model_path', nargs='?', default='models/mnist_cnn.keras')
+    parser.add_argument('--ratios', default='0.25,0.5,0.625,0.75,0.875', help="Fractions de canaux retirées")
+    parser.add_argument('--output-dir', default='models')
+    parser.add_argument('--finetune-epochs', type=int, default=5)
+    parser.add_argument('--target-accuracy', type=float, default=0.995)
+    args = parser.parse_args()
+
+    pruning_curve(args.model_path, ratios=tuple(float(r) for r in args.ratios.split(',')),
+                  output_dir=args.output_dir, finetune_epochs=args.finetune_epochs,
+                  target_accuracy=args.target_accuracy)
+
+
+if __name__ == '__main__':
+    main()